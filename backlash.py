@@ -0,0 +1,223 @@
+#!/bin/python3
+"""
+Monte Carlo analysis of output backlash from manufacturing tolerances.
+
+The backlash of a gearbox is the angle the output can turn with the input
+locked. It comes from the play in every mesh, which for printed parts varies
+with the tooth thickness, the planet pin positions on the carrier, and the
+scale (module) errors from shrinkage. This draws random parts from a
+tolerance spec and measures the output backlash of each assembly.
+
+The kinematics are the same as meshsim.py with the first stage ring fixed.
+The input is the sun for gear sets with one, or the carrier for SRGears, and
+the output is the secondary ring, or the carrier for PGears. The sun2 idler
+of SRIGears floats between the planets, so it doesn't add backlash.
+
+For each planet the play of each mesh is a gap g along the pitch circle
+tangent, and the small rotations of the carrier, planet, and output must
+satisfy g = A*x for each mesh. Solving this gives the output rotation as a
+weighted sum w*g of the mesh gaps, so the output range for a planet is
+sum(abs(w)*j) for mesh plays j, centered on sum(w*e) for mesh offsets e. The
+planets share the carrier and output, so the gearbox backlash is the
+intersection of the planet ranges. Negative backlash means the gears bind.
+
+The tolerances are normal distribution standard deviations;
+
+* j: the nominal backlash of each mesh at the pitch circle in mm.
+* ds: the tooth thickness error of each gear in mm.
+* da: the radial error of each planet pin in mm.
+* dt: the tangential error of each planet pin in mm.
+* dm: the scale error of each part as a fraction.
+
+A mesh's play is j minus the two tooth thickness errors, plus 2*tan(a) times
+the increase in the distance between the gear centers less their pitch radii
+errors. The tangential pin error offsets all the meshes of a planet.
+
+Samples are drawn in vectorized batches with independent seeds, optionally
+run on a process pool, and collected into a stats1.Histogram of the backlash
+in arcmin. Results are cached per gear set and tolerance spec.
+"""
+import os
+from math import pi, tan
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from efficientgears import d2r, numpy
+from stats1 import Histogram
+
+# Arcmin per radian.
+Arcmin = 60*180/pi
+
+
+def histogram(v, width=1.0):
+  """Get a fixed bucket width stats1.Histogram of the values in array v."""
+  h = Histogram(width=width)
+  if len(v):
+    h.num, h.sum, h.sum2 = len(v), float(v.sum()), float((v*v).sum())
+    h.min, h.max = float(v.min()), float(v.max())
+    i, c = numpy.unique(numpy.floor(v/width).astype(int), return_counts=True)
+    h.data.update(zip(i.tolist(), c.tolist()))
+  return h
+
+
+def quantile(h, q):
+  """Get the q quantile of a Histogram interpolated within its buckets."""
+  n = q*h.num
+  for bmin, bmax, c in h:
+    if c and n <= c:
+      return max(h.min, min(h.max, bmin + (bmax - bmin)*n/c))
+    n -= c
+  return h.max
+
+
+class Backlash(object):
+  """The output backlash model of a planetary gear set.
+
+  Attributes:
+    np: the number of planets.
+    meshes: a list of (name, Rp, Rm, ring, mate) meshes with the planet and
+      mate pitch radii in mm, whether the mate is a ring, and the name of the
+      mate part.
+    w: the (k,) output rotation in radians per mm of gap for each mesh.
+    key: the tuple of gear sizes that identifies the model.
+  """
+
+  def __init__(self, g, a=20.0):
+    if numpy is None:
+      raise ImportError('Backlash requires numpy.')
+    if not hasattr(g, 'Tr'):
+      raise ValueError(f'Backlash requires a planetary gear set, not {g}.')
+    self.np, self.a, self.tana = g.np, a, tan(d2r(a))
+    m, two = g.m, hasattr(g, 'Tr2')
+    # The unknown rotations, with the carrier locked if it's the input.
+    x = (['c'] if g.sun else []) + ['p'] + (['o'] if two else [])
+    self.meshes, rows = [], []
+    def add(name, Rp, Rm, ring, mate, out=False):
+      self.meshes.append((name, Rp, Rm, ring, mate))
+      # The planet's pitch point moves with the carrier at its radius from the center.
+      row = dict(c=Rm, p=Rp if ring else -Rp, o=-Rm if out else 0.0)
+      rows.append([row[k] for k in x])
+    if g.sun:
+      add('sp', g.Tp*m/2, g.Ts*m/2, False, 's')
+    add('rp', g.Tp*m/2, g.Tr*m/2, True, 'r')
+    if two:
+      add('r2p2', g.Tp2*g.m2/2, g.Tr2*g.m2/2, True, 'r2', out=True)
+    self.w = numpy.linalg.inv(numpy.array(rows))[x.index('o' if two else 'c')]
+    self.key = (type(g).__name__, g.Tr, g.Tp, g.Ts, getattr(g, 'Tr2', None), getattr(g, 'Tp2', None), g.np, m, a)
+
+  def __repr__(self):
+    return f'{self.__class__.__name__}({self.key})'
+
+  def __eq__(self, other):
+    return self.key == other.key
+
+  def __hash__(self):
+    return hash(self.key)
+
+  def nominal(self, j):
+    """Get the backlash in radians with no tolerance errors."""
+    return float(abs(self.w).sum()*j)
+
+  def sample(self, rng, n, j=0.1, ds=0.02, da=0.02, dt=0.02, dm=0.002):
+    """Get the (n,) backlash in radians of n random assemblies."""
+    P = self.np
+    # The per part scale and tooth thickness errors, with one part per compound planet.
+    eps = dict(c=rng.normal(0.0, dm, (n, 1)), p=rng.normal(0.0, dm, (n, P)))
+    dr, de = rng.normal(0.0, da, (n, P)), rng.normal(0.0, dt, (n, P))
+    lo, hi = numpy.zeros((n, P)), numpy.zeros((n, P))
+    for w, (name, Rp, Rm, ring, mate) in zip(self.w, self.meshes):
+      if mate not in eps:
+        eps[mate] = rng.normal(0.0, dm, (n, 1))
+      e = eps[mate]
+      t = rng.normal(0.0, ds, (n, 1)) + rng.normal(0.0, ds, (n, P))
+      if ring:
+        s = e*Rm - eps['p']*Rp - dr - eps['c']*(Rm - Rp)
+      else:
+        s = dr + eps['c']*(Rm + Rp) - e*Rm - eps['p']*Rp
+      h = abs(w)*(j - t + 2*s*self.tana)/2
+      lo += w*de - h
+      hi += w*de + h
+    return hi.min(axis=1) - lo.max(axis=1)
+
+
+# The cached backlash() results, keyed without the workers that don't change them.
+Ncache = 256
+_cache = OrderedDict()
+
+
+def _batch(model, spec, n, seed, width):
+  return histogram(model.sample(numpy.random.default_rng(seed), n, *spec)*Arcmin, width)
+
+
+def _analyse(model, spec, n, batch, width, seed, workers=None):
+  seeds = numpy.random.SeedSequence(seed).spawn(-(-n//batch))
+  sizes = [min(batch, n - i*batch) for i in range(len(seeds))]
+  args = ([model]*len(seeds), [spec]*len(seeds), sizes, seeds, [width]*len(seeds))
+  workers = min(workers or os.cpu_count() or 1, len(seeds))
+  if workers == 1:
+    results = list(map(_batch, *args))
+  else:
+    with ProcessPoolExecutor(workers) as pool:
+      results = list(pool.map(_batch, *args))
+  h = Histogram(width=width)
+  for r in results:
+    h.merge(r)
+  return h
+
+
+def backlash(g, j=0.1, ds=0.02, da=0.02, dt=0.02, dm=0.002, a=20.0, n=1 << 20, batch=1 << 16, width=1.0, seed=0, workers=None):
+  """Get a Histogram of the output backlash in arcmin of n random assemblies.
+
+  The samples are drawn in batches using workers processes, defaulting to the
+  number of CPUs, or in this process for workers=1. The result only depends
+  on the seed, not the number of workers. Results are cached, and this
+  returns a copy so callers can merge into or change it.
+  """
+  spec = tuple(float(v) for v in (j, ds, da, dt, dm))
+  key = Backlash(g, float(a)), spec, int(n), int(batch), float(width), seed
+  if key in _cache:
+    _cache.move_to_end(key)
+  else:
+    _cache[key] = _analyse(*key, workers)
+    if len(_cache) > Ncache:
+      _cache.popitem(last=False)
+  h = Histogram(width=float(width))
+  h.setstate(_cache[key].getstate())
+  return h
+
+
+if __name__ == '__main__':
+  import argparse, time
+  import pgears
+
+  cmdline = argparse.ArgumentParser(
+      description='Monte Carlo analysis of the output backlash of a gear set from part tolerances.',
+      formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+  cmdline.add_argument('-G', choices=['P', 'SR', 'SRP', 'SRI'], default='SRP',
+      help='Gear type (see pgears.py).')
+  for k in ('r', 'p', 's', 'r2', 'p2', 's2'):
+    cmdline.add_argument(f'-{k}', type=int, help=f'The {k} gear size.')
+  cmdline.add_argument('-n', type=int, default=3, help='Number of planets.')
+  cmdline.add_argument('-m', type=float, default=0.5, help='Module of the first stage gears.')
+  cmdline.add_argument('-a', type=float, default=20.0, help='Pressure angle.')
+  cmdline.add_argument('-j', type=float, default=0.1, help='Nominal mesh backlash at the pitch circle in mm.')
+  cmdline.add_argument('-ds', type=float, default=0.02, help='Tooth thickness stddev in mm.')
+  cmdline.add_argument('-da', type=float, default=0.02, help='Planet pin radial position stddev in mm.')
+  cmdline.add_argument('-dt', type=float, default=0.02, help='Planet pin tangential position stddev in mm.')
+  cmdline.add_argument('-dm', type=float, default=0.002, help='Part scale stddev as a fraction.')
+  cmdline.add_argument('-N', type=int, default=1 << 20, help='Number of samples.')
+  cmdline.add_argument('-batch', type=int, default=1 << 16, help='Number of samples per batch.')
+  cmdline.add_argument('-width', type=float, default=1.0, help='Histogram bucket width in arcmin.')
+  cmdline.add_argument('-seed', type=int, default=0, help='Random number generator seed.')
+  cmdline.add_argument('-workers', type=int, default=None, help='Number of worker processes.')
+  args = cmdline.parse_args()
+
+  g = getattr(pgears, f'{args.G}Gears')(Tr=args.r, Tp=args.p, Ts=args.s,
+      Tr2=args.r2, Tp2=args.p2, Ts2=args.s2, np=args.n, m=args.m)
+  print(g)
+  t = time.perf_counter()
+  h = backlash(g, args.j, args.ds, args.da, args.dt, args.dm, args.a, args.N, args.batch, args.width, args.seed, args.workers)
+  print(f'Backlash in arcmin of {h.num} assemblies in {time.perf_counter() - t:.3f}s:')
+  print(h)
+  nominal = Backlash(g, args.a).nominal(args.j)*Arcmin
+  binding = sum(c for i, c in h.data.items() if i < 0)/h.num
+  print(f'nominal={nominal:.2f} p5/p50/p95={quantile(h, 0.05):.2f}/{quantile(h, 0.5):.2f}/{quantile(h, 0.95):.2f} binding={binding:.4f}')
@@ -0,0 +1,61 @@
+#!/usr/bin/pypy3
+"""Tests for backlash.py."""
+import unittest
+from backlash import *
+from backlash import _analyse, _cache
+import pgears
+
+
+@unittest.skipIf(numpy is None, 'requires numpy')
+class TestBacklash(unittest.TestCase):
+
+  def test_nominal(self):
+    # The carrier of PGears turns j/c for play j in both meshes.
+    g = pgears.PGears(Tr=60, Tp=24, Ts=12, np=3, m=1)
+    self.assertAlmostEqual(Backlash(g).nominal(0.1), 0.1/18)
+    # The planets of SRGears turn j/Rp for ring play j.
+    g = pgears.SRGears(Tr=60, Tp=25, Tr2=63, Tp2=26, np=3, m=0.5)
+    Rp, Rp2, Rr2 = 25*0.5/2, 26*g.m2/2, 63*g.m2/2
+    self.assertAlmostEqual(Backlash(g).nominal(0.1), (0.1*Rp2/Rp + 0.1)/Rr2)
+    # Without tolerances every assembly has the nominal backlash.
+    b = Backlash(pgears.SRPGears(Tr=61, Tp=23, Ts=15, Tr2=64, Tp2=24, np=4, m=0.5))
+    v = b.sample(numpy.random.default_rng(1), 100, 0.1, 0.0, 0.0, 0.0, 0.0)
+    numpy.testing.assert_allclose(v, b.nominal(0.1))
+    self.assertRaises(ValueError, Backlash, pgears.SGears(10, 31, 0.5))
+
+  def test_backlash(self):
+    g = pgears.SRIGears(Tr=61, Tp=23, Ts=15, Tr2=65, Tp2=23, np=4, m=0.5)
+    h = backlash(g, n=20000, batch=4096, workers=1)
+    self.assertEqual(h.num, 20000)
+    self.assertEqual(sum(c for _, _, c in h), 20000)
+    # Cached results are copies that can be changed.
+    size = len(_cache)
+    h.add(1000.0)
+    h = backlash(g, n=20000, batch=4096, workers=1)
+    self.assertEqual(len(_cache), size)
+    self.assertEqual(h.num, 20000)
+    # The planets don't share their play, so tolerances reduce the backlash.
+    nominal = Backlash(g).nominal(0.1)*Arcmin
+    self.assertLess(h.avg, nominal)
+    self.assertLess(quantile(h, 0.05), quantile(h, 0.5))
+    self.assertLess(quantile(h, 0.5), quantile(h, 0.95))
+    self.assertLess(h.min, 0.0)
+    # The result only depends on the seed.
+    self.assertEqual(backlash(g, n=20000, batch=4096, workers=2).getstate(), h.getstate())
+    self.assertEqual(len(_cache), size)
+    h2 = _analyse(Backlash(g), (0.1, 0.02, 0.02, 0.02, 0.002), 20000, 4096, 1.0, 0, workers=2)
+    self.assertEqual(h2.getstate(), h.getstate())
+    self.assertEqual(list(h2), list(h))
+    self.assertNotEqual(backlash(g, n=20000, batch=4096, seed=1, workers=1).sum, h.sum)
+
+  def test_histogram(self):
+    v = numpy.array([1.5, -0.5, 2.5, 0.5, 2.0, -3.0])
+    h = histogram(v)
+    self.assertEqual(list(h), list(Histogram(v.tolist(), width=1)))
+    self.assertAlmostEqual(h.avg, v.mean())
+    self.assertEqual(quantile(h, 0.0), -3.0)
+    self.assertEqual(quantile(h, 1.0), 2.5)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,66 @@
+#!/bin/python3
+"""
+Vectorized pgears search stages over batches of gears.
+
+Search stages like Efficiency and Inertia compute gear attributes with numpy
+functions of arrays of gear sizes. BatchStage does the common work of
+splitting the gears into batches, getting the columns of gear sizes they
+need, setting the computed attributes on the gears, and filtering them.
+"""
+from itertools import islice
+from efficientgears import numpy
+
+# Number of gears per batch for the numpy backend and search stages.
+Nbatch = 4096
+
+
+def iterBatches(items, n=Nbatch):
+  """Iterate through lists of up to n items."""
+  items = iter(items)
+  while batch := list(islice(items, n)):
+    yield batch
+
+
+def GearColumns(gears, names):
+  """Get a list of numpy arrays of the named attributes for a list of gears."""
+  return [numpy.array([getattr(g, k) for g in gears]) for k in names]
+
+
+class BatchStage(object):
+  """A base class for search stages vectorized over batches of gears.
+
+  Subclasses set columns to the gear attributes they use and names to the
+  attributes they set, and define compute() and keep(). The batches must
+  only have gears of the same type.
+  """
+  columns = ()
+  names = ()
+
+  def __init__(self):
+    if numpy is None:
+      raise ImportError(f'{type(self).__name__} requires numpy.')
+
+  def compute(self, sun, sun2, **columns):
+    """Get a tuple of arrays of the names attributes for arrays of the gear columns.
+
+    The sun and sun2 flags are the gear type's, and columns the gears don't
+    have are not given.
+    """
+    raise NotImplementedError
+
+  def keep(self, g):
+    """Get if a gear with the attributes set passes the stage."""
+    return True
+
+  def iterGears(self, gears, n=Nbatch):
+    """Iterate through gears with the names attributes set that are kept."""
+    for batch in iterBatches(gears, n):
+      g = batch[0]
+      names = [k for k in self.columns if hasattr(g, k)]
+      values = self.compute(getattr(g, 'sun', False), getattr(g, 'sun2', False),
+          **dict(zip(names, GearColumns(batch, names))))
+      for g, *values in zip(batch, *(v.tolist() for v in values)):
+        for k, v in zip(self.names, values):
+          setattr(g, k, v)
+        if self.keep(g):
+          yield g
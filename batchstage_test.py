@@ -0,0 +1,41 @@
+#!/usr/bin/pypy3
+"""Tests for batchstage.py."""
+import unittest
+from batchstage import *
+import pgears
+
+
+class Sizes(BatchStage):
+  columns = 'Tr Tp Ts Tr2'.split()
+  names = ['n', 'flags']
+
+  def compute(self, sun, sun2, **columns):
+    n = len(columns['Tp'])
+    return numpy.full(n, len(columns)), numpy.full(n, 2*sun + sun2)
+
+  def keep(self, g):
+    return g.Tp > 20
+
+
+class TestBatchStage(unittest.TestCase):
+
+  def test_iterBatches(self):
+    self.assertEqual(list(iterBatches(range(5), 2)), [[0, 1], [2, 3], [4]])
+    self.assertEqual(list(iterBatches([], 2)), [])
+
+  @unittest.skipIf(numpy is None, 'requires numpy')
+  def test_BatchStage(self):
+    gears = [pgears.PGears(Tr=60, Tp=24, Ts=12, m=0.5), pgears.PGears(Tr=60, Tp=18, Ts=24, m=0.5)]
+    self.assertEqual(list(Sizes().iterGears(gears, n=1)), gears[:1])
+    # Only the columns the gears have are given, with the gear type's flags.
+    self.assertEqual([(g.n, g.flags) for g in gears], [(3, 2), (3, 2)])
+    g = pgears.SRIGears(Tr=61, Tp=23, Ts=15, Tr2=65, Tp2=23, np=4, m=0.5)
+    self.assertEqual(list(Sizes().iterGears([g])), [g])
+    self.assertEqual((g.n, g.flags), (4, 3))
+    g = pgears.SGears(Ts=10, Tp=31)
+    self.assertEqual(list(Sizes().iterGears([g])), [g])
+    self.assertEqual((g.n, g.flags), (2, 0))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,155 @@
+#!/bin/python3
+"""
+Geometric interference and clearance checks for assembled gearboxes.
+
+The planet size limits in pgears.maxTp() use circles with one module of tip
+clearance. This instead places the real involute tooth outlines of every gear
+at its mesh phase using gearexport.gearOutlines(), and measures the minimum
+clearances between them with vectorized point to polygon distance tests.
+Negative clearances are the depth of interference.
+
+The clearances are;
+
+* Cmesh: between the meshing ring, planet and sun teeth of each stage.
+* Ctip: between the tips and the mating roots and fillets of each mesh.
+* Cpp: between neighbouring planets of the same stage.
+* Cpp2: between the primary and neighbouring secondary planets, which
+  matters where the stages overlap, like at chamfers or during assembly.
+* Chole: between the Dint cabling hole and the sun or planets around it.
+  Without Dint the hole is the gap between the planets, and suns without a
+  hole are not checked.
+
+Only points within dmax of the other gear are tested, so clearances larger
+than dmax are reported as dmax.
+"""
+from math import inf
+from gearexport import gearOutlines, numpy
+
+Cnames = 'Cmesh Ctip Cpp Cpp2 Chole'.split()
+
+# The max number of point to segment distances to compute at once.
+Nchunk = 1 << 18
+
+
+def segDist(q, a, b):
+  """Get the min distance from each point q to the segments a to b."""
+  d = numpy.full(len(q), inf)
+  if not len(a):
+    return d
+  ab = b - a
+  l2 = numpy.maximum((ab*ab).sum(axis=1), 1e-30)
+  n = max(1, Nchunk//len(a))
+  for i in range(0, len(q), n):
+    p = q[i:i+n, None, :]
+    t = numpy.clip(((p - a)*ab).sum(axis=2)/l2, 0.0, 1.0)
+    e = p - (a + t[..., None]*ab)
+    d[i:i+n] = numpy.sqrt((e*e).sum(axis=2).min(axis=1))
+  return d
+
+
+def radius(o, p):
+  """Get the distance of points p from the center of outline o."""
+  return numpy.hypot(*(p - o.center).T)
+
+
+def isSolid(o, q):
+  """Get which points q are inside the solid of outline o."""
+  i = o.inside(q)
+  return i if o.z > 0 else ~i
+
+
+def nearSolid(o, q, dmax):
+  """Get which points q are within dmax of the solid of outline o."""
+  r = radius(o, q)
+  return r < o.profile.Ra + dmax if o.z > 0 else r > o.profile.Ra - dmax
+
+
+def clearance(o1, o2, dmax, p1=None, s2=None, tol=0.0):
+  """Get the signed min clearance from points of o1 to segments of o2 and back.
+
+  The p1 points of o1 and s2 segment start mask of o2 can be given to only
+  test some points and segments, in which case it's only tested one way.
+  Interference depths are always to the whole outline of o2, and points
+  within tol of it are touching, not interfering.
+  """
+  def test(o1, o2, p, s):
+    p = p[nearSolid(o2, p, dmax)]
+    a, b = o2.pts, numpy.roll(o2.pts, -1, axis=0)
+    near = nearSolid(o1, a, dmax)
+    solid = isSolid(o2, p)
+    if solid.any():
+      depth = segDist(p[solid], a[near], b[near])
+      if depth.max() > tol:
+        return -depth.max()
+    s = near & (True if s is None else s)
+    return segDist(p, a[s], b[s]).min(initial=dmax)
+  if p1 is not None:
+    return test(o1, o2, p1, s2)
+  return min(test(o1, o2, o1.pts, None), test(o2, o1, o2.pts, None))
+
+
+def tipRoot(o1, o2, dmax, tol=0.0):
+  """Get the clearance from the tips of o1 to the roots and fillets of o2."""
+  eps = 1e-6*o1.m
+  r1, r2 = radius(o1, o1.pts), radius(o2, o2.pts)
+  tips = r1 > o1.profile.Ra - eps if o1.z > 0 else r1 < o1.profile.Ra + eps
+  # Root segments have both ends in the root and fillet below the flank.
+  roots = r2 <= o2.profile.Rs + eps if o2.z > 0 else r2 >= o2.profile.Rs - eps
+  return clearance(o1, o2, dmax, o1.pts[tips], roots & numpy.roll(roots, -1), tol)
+
+
+class Clearance(object):
+  """A stage that checks the clearances of gears.
+
+  This sets the Cnames attributes of the gears, and filters out gears with
+  any clearance less than cmin.
+  """
+
+  def __init__(self, a=20.0, ha=1.0, hf=1.25, backlash=0.0, fillet=0.5, Dint=None, dmax=1.0, cmin=-inf, tol=0.005):
+    if numpy is None:
+      raise ImportError('Clearance requires numpy.')
+    self.a, self.ha, self.hf, self.backlash, self.fillet = a, ha, hf, backlash, fillet
+    self.Dint, self.dmax, self.cmin, self.tol = Dint, dmax, cmin, tol
+
+  def check(self, g):
+    """Get a dict of the clearances of a pgears gear set."""
+    outlines = gearOutlines(g, self.a, self.ha, self.hf, self.backlash, self.fillet, tol=self.tol)
+    gears = {o.name: o for o in outlines}
+    dmax = self.dmax
+    # Group the gears of each stage as (ring, planets, sun).
+    if not hasattr(g, 'Tr'):
+      stages = [(None, [gears['p']], gears['s'])]
+    else:
+      stages = [(gears['r'], [gears[f'p{i}'] for i in range(g.np)], gears.get('s'))]
+      if 'r2' in gears:
+        stages.append((gears['r2'], [gears[f'p2_{i}'] for i in range(g.np)], gears.get('s2')))
+    c = dict.fromkeys(Cnames, dmax)
+    for r, ps, s in stages:
+      for p in ps:
+        for o in (r, s):
+          if o:
+            # Touching outlines can overlap by both their chordal errors.
+            c['Cmesh'] = min(c['Cmesh'], clearance(p, o, dmax, tol=2*self.tol))
+            c['Ctip'] = min(c['Ctip'], tipRoot(p, o, dmax, 2*self.tol), tipRoot(o, p, dmax, 2*self.tol))
+      if len(ps) > 1:
+        c['Cpp'] = min([c['Cpp']] + [clearance(ps[i - 1], ps[i], dmax) for i in range(len(ps))])
+    if len(stages) > 1 and g.np > 1:
+      ps1, ps2 = stages[0][1], stages[1][1]
+      n = len(ps1)
+      c['Cpp2'] = min(clearance(ps1[i], ps2[(i + k) % n], dmax) for i in range(n) for k in (-1, 1))
+    suns = hasattr(g, 'Tr') and any(s for r, ps, s in stages)
+    if hasattr(g, 'Tr') and (self.Dint is not None or not suns):
+      # The hole is in the sun, or between the planets if there is no sun,
+      # where it defaults to the gap between them.
+      Dint = g.Dint if self.Dint is None else self.Dint
+      rmin = min(numpy.hypot(*o.pts.T).min() for r, ps, s in stages for o in ([s] if s else ps))
+      c['Chole'] = min(dmax, rmin - Dint/2)
+    return {k: float(v) for k, v in c.items()}
+
+  def iterGears(self, gears):
+    """Set the Cnames attributes of gears and yield the gears with all clearances >= cmin."""
+    for g in gears:
+      for k, v in self.check(g).items():
+        setattr(g, k, v)
+      if min(getattr(g, k) for k in Cnames) >= self.cmin:
+        yield g
@@ -0,0 +1,70 @@
+#!/usr/bin/pypy3
+"""Tests for clearance.py."""
+import unittest
+from math import pi, sin
+from clearance import *
+from gearexport import Outline
+import pgears
+
+
+@unittest.skipIf(numpy is None, 'requires numpy')
+class TestClearance(unittest.TestCase):
+
+  def test_check(self):
+    g = pgears.SRPGears(Tr=61, Tp=23, Ts=15, Tr2=64, Tp2=24, np=4, m=0.5)
+    c = Clearance(backlash=0.05).check(g)
+    self.assertEqual(list(c), Cnames)
+    self.assertGreater(c['Cmesh'], 0.0)
+    self.assertLess(c['Cmesh'], 0.05)
+    self.assertGreater(c['Ctip'], 0.0)
+    # The planets are at least as far apart as their tip circles.
+    cpp = (61 - 23)*0.5*sin(pi/4) - (23 + 2)*0.5
+    self.assertGreaterEqual(c['Cpp'], cpp - 1e-9)
+    self.assertLess(c['Cpp'], cpp + 0.1)
+    self.assertEqual(c['Cpp2'], 1.0)
+    # Without a Dint hole there's nothing to check in the sun.
+    self.assertEqual(c['Chole'], 1.0)
+    self.assertAlmostEqual(Clearance(Dint=6.0).check(g)['Chole'], (15 - 2.5)*0.5/2 - 3.0, places=3)
+
+  def test_Chole(self):
+    g = pgears.SRGears(Tr=60, Tp=25, Tr2=63, Tp2=26, np=3, m=0.5)
+    c = Clearance().check(g)
+    # The middle gap between the planets' tips.
+    self.assertAlmostEqual(c['Chole'], (60 - 25)*0.5/2 - (25 + 2)*0.5/2 - g.Dint/2)
+    self.assertAlmostEqual(Clearance(Dint=3.0).check(g)['Chole'], 2.0 - 1.5)
+
+  def test_interference(self):
+    # A small ring and planet have tip interference.
+    g = pgears.SRIGears(Tr=34, Tp=13, Ts=8, Tr2=35, Tp2=14, np=3, m=1)
+    c = Clearance(backlash=0.05).check(g)
+    # The depth is to the nearest point of the planet outline.
+    self.assertLess(c['Ctip'], -0.01)
+    self.assertAlmostEqual(c['Ctip'], c['Cmesh'])
+    g = pgears.PGears(Tr=60, Tp=24, Ts=12, np=3, m=1)
+    gears = list(Clearance(backlash=0.05, Dint=9.0, cmin=0.0).iterGears([g]))
+    self.assertEqual(gears, [g])
+    self.assertGreater(g.Cmesh, 0.0)
+    self.assertAlmostEqual(g.Chole, 0.25)
+    self.assertEqual(list(Clearance(backlash=0.05, Dint=10.0, cmin=0.0).iterGears([g])), [])
+    # Planets half a tooth out of phase collide.
+    r, p = gearOutlines(g)[:2]
+    p = Outline(p.name, p.z, p.m, p.center, p.angle + pi/24, p.profile)
+    self.assertLess(clearance(r, p, 1.0), -0.5)
+
+  def test_touching(self):
+    # Without backlash the tips touch the mating flanks, and the tip clearance is
+    # the dedendum minus the addendum.
+    g = pgears.SGears(9, 27, 0.5)
+    for backlash in (0.0, 0.01):
+      c = Clearance(backlash=backlash, fillet=0.0).check(g)
+      self.assertAlmostEqual(c['Ctip'], 0.25*0.5, places=3)
+      self.assertGreaterEqual(c['Cmesh'], 0.0)
+
+  def test_segDist(self):
+    a, b = numpy.array([[0.0, 0.0], [1.0, 0.0]]), numpy.array([[1.0, 0.0], [1.0, 1.0]])
+    q = numpy.array([[0.5, -1.0], [2.0, 0.5], [3.0, 2.0], [0.5, 0.5]])
+    numpy.testing.assert_allclose(segDist(q, a, b), [1.0, 1.0, numpy.hypot(2, 1), 0.5])
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -9,16 +9,29 @@ In general a value can be used as a range, and a range can be used as a
 constraint. None for a value means no value, for a range or constraint means
 an unlimited (vmin,vmax) range. An empty range is one where vmin>vmax.
 
+A Where is a boolean expression constraint over named values, like "Dext < 60
+and m2 >= 0.4". It is parsed once and compiled into python functions, or
+vectorized functions over numpy arrays.
+
+A FilterOrder is a chain of named filter expressions that is reordered at
+runtime to evaluate the cheapest and most selective filters first.
+
 This uses the following naming conventions. A 'v' is any value, and 'i' is an
 integer value. An 'r' prefix indicates a range, and a c prefix indicates a
 constraint, so 'ri' is an integer range, and 'cv' is a value constraint.
 """
 import re
+import ast
 from math import inf
 from collections.abc import Iterable,Iterator
 from numbers import Number
 from copy import copy
+from time import perf_counter_ns
 import argparse
+try:
+  import numpy
+except ImportError:
+  numpy = None
 
 Imin,Imax = -2**31,2**31
 Vmin,Vmax = -inf,inf
@@ -206,12 +219,13 @@ def IConstraintSet(ci, imin=Imin, imax=Imax):
   return set(i for i in iterIConstraint(ci,imin,imax))
 
 
-def iterIConstraint(ci, imin=Imin, imax=Imax):
+def iterIConstraint(ci, imin=Imin, imax=Imax, mod=1, res=0):
   """ Iterate through integer values that satisfy an integer constraint.
 
   The constraint ci can be None, an integer, a (min, max) inclusive
   range-tuple, a set of integers, or an iterable of constraints. The imin and
-  imax values are an inclusive range-tuple limit.
+  imax values are an inclusive range-tuple limit. Setting mod and res limits
+  it to the values where v % mod == res % mod by stepping through the ranges.
 
   Note this copies iterators so they are not consumed, allowing you to iterate
   through the same ci multiple times. Unfortunately most iterators cannot be
@@ -220,7 +234,7 @@ def iterIConstraint(ci, imin=Imin, imax=Imax):
   evaluations.
   """
   for r0,r1 in iterConstraint(ci, imin, imax, 0):
-    for v in range(r0,r1+1):
+    for v in range(r0 + (res - r0) % mod, r1+1, mod):
       yield v
 
 
@@ -249,3 +263,236 @@ def ConstraintType(vmin=Vmin, vmax=Vmax):
           f'{s!r} invalid, must be a list of {type(vmin).__name__} values or min..max '
           f'ranges between {vmin} and {vmax}.')
   return init
+
+
+# The ast node types allowed in Where expressions.
+Where_nodes = (
+    ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub, ast.UAdd,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow,
+    ast.Compare, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+    ast.Call, ast.Name, ast.Load, ast.Constant)
+# The functions allowed in Where expressions.
+Where_funcs = dict(abs=abs)
+# The largest ** exponent allowed in Where expressions, so they can't take forever.
+Where_powmax = 10
+
+
+class _WhereVector(ast.NodeTransformer):
+  """Transform a Where expression to use numpy logical functions."""
+
+  def _call(self, f, args):
+    func = ast.Attribute(ast.Name('numpy', ast.Load()), f, ast.Load())
+    return ast.Call(func, args, [])
+
+  def _reduce(self, f, args):
+    return args[0] if len(args) == 1 else self._call(f, [args[0], self._reduce(f, args[1:])])
+
+  def visit_BoolOp(self, node):
+    f = 'logical_and' if isinstance(node.op, ast.And) else 'logical_or'
+    return self._reduce(f, [self.visit(v) for v in node.values])
+
+  def visit_UnaryOp(self, node):
+    if isinstance(node.op, ast.Not):
+      return self._call('logical_not', [self.visit(node.operand)])
+    return self.generic_visit(node)
+
+  def visit_Compare(self, node):
+    # Split chained comparisons like "a < b < c" into "(a < b) and (b < c)".
+    vals = [self.visit(v) for v in [node.left] + node.comparators]
+    cmps = [ast.Compare(l, [op], [r]) for l,op,r in zip(vals, node.ops, vals[1:])]
+    return self._reduce('logical_and', cmps)
+
+
+class _WhereAttrs(ast.NodeTransformer):
+  """Transform a Where expression to use attributes of an object _o."""
+
+  def visit_Name(self, node):
+    if node.id in Where_funcs:
+      return node
+    return ast.Attribute(ast.Name('_o', ast.Load()), node.id, ast.Load())
+
+
+class Where(object):
+  """A boolean expression constraint over named values.
+
+  The expression is a python boolean expression using names, numbers,
+  arithmetic operators, abs(), comparisons, and 'and', 'or', and 'not' (eg
+  "Dext < 60 and m2 >= 0.4 and R > 500"). The ** exponents must be numbers
+  up to Where_powmax and not nested. If names is provided, it will raise
+  ValueError if the expression uses any other names.
+
+  The top level 'and' terms are kept separately so split() can be used to
+  evaluate them as soon as the values they use are known.
+  """
+
+  def __init__(self, expr, names=None):
+    if isinstance(expr, str):
+      try:
+        tree = ast.parse(expr.strip(), mode='eval').body
+      except SyntaxError as e:
+        raise ValueError(f'invalid Where expression {expr!r}: {e.msg}.') from e
+      expr = Where._iterterms(tree)
+    elif isinstance(expr, ast.AST):
+      expr = [expr]
+    self.terms = list(expr)
+    for node in (n for t in self.terms for n in ast.walk(t)):
+      if not isinstance(node, Where_nodes):
+        raise ValueError(f'invalid Where expression {str(self)!r}: {type(node).__name__} not supported.')
+      if isinstance(node, ast.Call) and not (
+          isinstance(node.func, ast.Name) and node.func.id in Where_funcs and not node.keywords):
+        raise ValueError(f'invalid Where expression {str(self)!r}: only {",".join(Where_funcs)} functions supported.')
+      if isinstance(node, ast.Constant) and not isinstance(node.value, Number):
+        raise ValueError(f'invalid Where expression {str(self)!r}: {node.value!r} is not a number.')
+      if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Pow):
+        e = node.right.operand if isinstance(node.right, ast.UnaryOp) else node.right
+        if not (isinstance(e, ast.Constant) and isinstance(e.value, Number) and abs(e.value) <= Where_powmax) or any(
+            isinstance(n, ast.Pow) for n in ast.walk(node.left)):
+          raise ValueError(f'invalid Where expression {str(self)!r}: ** exponents must be numbers up to {Where_powmax} and not nested.')
+    if names is not None and not self.names <= set(names):
+      raise ValueError(f'invalid Where expression {str(self)!r}: unknown names {",".join(sorted(self.names - set(names)))}.')
+
+  @staticmethod
+  def _iterterms(node):
+    """Iterate through the top level 'and' terms of an expression."""
+    if isinstance(node, ast.BoolOp) and isinstance(node.op, ast.And):
+      for v in node.values:
+        yield from Where._iterterms(v)
+    else:
+      yield node
+
+  def _expr(self):
+    """Get the ast expression for all the terms."""
+    if not self.terms:
+      return ast.Constant(True)
+    if len(self.terms) == 1:
+      return self.terms[0]
+    return ast.BoolOp(ast.And(), self.terms)
+
+  def __str__(self):
+    return ast.unparse(self._expr())
+
+  def __repr__(self):
+    return f'{self.__class__.__name__}({str(self)!r})'
+
+  def __bool__(self):
+    return bool(self.terms)
+
+  @property
+  def names(self):
+    """Get the set of value names used."""
+    return set(n.id for t in self.terms for n in ast.walk(t)
+        if isinstance(n, ast.Name) and n.id not in Where_funcs)
+
+  def split(self, names):
+    """Split into (inner, outer) Wheres for terms only using names and the rest.
+
+    Either can be None if there are no terms for it.
+    """
+    names = set(names)
+    inner = [t for t in self.terms if Where(t).names <= names]
+    outer = [t for t in self.terms if t not in inner]
+    return (Where(inner) if inner else None), (Where(outer) if outer else None)
+
+  def _compile(self, expr, args):
+    src = f'lambda {", ".join(args)}: {ast.unparse(expr)}'
+    return eval(src, dict(Where_funcs, __builtins__={}, numpy=numpy))
+
+  def function(self, args=None):
+    """Compile into a function of the named positional args.
+
+    If args is None, this compiles a function of a single object argument that
+    uses the object's attributes for the named values.
+    """
+    if args is None:
+      expr = ast.parse(str(self), mode='eval').body
+      return self._compile(_WhereAttrs().visit(expr), ['_o'])
+    return self._compile(self._expr(), args)
+
+  def vector(self, args):
+    """Compile into a vectorized function of the named numpy array args."""
+    if numpy is None:
+      raise ImportError('vectorized Where requires numpy.')
+    expr = ast.parse(str(self), mode='eval').body
+    return self._compile(_WhereVector().visit(expr), args)
+
+
+class FilterOrder(object):
+  """An adaptively ordered chain of named filter expressions.
+
+  The filters are a dict of {name: expr} python expressions over args that are
+  true if the values should be skipped, compiled with env as the globals. The
+  env dict can be updated to change the values the filters use.
+
+  The test attribute is a compiled function of the args that is true if any
+  filter is true. Every every'th candidate should be checked with sample()
+  instead, which times and evaluates every filter separately. After 1, 2, 4,
+  ... samples up to reorder samples, and then every reorder samples, the
+  filters are sorted by cost/P(skip), which is the optimal order for
+  independent filters, and test is recompiled.
+  """
+  # The ns overhead of timing, measured when first used.
+  timer_ns = None
+
+  def __init__(self, filters, args, env=None, every=32, reorder=32):
+    self.args, self.env, self.every, self.reorder = args, dict(env or {}), every, reorder
+    self.names = list(filters)
+    self.exprs = dict(filters)
+    self.funcs = {k: self._compile(e) for k,e in self.exprs.items()}
+    # Stats as [samples, skips, total ns] for each filter.
+    self.stats = {k: [0, 0, 0] for k in self.names}
+    # Start so the first candidate is sampled.
+    self.n, self.samples = every - 1, 0
+    if FilterOrder.timer_ns is None:
+      FilterOrder.timer_ns = sorted(-perf_counter_ns() + perf_counter_ns() for _ in range(101))[50]
+    self._update()
+
+  def _compile(self, expr):
+    return eval(f'lambda {", ".join(self.args)}: {expr}', self.env)
+
+  def _update(self):
+    exprs = ' or '.join(f'({self.exprs[k]})' for k in self.names)
+    self.test = self._compile(exprs or 'False')
+
+  def cost(self, name):
+    """Get the estimated ns cost per skip of a filter."""
+    n, k, t = self.stats[name]
+    return (t / n if n else 0.0) / ((k + 1) / (n + 2))
+
+  def sample(self, *args):
+    """Evaluate and time all the filters, returning true if any are true."""
+    skip = False
+    for k in self.names:
+      f, s = self.funcs[k], self.stats[k]
+      t = perf_counter_ns()
+      v = f(*args)
+      s[2] += max(0, perf_counter_ns() - t - self.timer_ns)
+      s[0] += 1
+      if v:
+        s[1] += 1
+        skip = True
+    self.samples += 1
+    s = self.samples
+    if s % self.reorder == 0 or (s < self.reorder and not s & (s - 1)):
+      self.names.sort(key=self.cost)
+      self._update()
+    return skip
+
+  def __len__(self):
+    return len(self.names)
+
+  def __str__(self):
+    return ' '.join(f'{k}(skip={s[1]/s[0] if s[0] else 0:.2f},ns={s[2]/s[0] if s[0] else 0:.0f})'
+        for k,s in ((k,self.stats[k]) for k in self.names))
+
+  def __repr__(self):
+    return f'{self.__class__.__name__}({",".join(self.names)})'
+
+
+def WhereType(names=None):
+  """An argparse type used for initializing Where arguments."""
+  def init(s):
+    try:
+      return Where(s, names)
+    except ValueError as e:
+      raise argparse.ArgumentTypeError(str(e))
+  return init
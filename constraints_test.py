@@ -164,5 +164,53 @@ class TestConstraints(unittest.TestCase):
     self.assertEqual(ConstraintRange([1,(14,16),27,(28,32),90,1000],vmin=31,vmax=30,vtol=0), (31,30))
     self.assertEqual(ConstraintRange([1,(14,16),27,(28,32),90,1000],vmin=33,vmax=50,vtol=0), (50,33))
 
+  def test_Where(self):
+    w = Where('Dext < 60 and (m2 >= 0.4 or not R > 5) and 1 < Tr < 30', ['Dext','m2','R','Tr'])
+    self.assertEqual(w.names, {'Dext','m2','R','Tr'})
+    self.assertEqual(len(w.terms), 3)
+    w1, w2 = w.split(['Tr'])
+    self.assertEqual(str(w1), '1 < Tr < 30')
+    self.assertEqual(str(w2), 'Dext < 60 and (m2 >= 0.4 or not R > 5)')
+    self.assertIsNone(w.split(['x'])[0])
+    self.assertIsNone(w.split(['Dext','m2','R','Tr'])[1])
+    f = w1.function(['Tr'])
+    self.assertEqual([f(1), f(2), f(30)], [False, True, False])
+    class G: Dext, m2, R = 50, 0.3, 3
+    self.assertTrue(w2.function()(G))
+    G.R = 6
+    self.assertFalse(w2.function()(G))
+    self.assertRaises(ValueError, Where, 'x < 1', ['Tr'])
+    self.assertRaises(ValueError, Where, 'Tr <')
+    self.assertRaises(ValueError, Where, 'open(Tr)')
+    self.assertRaises(ValueError, Where, 'Tr.real < 1')
+    # Exponents are limited so expressions can't take forever.
+    self.assertTrue(Where('Tr**2 + Tr**-1.5 > 4').function(['Tr'])(2))
+    self.assertRaises(ValueError, Where, 'Tr**10**10 > 1')
+    self.assertRaises(ValueError, Where, '(Tr**10)**10 > 1')
+    self.assertRaises(ValueError, Where, 'Tr**Tr > 1')
+    self.assertRaises(ValueError, Where, 'Tr**11 > 1')
+
+  @unittest.skipIf(numpy is None, 'requires numpy')
+  def test_Where_vector(self):
+    w = Where('abs(Tr - 10) < 5 and not Tr % 2 and (0 < Tp <= 3 or Tp > 10)')
+    v = w.vector(['Tr', 'Tp'])
+    tr, tp = numpy.array([6, 8, 8, 16, 12]), numpy.array([3, 4, 11, 11, 0])
+    self.assertEqual(list(v(tr, tp)), [True, False, True, False, False])
+    f = w.function(['Tr', 'Tp'])
+    self.assertEqual(list(v(tr, tp)), [bool(f(r, p)) for r,p in zip(tr, tp)])
+
+  def test_FilterOrder(self):
+    f = FilterOrder(dict(odd='x % 2', big='x > k', none='x < 0'), ('x',), dict(k=90), every=1, reorder=4)
+    self.assertEqual(f.names, ['odd', 'big', 'none'])
+    self.assertEqual([x for x in range(100) if not f.sample(x)], list(range(0, 91, 2)))
+    self.assertEqual(f.stats['odd'][:2], [100, 50])
+    self.assertEqual(f.stats['none'][:2], [100, 0])
+    # The filter that never skips is evaluated last.
+    self.assertEqual(f.names[-1], 'none')
+    self.assertEqual([x for x in range(100) if not f.test(x)], list(range(0, 91, 2)))
+    f.env['k'] = 10
+    self.assertEqual([x for x in range(100) if not f.test(x)], list(range(0, 11, 2)))
+
+
 if __name__ == '__main__':
   unittest.main()
@@ -0,0 +1,132 @@
+#!/bin/python3
+"""
+Mesh loss efficiency of gearboxes.
+
+The power loss of a gear mesh is estimated with the Ohlendorf gear loss
+factor HV, where the fraction of the transmitted power lost is mu*HV for a
+coefficient of friction mu, and;
+
+  HV = pi*(1/z1 + 1/z2)*(1 - Et + Ea1^2 + Ea2^2)/cos(Bb)
+
+Using signed z for ring gears makes this work for internal meshes too. The
+addendum contact ratios Ea1 and Ea2 come from efficientgears, so this depends
+on the pressure angle and tooth heights but not the module, and longer
+contact paths lose more power.
+
+The gearbox efficiency is found with the Willis method. The mesh losses apply
+to the power each mesh transmits relative to the carrier, and for each mesh
+the tooth force on the driven side is reduced by the mesh efficiency. The
+direction of power through each mesh is found from the lossless forces, then
+the planet and carrier torque balances are solved again with the losses.
+This matters for split ring gearboxes, where the power circulating through
+the planets relative to the carrier is about R times the input power.
+
+The kinematics match meshsim.py, with the first stage ring fixed. The input
+is the sun for gears with a sun like PGears, SRPGears and SRIGears, or the
+carrier for SRGears. The output is the carrier for PGears, or the secondary
+ring. The SRIGears sun2 idler transmits no torque so has no losses. Bearing
+and churning losses are ignored.
+
+This is vectorized over arrays of gear sizes, so the efficiency of a whole
+batch of candidate gears is computed at once.
+"""
+from math import pi, inf
+from batchstage import BatchStage
+from efficientgears import GearArray, numpy
+
+def lossFactor(z1, z2, a=20.0, B=0.0, ha=1.0, hf=1.25):
+  """Get the HV gear loss factors of (z1, z2) meshes with negative z for rings."""
+  g1, g2 = GearArray(z1, 1.0, a, B, ha, hf), GearArray(z2, 1.0, a, B, ha, hf)
+  Ea1, Ea2 = g1.Ea, g2.Ea
+  return pi*(1/g1.z + 1/g2.z)*(1 - Ea1 - Ea2 + Ea1**2 + Ea2**2)/numpy.cos(numpy.radians(g1.Bb))
+
+
+def planetMeshes(Tr, Tp, Ts, Tr2=None, Tp2=None, sun=True):
+  """Get the (zp, zm, side, Rm, wm, wc) arrays of the planet meshes of planetary gear sizes.
+
+  The last axis of zp, zm, side, Rm and wm is the ring, sun if sun is true,
+  and secondary ring if Tr2 is given meshes of the gears. They are the planet
+  and mate sizes with negative z for rings, the planet's side of the mesh
+  which is -1 for the sun, the mate's pitch radius for a first stage module
+  of 1, and the mate's speed for a unit input speed. The carrier speeds are
+  wc.
+  """
+  Tr, Tp, Ts = (numpy.asarray(v, dtype=float) for v in (Tr, Tp, Ts))
+  wc = Ts/(Ts + Tr) if sun else numpy.ones_like(Tr)
+  meshes = [(Tp, -Tr, 1.0, Tr/2, 0.0)]
+  if sun:
+    meshes.append((Tp, Ts, -1.0, Ts/2, 1.0))
+  if Tr2 is not None:
+    Tr2, Tp2 = numpy.asarray(Tr2, dtype=float), numpy.asarray(Tp2, dtype=float)
+    # The secondary stage is scaled so its carrier radius matches, making its module Tr-Tp/(Tr2-Tp2).
+    k = (Tr - Tp)/(Tr2 - Tp2)
+    wr2 = wc*(Tr2*Tp - Tp2*Tr)/(Tr2*Tp)
+    meshes.append((Tp2, -Tr2, 1.0, k*Tr2/2, wr2))
+  zp, zm, side, Rm, wm = (numpy.broadcast_arrays(*v) for v in zip(*meshes))
+  return (*(numpy.stack(v, axis=-1) for v in (zp, zm, side, Rm, wm)), wc)
+
+
+def meshForces(zp, zm, side, Rm, l=1.0, sun=True):
+  """Get the tooth forces on the mates of planetMeshes() for a unit input torque.
+
+  The l factors scale the forces on the planet side of each mesh for the
+  mesh losses. The losses are in the planet spin torque balance, and the
+  carrier torque balances the torques on the mates.
+  """
+  # The planet pitch radius is the mate radius times the planet/mate size ratio.
+  Rp = Rm*numpy.abs(zp/zm)
+  l = numpy.broadcast_to(l, Rm.shape)
+  spin = side*Rp*l
+  if sun:
+    inp = numpy.zeros_like(Rm)
+    inp[..., 1] = -Rm[..., 1]
+    # Two stage gears also have the secondary ring mesh.
+    rows = [inp, spin] + ([Rm] if Rm.shape[-1] > 2 else [])
+  else:
+    rows = [Rm, spin]
+  A = numpy.stack(rows, axis=-2)
+  b = numpy.zeros(A.shape[:-1])
+  b[..., 0] = 1.0
+  return numpy.linalg.solve(A, b[..., None])[..., 0]
+
+
+def efficiency(Tr, Tp, Ts, Tr2=None, Tp2=None, sun=True, a=20.0, B=0.0, ha=1.0, hf=1.25, mu=0.1):
+  """Get the efficiency of arrays of gear sizes.
+
+  The gear sizes can be numbers or broadcastable arrays, with Tr None for
+  SGears which are a single mesh between the Ts and Tp gears, and Tr2 None
+  for single stage gears. The sun flag is if Ts is a sun gear.
+  """
+  if Tr is None:
+    return 1.0 - mu*lossFactor(Ts, Tp, a, B, ha, hf)
+  zp, zm, side, Rm, wm, wc = planetMeshes(Tr, Tp, Ts, Tr2, Tp2, sun)
+  eta = 1.0 - mu*lossFactor(zp, zm, a, B, ha, hf)
+  f = meshForces(zp, zm, side, Rm, sun=sun)
+  # The planet drives the mates where the power on the mate relative to the carrier is positive.
+  l = numpy.where(f*Rm*(wm - wc[..., None]) > 0, 1/eta, eta)
+  f = meshForces(zp, zm, side, Rm, l, sun)
+  if Tr2 is not None:
+    return f[..., -1]*Rm[..., -1]*wm[..., -1]
+  return -(f*Rm).sum(axis=-1)*wc
+
+
+class Efficiency(BatchStage):
+  """A search stage that computes the efficiency of gears.
+
+  This sets the eta gear attribute to the gearbox efficiency, computing it
+  for each batch of gears in one vectorized call, and only keeps gears with
+  eta >= etamin.
+  """
+  columns = 'Tr Tp Ts Tr2 Tp2'.split()
+  names = ['eta']
+
+  def __init__(self, a=20.0, B=0.0, ha=1.0, hf=1.25, mu=0.1, etamin=-inf):
+    super().__init__()
+    self.a, self.B, self.ha, self.hf, self.mu, self.etamin = a, B, ha, hf, mu, etamin
+
+  def compute(self, sun, sun2, Tr=None, Tp=None, Ts=None, Tr2=None, Tp2=None):
+    eta = efficiency(Tr, Tp, Ts, Tr2, Tp2, sun, self.a, self.B, self.ha, self.hf, self.mu)
+    return numpy.broadcast_to(eta, len(Tp)),
+
+  def keep(self, g):
+    return g.eta >= self.etamin
@@ -0,0 +1,53 @@
+#!/usr/bin/pypy3
+"""Tests for efficiency.py."""
+import unittest
+from efficiency import *
+import pgears
+
+
+def meshEta(z1, z2, mu=0.1):
+  return 1 - mu*lossFactor(z1, z2)
+
+
+@unittest.skipIf(numpy is None, 'requires numpy')
+class TestEfficiency(unittest.TestCase):
+
+  def test_lossFactor(self):
+    # Longer contact paths and smaller gears lose more.
+    self.assertGreater(lossFactor(12, 24), lossFactor(24, 48))
+    self.assertGreater(lossFactor(24, 48, ha=1.2, hf=1.45), lossFactor(24, 48))
+    self.assertGreater(lossFactor(24, 48, a=15.0), lossFactor(24, 48, a=25.0))
+    # Internal meshes lose less than external meshes.
+    self.assertLess(lossFactor(24, -60), lossFactor(24, 60))
+    numpy.testing.assert_allclose(lossFactor([12, 24], [24, -60]), [lossFactor(12, 24), lossFactor(24, -60)])
+
+  def test_efficiency(self):
+    # The Willis efficiency of a planetary with the sun input and carrier output.
+    eta0, i0 = meshEta(24, 12)*meshEta(24, -60), 60/12
+    self.assertAlmostEqual(efficiency(60, 24, 12), (1 + eta0*i0)/(1 + i0))
+    # The Willis efficiency of split rings with the secondary ring driving relative to the carrier.
+    eta0, i0 = meshEta(23, -61)*meshEta(24, -64), 61*24/(23*64)
+    self.assertAlmostEqual(efficiency(61, 23, 0, 64, 24, sun=False), (1 - i0)/(1 - eta0*i0))
+    # And with the primary ring driving for a negative ratio.
+    eta0, i0 = meshEta(24, -64)*meshEta(23, -61), 64*23/(24*61)
+    self.assertAlmostEqual(efficiency(64, 24, 0, 61, 23, sun=False), eta0*(1 - i0)/(eta0 - i0))
+    # Without friction there are no losses.
+    numpy.testing.assert_allclose(efficiency([61, 61], [23, 23], [15, 15], [64, 65], [24, 23], mu=0.0), 1.0)
+    # Higher ratios circulate more power and lose more.
+    eta = efficiency([61, 61], [23, 23], [15, 15], [64, 65], [24, 23])
+    self.assertLess(eta[0], eta[1])
+    self.assertLess(eta[1], efficiency(61, 23, 15))
+    self.assertAlmostEqual(efficiency(None, 31, 10), meshEta(10, 31))
+
+  def test_Efficiency(self):
+    gears = [pgears.SRIGears(Tr=61, Tp=23, Ts=15, Tr2=65, Tp2=23, np=4, m=0.5),
+        pgears.SRIGears(Tr=61, Tp=23, Ts=15, Tr2=64, Tp2=24, np=4, m=0.5)]
+    self.assertEqual(list(Efficiency().iterGears(gears, n=1)), gears)
+    # The sun2 idler has no losses.
+    for g in gears:
+      self.assertAlmostEqual(g.eta, efficiency(g.Tr, g.Tp, g.Ts, g.Tr2, g.Tp2))
+    self.assertEqual(list(Efficiency(etamin=0.5).iterGears(gears)), gears[:1])
+
+
+if __name__ == '__main__':
+  unittest.main()
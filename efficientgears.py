@@ -1,5 +1,10 @@
 #!/bin/python3
 from math import *
+from functools import cached_property
+try:
+  import numpy
+except ImportError:
+  numpy = None
 
 
 def d2r(d):
@@ -44,7 +49,12 @@ def invd(d):
 
 
 class Gear(object):
-  """ A base class for a simple gear. """
+  """ A base class for a simple gear.
+
+  Internal (ring) gears can be represented with a negative z, which gives
+  negative diameters and radii with the tip inside and root outside the pitch
+  circle.
+  """
   z : int    # number of gear teeth.
   m : float  # transverse module.
   a : float  # pressure angle.
@@ -193,8 +203,10 @@ class Gear(object):
     This is the contact line length from the mid-pitch point to where the
     addendum disengages. It does not depend on the size of the other gear, and
     the sum of engaging gear's L1 is the total transverse contact line length.
+    For internal gears with negative z the addendum is inside the pitch circle,
+    and contact can't continue inside the base circle.
     """
-    return sqrt(self.Ra**2 - self.Rb**2) - self.Rp * sind(self.a)
+    return copysign(sqrt(max(0, self.Ra**2 - self.Rb**2)), self.z) - self.Rp * sind(self.a)
 
   def Lt(self, g2=None):
     """ Transverse contact path length.
@@ -258,6 +270,217 @@ class Gear(object):
     """Get the minimum helical face contact line length. """
     return self.Cxmin(g2,e)/cosd(self.Bb)
 
+class GearArray(object):
+  """ An array of gears for vectorized calculations.
+
+  This has the same attributes as Gear but as numpy arrays that are broadcast
+  together, and computes the same properties for all the gears at once. The
+  cos, sin and tan of the angles are computed once and cached.
+
+  The attributes are kept with their own shapes and only broadcast when
+  combined, so properties that don't depend on every attribute are computed
+  on smaller arrays, eg for sparse grids from numpy.meshgrid().
+  """
+
+  def __init__(self, z, m=1.0, a=20.0, B=0.0, ha=1.0, hf=1.25, hx=1.0):
+    if numpy is None:
+      raise ImportError('GearArray requires numpy.')
+    self.z, self.m, self.a, self.B, self.ha, self.hf, self.hx = (
+        numpy.asarray(v, dtype=float) for v in (z, m, a, B, ha, hf, hx))
+    self.shape = numpy.broadcast_shapes(*(v.shape for v in self.attrs))
+
+  @property
+  def attrs(self):
+    return self.z, self.m, self.a, self.B, self.ha, self.hf, self.hx
+
+  @classmethod
+  def fromgears(cls, gears):
+    """Create a GearArray from a list of Gears."""
+    return cls(*([getattr(g, n) for g in gears] for n in 'z m a B ha hf hx'.split()))
+
+  def __len__(self):
+    return self.shape[0] if self.shape else 1
+
+  def __getitem__(self, i):
+    """Get gear i as a Gear."""
+    z, *args = (numpy.broadcast_to(v, self.shape)[i] for v in self.attrs)
+    return Gear(int(z), *(float(v) for v in args))
+
+  def __repr__(self):
+    return f'{self.__class__.__name__}({len(self)} gears)'
+
+  @cached_property
+  def cosa(self):
+    return numpy.cos(numpy.radians(self.a))
+
+  @cached_property
+  def sina(self):
+    return numpy.sin(numpy.radians(self.a))
+
+  @cached_property
+  def cosB(self):
+    return numpy.cos(numpy.radians(self.B))
+
+  @cached_property
+  def tanB(self):
+    return numpy.tan(numpy.radians(self.B))
+
+  @property
+  def b(self):
+    """Get the tooth face width."""
+    return self.m*self.hx
+
+  @property
+  def Dp(self):
+    """Get the pitch diameter from size and module."""
+    return self.z*self.m
+
+  @property
+  def Db(self):
+    """Get the base diameter from the size, module, and pressure angle. """
+    return self.Dp*self.cosa
+
+  @property
+  def Da(self):
+    """Get the tip diameter from addendum factor ha."""
+    return self.Dy(self.ha)
+
+  @property
+  def Df(self):
+    """Get the root diameter from dedendum factor hf."""
+    return self.Dy(-self.hf)
+
+  def Dy(self, hy):
+    """Get the diameter at an arbitary hight-factor hy from the pitch circle."""
+    return (self.z + 2*hy) * self.m
+
+  @property
+  def Rp(self):
+    return self.Dp/2
+
+  @property
+  def Rb(self):
+    return self.Db/2
+
+  @property
+  def Ra(self):
+    return self.Da/2
+
+  @property
+  def Rf(self):
+    return self.Df/2
+
+  def Ry(self, hy):
+    return self.Dy(hy)/2
+
+  @property
+  def Pp(self):
+    """Get the pitch at the pitch cicle."""
+    return self.m*pi
+
+  @property
+  def Pb(self):
+    """ Get the pitch at the base cicle."""
+    return self.Pp*self.cosa
+
+  @property
+  def Px(self):
+    """ Get the axial pitch, which is inf for spur gears."""
+    with numpy.errstate(divide='ignore'):
+      return self.Pp/self.tanB
+
+  @property
+  def sa(self):
+    """ Tooth thickness-factor at the tip (addendum)."""
+    return self.sy(self.ha)
+
+  @property
+  def sf(self):
+    """ Tooth thickness-factor at the root (dedendum)."""
+    return self.sy(-self.hf)
+
+  def sy(self, hy):
+    """Get the tooth thickness-factor at tooth height factor hy (see Gear.sy())."""
+    dp, dy = self.z, self.z+2*hy  # diameters scaled by m.
+    ar, ayr = numpy.radians(self.a), numpy.radians(self.ay(hy))
+    return dy*(pi/2/dp + (numpy.tan(ar) - ar) - (numpy.tan(ayr) - ayr))
+
+  @property
+  def mn(self):
+    """Get the normal module from transverse module and helix angle."""
+    return self.m*self.cosB
+
+  def ay(self, hy):
+    """Get the pressure angle in degrees at an arbitary hy height factor.
+
+    Like Gear.ay() this is 0 below the base circle.
+    """
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+      c = self.Rb/self.Ry(hy)
+      return numpy.where((0 < c) & (c <= 1), numpy.degrees(numpy.arccos(numpy.clip(c, -1, 1))), 0.0)
+
+  @property
+  def Bb(self):
+    """Get the helix angle at the base radius."""
+    return numpy.degrees(numpy.arctan(self.cosa * self.tanB))
+
+  def By(self, ry):
+    """Get the helix angle at a radius ry from the pitch helix angle."""
+    return numpy.degrees(numpy.arctan(ry/self.Rp * self.tanB))
+
+  @property
+  def La(self):
+    """ Transverse addendum contact path length."""
+    return numpy.copysign(numpy.sqrt(numpy.maximum(0, self.Ra**2 - self.Rb**2)), self.z) - self.Rp * self.sina
+
+  def Lt(self, g2=None):
+    """ Transverse contact path length of gear pairs (see Gear.Lt())."""
+    if g2 is None: g2=self
+    assert numpy.all(self.a == g2.a)
+    return self.La + g2.La
+
+  @property
+  def Ea(self):
+    """Get the transverse addendum contact ratio."""
+    return self.La/self.Pb
+
+  def Et(self, g2=None):
+    """Get the transverse contact ratio of gear pairs."""
+    return self.Lt(g2)/self.Pb
+
+  @property
+  def Ex(self):
+    """ Get axial contact ratio. """
+    return self.b/self.Px
+
+  def E(self, g2=None):
+    """ Get total contact ratio. """
+    return self.Et(g2) + self.Ex
+
+  def Cxavg(self, g2=None):
+    """Get the avg axial face contact line length."""
+    return self.b*self.Et(g2)
+
+  def Cxmin(self, g2=None, e=0.0001):
+    """ Get the minimum axial face contact line length (see Gear.Cxmin())."""
+    et = self.Et(g2)
+    ex = self.Ex
+    nt = (et-e) % 1
+    nx = (ex-e) % 1
+    cxavg = self.b*et
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+      return cxavg*numpy.where(self.B == 0, 1 - nt/et,
+          numpy.where(nt+nx <= 1, 1 - nt*nx/(et*ex), 1 - (1-nt)*(1-nx)/(et*ex)))
+
+  def Chavg(self, g2=None):
+    """Get the avg helical face contact line length."""
+    return self.Cxavg(g2)/numpy.cos(numpy.radians(self.Bb))
+
+  def Chmin(self, g2=None, e=0.0001):
+    """Get the minimum helical face contact line length. """
+    return self.Cxmin(g2,e)/numpy.cos(numpy.radians(self.Bb))
+
+
 def optB(ex, hx):
   """Get the required helix angle for the target axial contact ratio ex for a given gear widthfactor hx=b/m."""
   return atand(ex*pi/hx)
@@ -271,45 +494,68 @@ def optha(z, et, a=20):
 
   The optimum is with both gears having the same addendum transverse contact
   ratio and the total transverse contact ratio being at the target ha (e).
+  Ring gears have negative z (see Gear).
   """
   ea = et/2
   rp = z/2
   rb = rp*cosd(a)
-  return sqrt((ea*pi*cosd(a) + rp*sind(a))**2 + rb**2) - rp
-
-def opta(z, et, ha=1):
-  """ Get optimum pressure angle (a) for the target transverse contact ratio (et) and addendum factor (ha)."""
-  # This gets a bit hard...
-  # aet=et/2
-  # rp = z/2
-  # ra = rp + ha
-  # rb = rp*cos(a)
-  # le = sqrt(ra**2 - rb**2) # length of line of action from base circle to adendum disengagement point.
-  # lp = rp*sind(a) = sqrt(rp^2 - rb^2)  # length of line of action from base cicle to the middle pitch-point.
-  # aet = sqrt(ra^2 - rb^2) - sqrt(rp^2 - rb^2)
-  # aet = ra*sin(a+b) - rp*sin(a)
-
-
-  # # need to solve for rb, then a = acos(rb/rp) or solve for lp and a = asin(lp/rp)
-  # aet^2 = ra^2 - rb^2 + rp^2 - rb^2 - 2*sqrt((ra^2 - rb^2)*(rp^2 - rb^2))
-  #       = ra^2 + rp^2 - 2*rb^2  - 2*sqrt((ra*rp)^2 - (ra*rb)^2 - (rb*rp)^2 + rb^4))
-  #       = ra^2 + rp^2 - 2*rb^2  - 2*sqrt((ra*rp)^2 - (ra*rb)^2 - (rb*rp)^2 + rb^4))
-
-
-  # # aet = (le - rp*sin(a))/ pi*cosd(a)
-  # # aet*pi*cos(a) = le - rp*sin(a)
-  # # le = aet*pi*cos(a) + rp*sin(a)
-  # rp = z/2
-  # ra = rp + ha
-  # aet = (sqrt(ra^2 - (rp*cos(a))^2) - rp*sin(a)) / (pi*cos(a))
-  # aet*pi*cos(a) = sqrt(ra^2 - (rp*cos(a))^2) - rp*sin(a)
-
-  # R = sqrt((aet*pi)^2 + rp^2)
-  # b = atan(aet*pi/rp)
-  # le = R*sin(a+b)
-  # a + b = asin(le/R)
-  # a = asin(le/R) - b
-  # return asin(sqrt((ra**2 - rb**2)/((aet*pi)^2 + rp^2)))/atan(aet*pi/rp))
+  return copysign(sqrt((ea*pi*cosd(a) + rp*sind(a))**2 + rb**2), z) - rp
+
+def opthaArray(z, et, a=20):
+  """ Get optha() addendum factors for arrays of (z, et, a) values."""
+  ea = numpy.asarray(et)/2
+  rp = numpy.asarray(z)/2
+  ar = numpy.radians(a)
+  rb = rp*numpy.cos(ar)
+  return numpy.copysign(numpy.sqrt((ea*pi*numpy.cos(ar) + rp*numpy.sin(ar))**2 + rb**2), z) - rp
+
+def opta(z, et, ha=1, amin=1.0, amax=60.0, tol=1e-9):
+  """ Get optimum pressure angle (a) for the target transverse contact ratio (et) and addendum factor (ha).
+
+  Like optha() this is for both gears having the same addendum contact ratio
+  et/2. There is no closed form solution since the addendum contact ratio is
+  ea = (sqrt(ra^2 - (rp*cos(a))^2) - rp*sin(a)) / (pi*cos(a)), so this finds
+  the root numerically. The ea is not monotonic in a for ring gears and tiny
+  gears, so this scans amin to amax in 1 degree steps for the largest a
+  crossing et/2, then bisects it. It returns nan if there is no solution.
+  """
+  f = lambda a: Gear(z, a=a, ha=ha).Ea - et/2
+  a1 = amax
+  while a1 > amin:
+    a0 = max(amin, a1 - 1.0)
+    f0, f1 = f(a0), f(a1)
+    if (f0 >= 0) != (f1 >= 0):
+      while a1 - a0 > tol:
+        a = (a0 + a1)/2
+        if (f(a) >= 0) == (f0 >= 0):
+          a0 = a
+        else:
+          a1 = a
+      return (a0 + a1)/2
+    a1 = a0
+  return nan
+
+def optaArray(z, et, ha=1, amin=1.0, amax=60.0, tol=1e-9):
+  """ Get opta() pressure angles for arrays of (z, et, ha) values.
+
+  This does the same scan and bisection as opta() vectorized over all the
+  broadcast arrays at once, returning an array with nan for no solution.
+  """
+  z, et, ha = numpy.broadcast_arrays(*(numpy.asarray(v, dtype=float) for v in (z, et, ha)))
+  ea = et[..., None]/2
+  # Scan the 1 degree steps from amin to amax for the largest root.
+  grid = numpy.linspace(amin, amax, int(ceil(amax - amin)) + 1)
+  f = GearArray(z[..., None], a=grid, ha=ha[..., None]).Ea - ea
+  cross = (f[..., :-1] >= 0) != (f[..., 1:] >= 0)
+  i = cross.shape[-1] - 1 - numpy.argmax(cross[..., ::-1], axis=-1)
+  a0, a1 = grid[i], grid[i+1]
+  pos0 = numpy.take_along_axis(f, i[..., None], -1)[..., 0] >= 0
+  ea = ea[..., 0]
+  while numpy.max(a1 - a0, initial=0) > tol:
+    a = (a0 + a1)/2
+    same = (GearArray(z, a=a, ha=ha).Ea - ea >= 0) == pos0
+    a0, a1 = numpy.where(same, a, a0), numpy.where(same, a1, a)
+  return numpy.where(cross.any(axis=-1), (a0 + a1)/2, nan)
 
 def optStats(z1, Et, Ex, m1=1, m2=None, a1=20, a2=None, B1=0, b1=4, b2=None):
   if b2 is None: b2=b1
@@ -347,6 +593,15 @@ def MeshStats(g1, g2):
   Cxavg, Cxmin = g1.Cxavg(g2), g1.Cxmin(g2)
   return f'{Lt=:.2f} {Et=:.2f} {Ex=:.2f} {E=:.2f} {Cxavg=:.2f} {Cxmin=:.2f}'
 
+def MeshArrays(g1, g2):
+  """Get a dict of MeshStats() metric arrays for GearArray gear pairs."""
+  bad = ((g1.m != g2.m) | (g1.a != g2.a) | (g1.B != g2.B) | (g1.hx != g2.hx) |
+      ~(g1.ha + 0.1 < g2.hf) | ~(g1.hf > g2.ha + 0.1))
+  if numpy.any(bad):
+    raise ValueError(f'{numpy.count_nonzero(bad)} gear pairs do not mesh.')
+  Lt = g1.Lt(g2)
+  return dict(Lt=Lt, Et=g1.Et(g2), Ex=g1.Ex, E=g1.E(g2), Cxavg=g1.Cxavg(g2), Cxmin=g1.Cxmin(g2))
+
 def adjustm(g1, g2, m):
   """Get new z1,z2,m values when changing to a target m.
 
@@ -367,7 +622,7 @@ def optGears(g1, g2, Et=0.5, Ex=1.0, m=None, a=None, b=None):
     z1,z2,m = g1.z, g2.z, g1.m
   else:
     z1,z2,m = adjustm(g1,g2,m)
-  if a is None: a = g1.m
+  if a is None: a = g1.a
   if b is None: b = g1.b
   hx = b/m
   B = optB(Ex,hx)
@@ -375,36 +630,58 @@ def optGears(g1, g2, Et=0.5, Ex=1.0, m=None, a=None, b=None):
   hf1,hf2 = ha2+0.25, ha1+0.25
   return Gear(z1, m, a, B, ha1, hf1, hx), Gear(z2, m, a, B, ha2, hf2, hx)
 
-b = 4.0
-m1 = 0.5
-m2 = m1*(34 - 13)/(29 - 11)
-hx1,hx2 = b/m1,b/m2
-s1 = Gear( 8, m=m1, hx=hx1)
-p1 = Gear(13, m=m1, hx=hx1)
-r1 = Gear(34, m=m1, hx=hx1)
-s2 = Gear( 7, m=m2, hx=hx2)
-p2 = Gear(11, m=m2, hx=hx2)
-r2 = Gear(29, m=m2, hx=hx2)
-
-print('Optimizing the following gears.')
-print(f'{s1=!s}')
-print(f'{p1=!s}')
-print(f'{r1=!s}')
-print(f'{s2=!s}')
-print(f'{p2=!s}')
-print(f'{r2=!s}')
-
-Et,Ex,m,a,b=0.6,1.0,0.5,40,4
-
-def OptOut(n1,n2,g1,g2):
-  print(f'Optimizing {n1} + {n2} mesh:')
-  g1o,g2o = optGears(g1, g2, Et, Ex, m, a, b)
-  print(f'  {n1} -> {n1}o={g1o!s}')
-  print(f'  {n2} -> {n2}o={g2o!s}')
-  print(f'  {n1}  + {n2}  = {MeshStats(g1,g2)}')
-  print(f'  {n1}o + {n2}o = {MeshStats(g1o,g2o)}')
-
-OptOut('s1', 'p1', s1, p1)
-OptOut('p1', 'r1', p1, r1)
-OptOut('s2', 'p2', s2, p2)
-OptOut('p2', 'r2', p2, r2)
+def optGearsArray(g1, g2, Et=0.5, Ex=1.0, m=None, a=None, b=None):
+  """ Optimize GearArray gear pairs like optGears(), returning two GearArrays.
+
+  The Et, Ex, m, a, and b arguments can also be arrays.
+  """
+  if m is None:
+    z1,z2,m = g1.z, g2.z, g1.m
+  else:
+    # Like adjustm() for all the pairs.
+    d = numpy.gcd(g1.z.astype(int), g2.z.astype(int))
+    n = numpy.round(d*m/g1.m)
+    z1, z2 = g1.z*n//d, g2.z*n//d
+    m = g1.Dp/z1
+  if a is None: a = g1.a
+  if b is None: b = g1.b
+  hx = b/m
+  B = numpy.degrees(numpy.arctan(Ex*pi/hx))
+  ha1,ha2 = opthaArray(z1, Et, a), opthaArray(z2, Et, a)
+  hf1,hf2 = ha2+0.25, ha1+0.25
+  return GearArray(z1, m, a, B, ha1, hf1, hx), GearArray(z2, m, a, B, ha2, hf2, hx)
+
+if __name__ == '__main__':
+  b = 4.0
+  m1 = 0.5
+  m2 = m1*(34 - 13)/(29 - 11)
+  hx1,hx2 = b/m1,b/m2
+  s1 = Gear( 8, m=m1, hx=hx1)
+  p1 = Gear(13, m=m1, hx=hx1)
+  r1 = Gear(34, m=m1, hx=hx1)
+  s2 = Gear( 7, m=m2, hx=hx2)
+  p2 = Gear(11, m=m2, hx=hx2)
+  r2 = Gear(29, m=m2, hx=hx2)
+
+  print('Optimizing the following gears.')
+  print(f'{s1=!s}')
+  print(f'{p1=!s}')
+  print(f'{r1=!s}')
+  print(f'{s2=!s}')
+  print(f'{p2=!s}')
+  print(f'{r2=!s}')
+
+  Et,Ex,m,a,b=0.6,1.0,0.5,40,4
+
+  def OptOut(n1,n2,g1,g2):
+    print(f'Optimizing {n1} + {n2} mesh:')
+    g1o,g2o = optGears(g1, g2, Et, Ex, m, a, b)
+    print(f'  {n1} -> {n1}o={g1o!s}')
+    print(f'  {n2} -> {n2}o={g2o!s}')
+    print(f'  {n1}  + {n2}  = {MeshStats(g1,g2)}')
+    print(f'  {n1}o + {n2}o = {MeshStats(g1o,g2o)}')
+
+  OptOut('s1', 'p1', s1, p1)
+  OptOut('p1', 'r1', p1, r1)
+  OptOut('s2', 'p2', s2, p2)
+  OptOut('p2', 'r2', p2, r2)
@@ -0,0 +1,75 @@
+#!/usr/bin/pypy3
+"""Tests for efficientgears.py."""
+import unittest
+from efficientgears import *
+
+
+@unittest.skipIf(numpy is None, 'requires numpy')
+class TestGearArray(unittest.TestCase):
+
+  def setUp(self):
+    rng = numpy.random.default_rng(1)
+    n = 200
+    self.z1, self.z2 = rng.integers(6, 80, n), rng.integers(6, 80, n)
+    self.m, self.a = rng.choice([0.5, 0.8, 1.0], n), rng.choice([14.5, 20.0, 25.0, 40.0], n)
+    # Include spur gears with B=0.
+    self.B = numpy.where(rng.random(n) < 0.3, 0.0, rng.uniform(5, 35, n))
+    self.ha, self.hx = rng.uniform(0.6, 1.2, n), rng.uniform(2, 10, n)
+    self.g1 = GearArray(self.z1, self.m, self.a, self.B, self.ha, self.ha + 0.25, self.hx)
+    self.g2 = GearArray(self.z2, self.m, self.a, self.B, self.ha, self.ha + 0.25, self.hx)
+
+  def test_properties(self):
+    for i in range(len(self.g1)):
+      g = self.g1[i]
+      for k in 'b Dp Db Da Df Rp Rb Ra Rf Pp Pb Px sa sf mn Bb La Ea Ex'.split():
+        self.assertAlmostEqual(getattr(self.g1, k)[i], getattr(g, k), msg=f'{k} for {g!r}')
+      self.assertAlmostEqual(self.g1.ay(-1.25)[i], g.ay(-1.25))
+
+  def test_pairs(self):
+    mesh = MeshArrays(self.g1, self.g2)
+    for i in range(len(self.g1)):
+      g1, g2 = self.g1[i], self.g2[i]
+      self.assertAlmostEqual(mesh['Lt'][i], g1.Lt(g2))
+      self.assertAlmostEqual(mesh['Et'][i], g1.Et(g2))
+      self.assertAlmostEqual(mesh['E'][i], g1.E(g2))
+      self.assertAlmostEqual(mesh['Cxavg'][i], g1.Cxavg(g2))
+      self.assertAlmostEqual(mesh['Cxmin'][i], g1.Cxmin(g2))
+      self.assertAlmostEqual(self.g1.Chmin(self.g2)[i], g1.Chmin(g2))
+    self.assertRaises(ValueError, MeshArrays, self.g1, GearArray(self.z2))
+
+  def test_ring(self):
+    # Ring gears have negative z, and contact stops at the base circle.
+    rings = GearArray([-34, -24], 0.5, 20.0)
+    self.assertAlmostEqual(rings.La[0], Gear(-34, 0.5).La)
+    self.assertAlmostEqual(rings.La[1], 12*0.5*sind(20.0))
+    self.assertTrue(all(rings.La > Gear(34, 0.5).La))
+
+  def test_opta(self):
+    z, et, ha = [8, 13, 34, 100, -34, -60], [1.9, 1.2, 1.5, 1.8, 1.5, 2.0], [1.25, 1.0, 1.0, 0.8, 1.0, 1.0]
+    a = optaArray(z, et, ha)
+    for i in range(len(z)):
+      self.assertAlmostEqual(a[i], opta(z[i], et[i], ha[i]))
+      self.assertAlmostEqual(Gear(z[i], a=a[i], ha=ha[i]).Ea, et[i]/2)
+    self.assertTrue(numpy.isnan(optaArray(100, 0.3)))
+    self.assertTrue(isnan(opta(100, 0.3)))
+
+  def test_optGearsArray(self):
+    g1, g2 = optGearsArray(self.g1, self.g2, 1.2, 1.0, a=25.0, b=4.0)
+    for i in range(len(g1)):
+      o1, o2 = optGears(self.g1[i], self.g2[i], 1.2, 1.0, a=25.0, b=4.0)
+      self.assertEqual(repr(g1[i]), repr(o1))
+      self.assertEqual(repr(g2[i]), repr(o2))
+      self.assertAlmostEqual(g1.Et(g2)[i], 1.2)
+    # Ring gears with negative z.
+    g1, g2 = optGearsArray(GearArray([13, 14]), GearArray([-34, -37]), 1.5, 0.0)
+    self.assertTrue(numpy.allclose(g1.Et(g2), 1.5))
+
+  def test_fromgears(self):
+    gears = [Gear(8, hx=8), Gear(13, 0.5, 40, 15)]
+    ga = GearArray.fromgears(gears)
+    self.assertEqual(len(ga), 2)
+    self.assertEqual([repr(ga[i]) for i in range(2)], [repr(g) for g in gears])
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,200 @@
+#!/bin/python3
+"""
+Export gearbox outlines as DXF or SVG files.
+
+This draws the assembled outlines of every gear in a pgears gear set, with
+the planets placed around the carrier at their mesh phase. Each gear outline
+is made by rotating one cached involute.Profile tooth with array operations,
+so even large gearboxes take only milliseconds to export. Ring gears get an
+outer rim circle.
+
+Each gear is put on its own DXF layer or SVG group named after the gear, like
+"r", "p0", "p1", "s", "r2", "p2_0", "s2". The stages overlap, so use the
+layers to show one stage at a time.
+"""
+from math import pi, sin, cos
+from functools import cached_property
+from involute import profile, numpy
+
+
+class Outline(object):
+  """A gear outline placed in the gearbox.
+
+  Attributes:
+    name: the gear's name, used for its layer.
+    z, m: the gear size and module, with negative z for ring gears.
+    center: the (x,y) center of the gear.
+    angle: the rotation of the gear in radians.
+    profile: the involute.Profile of the gear teeth.
+    rim: the radius of the outer rim circle for ring gears, or None.
+  """
+
+  def __init__(self, name, z, m, center, angle, profile, rim=None):
+    self.name, self.z, self.m = name, z, m
+    self.center, self.angle, self.profile, self.rim = center, angle, profile, rim
+
+  def __repr__(self):
+    return f'{self.__class__.__name__}({self.name!r}, z={self.z}, m={self.m:.3f}, center=({self.center[0]:.3f}, {self.center[1]:.3f}))'
+
+  def points(self):
+    """Get the (n,2) points of the closed tooth outline."""
+    p = self.profile.points()
+    c, s = cos(self.angle), sin(self.angle)
+    return p @ numpy.array([[c, s], [-s, c]]) + self.center
+
+  @cached_property
+  def pts(self):
+    """The cached points()."""
+    return self.points()
+
+  @cached_property
+  def polar(self):
+    """The unwrapped increasing polar angles of pts around the center."""
+    p = self.pts - self.center
+    return numpy.unwrap(numpy.arctan2(p[:, 1], p[:, 0]))
+
+  def inside(self, q):
+    """Get which points q are inside the tooth outline.
+
+    The outline is anti-clockwise and star shaped around the center, so this
+    finds the segment at each point's angle and checks the point is on its
+    left side.
+    """
+    t0, p = self.polar, self.pts
+    d = q - self.center
+    t = (numpy.arctan2(d[:, 1], d[:, 0]) - t0[0]) % (2*pi) + t0[0]
+    j = numpy.searchsorted(t0, t) % len(p)
+    a, b = p[j - 1], p[j]
+    return (b[:, 0] - a[:, 0])*(q[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1])*(q[:, 0] - a[:, 0]) > 0
+
+
+def phase(z, t):
+  """Get the phase in teeth of a gear at angle t, with 0 at a tooth center."""
+  return t*abs(z)/(2*pi)
+
+
+def meshAngle(z1, t1, z2, t):
+  """Get the rotation of gear z2 at angle t from gear z1 with rotation t1 so they mesh.
+
+  The pitch point is at angle t from gear z1's center. For external gears
+  the pitch point is at angle t+pi from gear z2's center and its teeth move
+  the opposite way. Either way a tooth on one meets a gap on the other.
+  """
+  f1 = phase(z1, t - t1)
+  if z1 < 0 or z2 < 0:
+    return t - (f1 + 0.5)*2*pi/abs(z2)
+  return t + pi - (0.5 - f1)*2*pi/abs(z2)
+
+
+def gearOutlines(g, a=20.0, ha=1.0, hf=1.25, backlash=0.0, fillet=0.0, rim=2.0, tol=0.001):
+  """Get the Outlines of all the gears of a pgears gear set.
+
+  The rings are centered on the origin with a tooth on the +x axis, and the
+  planets are evenly spaced around the carrier starting on the +x axis. Each
+  secondary planet is rotated to mesh with the secondary ring, which gives
+  the per-planet phase offsets between the primary and secondary planets.
+  The rim is the ring wall thickness outside the root circle in modules.
+  """
+  def outline(name, z, m, center=(0.0, 0.0), angle=0.0):
+    p = profile(z, m, a, ha, hf, backlash, fillet, tol)
+    return Outline(name, z, m, numpy.array(center), angle, p, p.Rf + rim*m if z < 0 else None)
+
+  if not hasattr(g, 'Tr'):
+    # A simple gear pair with the sun at the origin and the planet on the +x axis.
+    c = (g.Ts + g.Tp)*g.m/2
+    return [outline('s', g.Ts, g.m), outline('p', g.Tp, g.m, (c, 0.0), meshAngle(g.Ts, 0.0, g.Tp, 0.0))]
+  stages = [('', g.Tr, g.Tp, g.Ts, g.m, g.sun)]
+  if hasattr(g, 'Tr2'):
+    stages.append(('2', g.Tr2, g.Tp2, g.Ts2, g.m2, g.sun2))
+  outlines = []
+  for k, Tr, Tp, Ts, m, sun in stages:
+    c = (Tr - Tp)*m/2
+    t = 2*pi*numpy.arange(g.np)/g.np
+    pk = f'p{k}_' if k else 'p'
+    outlines.append(outline(f'r{k}', -Tr, m))
+    tp = [meshAngle(-Tr, 0.0, Tp, ti) for ti in t]
+    outlines.extend(outline(f'{pk}{i}', Tp, m, (c*cos(ti), c*sin(ti)), tpi) for i, (ti, tpi) in enumerate(zip(t, tp)))
+    if sun:
+      # The sun meshes with the first planet at angle pi from the planet's center.
+      outlines.append(outline(f's{k}', Ts, m, angle=meshAngle(Tp, tp[0], Ts, pi)))
+  return outlines
+
+
+def dxfPoints(p, fmt):
+  """Get the DXF text for the (n,2) points p using a format string for one point."""
+  return (fmt * len(p)) % tuple(p.ravel())
+
+
+def writeDXF(file, outlines):
+  """Write outlines to a DXF file as closed polylines and circles on a layer per gear."""
+  with open(file, 'w') as f:
+    f.write('0\nSECTION\n2\nENTITIES\n')
+    for o in outlines:
+      l = o.name
+      f.write(f'0\nPOLYLINE\n8\n{l}\n66\n1\n70\n1\n10\n0.0\n20\n0.0\n30\n0.0\n')
+      f.write(dxfPoints(o.points(), f'0\nVERTEX\n8\n{l}\n10\n%.6f\n20\n%.6f\n30\n0.0\n'))
+      f.write(f'0\nSEQEND\n8\n{l}\n')
+      if o.rim:
+        f.write(f'0\nCIRCLE\n8\n{l}\n10\n{o.center[0]:.6f}\n20\n{o.center[1]:.6f}\n30\n0.0\n40\n{o.rim:.6f}\n')
+    f.write('0\nENDSEC\n0\nEOF\n')
+
+
+def writeSVG(file, outlines):
+  """Write outlines to an SVG file in mm as paths and circles in a group per gear."""
+  r = max(numpy.hypot(*o.center) + (o.rim or o.profile.Ra) for o in outlines)
+  with open(file, 'w') as f:
+    f.write('<svg xmlns="http://www.w3.org/2000/svg" '
+        f'width="{2*r:.3f}mm" height="{2*r:.3f}mm" viewBox="{-r:.3f} {-r:.3f} {2*r:.3f} {2*r:.3f}">\n')
+    # SVG has y pointing down, so flip it.
+    f.write('<g transform="scale(1,-1)" fill="none" stroke="black" stroke-width="0.05">\n')
+    for o in outlines:
+      f.write(f'<g id="{o.name}">\n<path d="M')
+      f.write(dxfPoints(o.points(), ' %.4f,%.4f'))
+      f.write(' Z"/>\n')
+      if o.rim:
+        f.write(f'<circle cx="{o.center[0]:.4f}" cy="{o.center[1]:.4f}" r="{o.rim:.4f}"/>\n')
+      f.write('</g>\n')
+    f.write('</g>\n</svg>\n')
+
+
+def writeOutlines(file, outlines):
+  """Write outlines to a .dxf or .svg file depending on its extension."""
+  if file.lower().endswith('.svg'):
+    writeSVG(file, outlines)
+  else:
+    writeDXF(file, outlines)
+
+
+if __name__ == '__main__':
+  import argparse, time
+  import pgears
+
+  cmdline = argparse.ArgumentParser(
+      description='Export the gear outlines of a gear set as DXF or SVG.',
+      formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+  cmdline.add_argument('-G', choices=['S', 'P', 'SR', 'SRP', 'SRI'], default='SRP',
+      help='Gear type (see pgears.py).')
+  for k in ('r', 'p', 's', 'r2', 'p2', 's2'):
+    cmdline.add_argument(f'-{k}', type=int, help=f'The {k} gear size.')
+  cmdline.add_argument('-n', type=int, default=3, help='Number of planets.')
+  cmdline.add_argument('-m', type=float, default=0.5, help='Module of the first stage gears.')
+  cmdline.add_argument('-a', type=float, default=20.0, help='Pressure angle.')
+  cmdline.add_argument('-ha', type=float, default=1.0, help='Addendum factor.')
+  cmdline.add_argument('-hf', type=float, default=1.25, help='Dedendum factor.')
+  cmdline.add_argument('-j', type=float, default=0.0, help='Backlash gap at the pitch circle in mm.')
+  cmdline.add_argument('-fillet', type=float, default=0.5, help='Root fillet as a fraction of the max.')
+  cmdline.add_argument('-rim', type=float, default=2.0, help='Ring wall thickness in modules.')
+  cmdline.add_argument('-tol', type=float, default=0.001, help='Max chordal error in mm.')
+  cmdline.add_argument('-o', default='gears.dxf', help='The .dxf or .svg output file.')
+  args = cmdline.parse_args()
+
+  if args.G == 'S':
+    g = pgears.SGears(args.s, args.p, args.m)
+  else:
+    g = getattr(pgears, f'{args.G}Gears')(Tr=args.r, Tp=args.p, Ts=args.s,
+        Tr2=args.r2, Tp2=args.p2, Ts2=args.s2, np=args.n, m=args.m)
+  print(g)
+  t = time.perf_counter()
+  outlines = gearOutlines(g, args.a, args.ha, args.hf, args.j, args.fillet, args.rim, args.tol)
+  writeOutlines(args.o, outlines)
+  print(f'Wrote {len(outlines)} outlines to {args.o} in {time.perf_counter() - t:.3f}s.')
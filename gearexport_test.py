@@ -0,0 +1,70 @@
+#!/usr/bin/pypy3
+"""Tests for gearexport.py."""
+import os
+import tempfile
+import unittest
+from gearexport import *
+import pgears
+
+
+def inside(poly, q):
+  """Get which points q are inside the closed polygon poly."""
+  x0, y0 = poly.T
+  x1, y1 = numpy.roll(poly, -1, axis=0).T
+  qx, qy = q[:, 0:1], q[:, 1:2]
+  cross = ((y0 > qy) != (y1 > qy)) & (qx < (x1 - x0)*(qy - y0)/numpy.where(y1 != y0, y1 - y0, 1) + x0)
+  return cross.sum(axis=1) % 2 == 1
+
+
+@unittest.skipIf(numpy is None, 'requires numpy')
+class TestGearExport(unittest.TestCase):
+
+  def assertMeshes(self, o1, o2):
+    """Assert meshing outlines have no points inside each other."""
+    for a, b in ((o1, o2), (o2, o1)):
+      pts = inside(a.points(), b.points())
+      self.assertFalse(pts.any() if a.z > 0 else not pts.all(), f'{a!r} overlaps {b!r}')
+
+  def test_gearOutlines(self):
+    g = pgears.SRIGears(Tr=61, Tp=23, Ts=15, Tr2=65, Tp2=23, np=4, m=0.5)
+    outlines = {o.name: o for o in gearOutlines(g, backlash=0.05, fillet=0.5)}
+    self.assertEqual(list(outlines), 'r p0 p1 p2 p3 s r2 p2_0 p2_1 p2_2 p2_3 s2'.split())
+    for k, p in (('', 'p'), ('2', 'p2_')):
+      for i in range(g.np):
+        self.assertMeshes(outlines[f'r{k}'], outlines[f'{p}{i}'])
+        self.assertMeshes(outlines[f's{k}'], outlines[f'{p}{i}'])
+    self.assertAlmostEqual(outlines['r'].rim, (61/2 + 1.25 + 2)*0.5)
+    self.assertIsNone(outlines['p0'].rim)
+    # Planets half a tooth out of phase overlap.
+    o = outlines['p1']
+    o.angle += pi/23
+    self.assertTrue(inside(o.points(), outlines['r'].points()).any())
+
+  def test_SGears(self):
+    s, p = gearOutlines(pgears.SGears(10, 31, 0.5), backlash=0.05)
+    self.assertEqual((s.name, p.name), ('s', 'p'))
+    numpy.testing.assert_allclose(p.center, (20.5*0.5, 0.0))
+    self.assertMeshes(s, p)
+
+  def test_write(self):
+    g = pgears.PGears(Tr=61, Tp=23, Ts=15, np=4, m=0.5)
+    outlines = gearOutlines(g)
+    n = sum(len(o.points()) for o in outlines)
+    with tempfile.TemporaryDirectory() as d:
+      writeOutlines(os.path.join(d, 'g.dxf'), outlines)
+      with open(os.path.join(d, 'g.dxf')) as f:
+        dxf = f.read().split('\n')
+      self.assertEqual(dxf.count('VERTEX'), n)
+      self.assertEqual(dxf.count('POLYLINE'), len(outlines))
+      self.assertEqual(dxf.count('CIRCLE'), 1)
+      self.assertEqual(dxf[-3:], ['0', 'EOF', ''])
+      writeOutlines(os.path.join(d, 'g.svg'), outlines)
+      with open(os.path.join(d, 'g.svg')) as f:
+        svg = f.read()
+      self.assertEqual(svg.count('<path'), len(outlines))
+      self.assertEqual(svg.count(' Z'), len(outlines))
+      self.assertIn('<g id="s">', svg)
+
+
+if __name__ == '__main__':
+  unittest.main()
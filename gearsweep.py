@@ -0,0 +1,136 @@
+#!/bin/python3
+"""
+Design-space sweeps of gear mesh tooth geometry.
+
+A sweep computes the contact ratios and minimum contact line lengths of a
+(z1, z2, m) gear mesh for every point on a grid of pressure angle a, helix
+angle B, face width factor hx=b/m, and addendum factor ha, using GearArray
+to compute the whole grid at once. Both gears use the same ha with
+hf=ha+0.25 like optGears(). Ring gears have negative z.
+
+Sweeps are cached keyed by their mesh and grid parameters, and can be
+exported as compressed numpy .npz files or CSV for plotting.
+"""
+from functools import lru_cache
+from efficientgears import GearArray, numpy
+from pgears import GearMeshes
+
+# The swept parameters and computed results.
+Snames = 'a B hx ha'.split()
+Rnames = 'Et Ex E Cxmin Chmin'.split()
+
+
+class Sweep(object):
+  """The results of sweeping a mesh over a grid.
+
+  Attributes:
+    mesh: the (z1, z2, m) mesh.
+    a, B, hx, ha: the 1d grid arrays for each swept parameter.
+    Et, Ex, E, Cxmin, Chmin: the result arrays with shape (na, nB, nhx, nha).
+  """
+
+  def __init__(self, z1, z2, m, a, B, hx, ha):
+    if numpy is None:
+      raise ImportError('Sweep requires numpy.')
+    self.mesh = z1, z2, m
+    self.a, self.B, self.hx, self.ha = (numpy.array(v, dtype=float) for v in (a, B, hx, ha))
+    a, B, hx, ha = numpy.meshgrid(self.a, self.B, self.hx, self.ha, indexing='ij', sparse=True)
+    g1 = GearArray(z1, m, a, B, ha, ha + 0.25, hx)
+    g2 = GearArray(z2, m, a, B, ha, ha + 0.25, hx)
+    self.Et, self.Ex, self.E = g1.Et(g2), g1.Ex, g1.E(g2)
+    self.Cxmin, self.Chmin = g1.Cxmin(g2), g1.Chmin(g2)
+    # Broadcast results that don't depend on all the parameters into read-only views.
+    for k in Rnames:
+      setattr(self, k, numpy.broadcast_to(getattr(self, k), self.shape))
+
+  @property
+  def shape(self):
+    return len(self.a), len(self.B), len(self.hx), len(self.ha)
+
+  def __repr__(self):
+    return f'{self.__class__.__name__}(mesh={self.mesh}, shape={self.shape})'
+
+  def best(self, name='Cxmin'):
+    """Get a dict of the parameters and results at the grid point with the max named result."""
+    i = numpy.unravel_index(numpy.nanargmax(getattr(self, name)), self.shape)
+    return dict(zip(Snames + Rnames,
+        [float(getattr(self, k)[j]) for k,j in zip(Snames, i)] + [float(getattr(self, k)[i]) for k in Rnames]))
+
+  def rows(self):
+    """Get a 2d array with a row of the Snames and Rnames values for each grid point."""
+    grid = numpy.meshgrid(self.a, self.B, self.hx, self.ha, indexing='ij')
+    return numpy.stack([v.ravel() for v in grid] + [getattr(self, k).ravel() for k in Rnames], axis=1)
+
+  def savez(self, file):
+    """Save as a compressed numpy .npz file with float32 results."""
+    numpy.savez_compressed(file, mesh=numpy.array(self.mesh),
+        **{k: getattr(self, k) for k in Snames}, **{k: getattr(self, k).astype(numpy.float32) for k in Rnames})
+
+  def savecsv(self, file):
+    """Save as a CSV file with a row for each grid point."""
+    numpy.savetxt(file, self.rows(), fmt='%.6g', delimiter=',', header=','.join(Snames + Rnames), comments='')
+
+
+@lru_cache(maxsize=256)
+def _sweep(z1, z2, m, a, B, hx, ha):
+  return Sweep(z1, z2, m, a, B, hx, ha)
+
+
+def sweep(z1, z2, m, a=20.0, B=0.0, hx=1.0, ha=1.0):
+  """Get the cached Sweep of a (z1, z2, m) mesh.
+
+  The a, B, hx, ha grid values can be numbers or iterables of numbers.
+  """
+  grid = (tuple(float(x) for x in numpy.atleast_1d(v)) for v in (a, B, hx, ha))
+  return _sweep(z1, z2, m, *grid)
+
+
+def sweepGears(g, a=20.0, B=0.0, hx=1.0, ha=1.0):
+  """Get a dict of the Sweeps for each (z1, z2, m) mesh of a pgears gear set."""
+  return {k: sweep(*k, a, B, hx, ha) for k in GearMeshes(g)}
+
+
+def GridType(s):
+  """An argparse type for "start:stop:num" linspace or "v1,v2,..." grids."""
+  if ':' in s:
+    start, stop, num = s.split(':')
+    return numpy.linspace(float(start), float(stop), int(num))
+  return [float(v) for v in s.split(',')]
+
+
+if __name__ == '__main__':
+  import argparse, os
+  import pgears
+
+  cmdline = argparse.ArgumentParser(
+      description='Sweep the tooth geometry of the meshes of a gear set.',
+      formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+  cmdline.add_argument('-G', choices=['S', 'P', 'SR', 'SRP', 'SRI'], default='SRP',
+      help='Gear type (see pgears.py).')
+  for k in ('r', 'p', 's', 'r2', 'p2', 's2'):
+    cmdline.add_argument(f'-{k}', type=int, help=f'The {k} gear size.')
+  cmdline.add_argument('-n', type=int, default=3, help='Number of planets.')
+  cmdline.add_argument('-m', type=float, default=0.5, help='Module of the first stage gears.')
+  cmdline.add_argument('-a', type=GridType, default='14.5:40:52', help='Pressure angle grid.')
+  cmdline.add_argument('-B', type=GridType, default='0:40:41', help='Helix angle grid.')
+  cmdline.add_argument('-hx', type=GridType, default='2:16:29', help='Face width factor b/m grid.')
+  cmdline.add_argument('-ha', type=GridType, default='0.6:1.2:13', help='Addendum factor grid.')
+  cmdline.add_argument('-o', help='Save the sweeps to files like "sweep.npz" or "sweep.csv" with the mesh added to the name.')
+  args = cmdline.parse_args()
+
+  if args.G == 'S':
+    g = pgears.SGears(args.s, args.p, args.m)
+  else:
+    g = getattr(pgears, f'{args.G}Gears')(Tr=args.r, Tp=args.p, Ts=args.s,
+        Tr2=args.r2, Tp2=args.p2, Ts2=args.s2, np=args.n, m=args.m)
+  print(g)
+  for (z1, z2, m), s in sweepGears(g, args.a, args.B, args.hx, args.ha).items():
+    best = ' '.join(f'{k}={v:.3g}' for k,v in s.best().items())
+    print(f'{z1}/{z2} m={m:.3f}: best {best}')
+    if args.o:
+      base, ext = os.path.splitext(args.o)
+      file = f'{base}-{z1}-{z2}{ext}'
+      if ext == '.csv':
+        s.savecsv(file)
+      else:
+        s.savez(file)
@@ -0,0 +1,49 @@
+#!/usr/bin/pypy3
+"""Tests for gearsweep.py."""
+import os
+import tempfile
+import unittest
+from gearsweep import *
+from efficientgears import Gear
+import pgears
+
+
+@unittest.skipIf(numpy is None, 'requires numpy')
+class TestSweep(unittest.TestCase):
+
+  def test_sweep(self):
+    s = sweep(13, -34, 0.5, [20.0, 25.0, 30.0], [0.0, 15.0], numpy.linspace(4, 8, 5), [0.8, 1.0])
+    self.assertEqual(s.shape, (3, 2, 5, 2))
+    self.assertEqual(s.Cxmin.shape, s.shape)
+    for i,j,k,l in [(0,0,0,0), (1,1,2,1), (2,1,4,0)]:
+      a, B, hx, ha = s.a[i], s.B[j], s.hx[k], s.ha[l]
+      g1, g2 = Gear(13, 0.5, a, B, ha, ha+0.25, hx), Gear(-34, 0.5, a, B, ha, ha+0.25, hx)
+      self.assertAlmostEqual(s.Et[i,j,k,l], g1.Et(g2))
+      self.assertAlmostEqual(s.E[i,j,k,l], g1.E(g2))
+      self.assertAlmostEqual(s.Cxmin[i,j,k,l], g1.Cxmin(g2))
+      self.assertAlmostEqual(s.Chmin[i,j,k,l], g1.Chmin(g2))
+    # Sweeps are cached.
+    self.assertIs(sweep(13, -34, 0.5, (20, 25, 30), (0, 15), numpy.linspace(4, 8, 5), (0.8, 1.0)), s)
+    best = s.best('E')
+    self.assertEqual(best['E'], s.E.max())
+
+  def test_sweepGears(self):
+    g = pgears.SRPGears(Tr=34, Tp=13, Ts=8, Tr2=37, Tp2=14, np=3, m=0.5)
+    sweeps = sweepGears(g, [20.0, 25.0], 10.0, 8.0)
+    self.assertEqual(list(sweeps), pgears.GearMeshes(g))
+
+  def test_save(self):
+    s = sweep(8, 13, 0.5, [20.0, 25.0], [0.0, 15.0], 4.0, 1.0)
+    with tempfile.TemporaryDirectory() as d:
+      s.savez(os.path.join(d, 's.npz'))
+      data = numpy.load(os.path.join(d, 's.npz'))
+      self.assertTrue(numpy.allclose(data['Cxmin'], s.Cxmin))
+      self.assertEqual(list(data['a']), [20.0, 25.0])
+      s.savecsv(os.path.join(d, 's.csv'))
+      rows = numpy.loadtxt(os.path.join(d, 's.csv'), delimiter=',', skiprows=1)
+      self.assertEqual(rows.shape, (4, 9))
+      self.assertTrue(numpy.allclose(rows, s.rows(), rtol=1e-5))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,98 @@
+#!/bin/python3
+"""
+Mass and reflected inertia of gearboxes.
+
+Each gear is modelled as a solid disk of its pitch diameter, which is about
+the average of the teeth and gaps, with face width b in mm. Ring gears are an
+annulus from the pitch diameter out to the rim, which is rim modules outside
+the root diameter Dext. The carrier is a plate of thickness tc filling the
+ring tips, except for SRIGears which have no carrier. Densities are in g/cm^3,
+so the default is for PLA.
+
+The reflected inertia J at the input is the sum of each moving part's
+inertia times the square of its speed relative to the input, including the
+planets orbiting with the carrier. The kinematics match meshsim.py with the
+first stage ring fixed. The input is the sun for PGears, SRPGears and
+SRIGears, or the carrier for SRGears. Only the parts inside the gearbox are
+included, not the motor or load.
+
+Masses are in g and inertias in g.cm^2, like motor datasheets. Everything is
+vectorized over arrays of gear sizes, so a whole batch of candidate gears is
+computed at once.
+"""
+from math import pi, inf
+from batchstage import BatchStage
+from efficientgears import numpy
+
+
+def disk(D, b, rho, d=0.0):
+  """Get the (mass, inertia) in g and g.cm^2 of annular disks with diameters D and d in mm."""
+  mass = rho*pi*(D**2 - d**2)/4*b/1000
+  return mass, mass*(D**2 + d**2)/8/100
+
+
+def inertia(Tr, Tp, Ts, Tr2=None, Tp2=None, Ts2=None, np=3, m=0.5, sun=True, sun2=False,
+    b=5.0, rho=1.24, rim=2.0, tc=2.0):
+  """Get the (mass, J) arrays of arrays of gear sizes.
+
+  The gear sizes and modules can be numbers or broadcastable arrays, with Tr
+  None for SGears which are a pair of Ts and Tp gears with Ts as the input,
+  and Tr2 None for single stage gears. The sun and sun2 flags are if Ts is a
+  sun gear and Ts2 is an idler sun gear with no carrier.
+  """
+  Tp, Ts, m = (numpy.asarray(v, dtype=float) for v in (Tp, Ts, m))
+  if Tr is None:
+    (ms, Is), (mp, Ip) = disk(Ts*m, b, rho), disk(Tp*m, b, rho)
+    return ms + mp, Is + Ip*(Ts/Tp)**2
+  Tr = numpy.asarray(Tr, dtype=float)
+  c = (Tr - Tp)*m/2
+  # The speeds of the carrier and planets relative to the input.
+  wc = Ts/(Ts + Tr) if sun else numpy.ones_like(Tr)
+  wp = wc*(1 - Tr/Tp)
+  # The planets and the fixed ring.
+  mp, Ip = disk(Tp*m, b, rho)
+  mr, _ = disk((Tr + 2.5 + 2*rim)*m, b, rho, Tr*m)
+  mass, J = np*mp + mr, 0.0
+  if sun:
+    ms, Is = disk(Ts*m, b, rho)
+    mass, J = mass + ms, J + Is
+  if not sun2:
+    mc, Ic = disk((Tr - 2)*m, tc, rho)
+    mass, J = mass + mc, J + Ic*wc**2
+  if Tr2 is not None:
+    Tr2, Tp2 = numpy.asarray(Tr2, dtype=float), numpy.asarray(Tp2, dtype=float)
+    m2 = (Tr - Tp)*m/(Tr2 - Tp2)
+    mp2, Ip2 = disk(Tp2*m2, b, rho)
+    mr2, Ir2 = disk((Tr2 + 2.5 + 2*rim)*m2, b, rho, Tr2*m2)
+    wr2 = wc*(Tr2*Tp - Tp2*Tr)/(Tr2*Tp)
+    mp, Ip = mp + mp2, Ip + Ip2
+    mass, J = mass + np*mp2 + mr2, J + Ir2*wr2**2
+    if sun2:
+      # The idler sun2 turns with the secondary planets relative to the carrier.
+      Ts2 = numpy.asarray(Ts2, dtype=float)
+      ms2, Is2 = disk(Ts2*m2, b, rho)
+      ws2 = wc*(1 + Tp2*Tr/(Tp*Ts2))
+      mass, J = mass + ms2, J + Is2*ws2**2
+  # The planets spin and orbit with the carrier.
+  J = J + np*(Ip*wp**2 + mp*c**2/100*wc**2)
+  return mass, J
+
+
+class Inertia(BatchStage):
+  """A search stage that computes the mass and reflected inertia of gears.
+
+  This sets the mass and J gear attributes, computing them for each batch of
+  gears in one vectorized call, and only keeps gears with J <= Jmax.
+  """
+  columns = 'Tr Tp Ts Tr2 Tp2 Ts2 np m'.split()
+  names = ['mass', 'J']
+
+  def __init__(self, b=5.0, rho=1.24, rim=2.0, tc=2.0, Jmax=inf):
+    super().__init__()
+    self.b, self.rho, self.rim, self.tc, self.Jmax = b, rho, rim, tc, Jmax
+
+  def compute(self, sun, sun2, Tr=None, Tp=None, Ts=None, Tr2=None, Tp2=None, Ts2=None, np=3, m=0.5):
+    return inertia(Tr, Tp, Ts, Tr2, Tp2, Ts2, np, m, sun, sun2, self.b, self.rho, self.rim, self.tc)
+
+  def keep(self, g):
+    return g.J <= self.Jmax
@@ -0,0 +1,48 @@
+#!/usr/bin/pypy3
+"""Tests for inertia.py."""
+import unittest
+from math import pi
+from inertia import *
+import pgears
+
+
+@unittest.skipIf(numpy is None, 'requires numpy')
+class TestInertia(unittest.TestCase):
+
+  def test_disk(self):
+    # A 10mm x 10mm water cylinder is 0.785g and its inertia is m*r^2/2.
+    mass, I = disk(10.0, 10.0, 1.0)
+    self.assertAlmostEqual(mass, pi/4)
+    self.assertAlmostEqual(I, pi/4*0.5**2/2)
+    mass, I = disk(10.0, 10.0, 1.0, 10.0)
+    self.assertEqual((mass, I), (0.0, 0.0))
+
+  def test_inertia(self):
+    # A planetary has the sun at the input speed and the carrier and planets at 1/R.
+    m, b = 1.0, 4.0
+    mass, J = inertia(60, 24, 12, np=3, m=m, b=b, tc=0.0)
+    (ms, Is), (mp, Ip), (mr, _) = disk(12.0, b, 1.24), disk(24.0, b, 1.24), disk(66.5, b, 1.24, 60.0)
+    wc, wp = 1/6, (1 - 60/24)/6
+    self.assertAlmostEqual(float(mass), ms + 3*mp + mr)
+    self.assertAlmostEqual(float(J), Is + 3*(Ip*wp**2 + mp*(18/10)**2*wc**2))
+    # The arrays are computed together.
+    mass, J = inertia([61, 61], [23, 23], [15, 15], [64, 65], [24, 23], m=0.5)
+    for i, (Tr2, Tp2) in enumerate([(64, 24), (65, 23)]):
+      self.assertAlmostEqual(J[i], inertia(61, 23, 15, Tr2, Tp2, m=0.5)[1])
+    # A split ring driven by the carrier has much more reflected inertia.
+    self.assertGreater(inertia(61, 23, 0, 64, 24, m=0.5, sun=False)[1], 10*J[0])
+
+  def test_Inertia(self):
+    gears = [pgears.SRIGears(Tr=61, Tp=23, Ts=15, Tr2=65, Tp2=23, np=4, m=0.5),
+        pgears.SRIGears(Tr=34, Tp=13, Ts=8, Tr2=35, Tp2=14, np=3, m=0.5)]
+    self.assertEqual(list(Inertia().iterGears(gears, n=1)), gears)
+    self.assertGreater(gears[0].mass, gears[1].mass)
+    self.assertGreater(gears[0].J, gears[1].J)
+    self.assertEqual(list(Inertia(Jmax=gears[1].J).iterGears(gears)), gears[1:])
+    g = pgears.SGears(10, 31, 0.5)
+    self.assertEqual(list(Inertia().iterGears([g])), [g])
+    self.assertAlmostEqual(g.J, disk(5.0, 5.0, 1.24)[1] + disk(15.5, 5.0, 1.24)[1]*(10/31)**2)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,207 @@
+#!/bin/python3
+"""
+Gear searches restricted to an inventory of available gears.
+
+Instead of searching through ranges of gear sizes and modules, these only
+use gears from a catalogue of stocked parts. The catalogue is a text file
+with one gear per line as;
+
+  z m [a [qty [name]]]
+
+with whitespace or comma separated fields, where z is the gear size and is
+negative for ring gears, m is the module, a is the pressure angle which
+defaults to 20, qty is the number in stock which defaults to unlimited, and
+name is an ignored description. Blank lines and '#' comments are ignored.
+
+The catalogue is loaded into hash indexes of the parts keyed by (m, z), and
+lists of the ring and external gear sizes of each module. The searches join
+over these indexes;
+
+* Stage one: for each module, every stocked ring r and planet p that fit
+  together with n planets in stock, where the sun s = r - 2*p must also be in
+  stock for gear types with a sun. All meshing gears must have a common
+  pressure angle.
+* Stage two: the split ring r2,p2,m2 stages are indexed by their planet
+  center distance m2*(r2 - p2) rounded to tol, so the stage one and stage
+  two pairs on the same carrier are found with dict lookups.
+
+So searches against catalogues of thousands of parts only ever look at
+combinations of gears that are actually available.
+"""
+import re
+from math import inf
+from collections import defaultdict
+import pgears
+from pgears import maxTp, WhereStages, iterCounts
+
+
+class Inventory(object):
+  """An index of the stocked gears for searching.
+
+  The parts dict maps (m, z) keys to {a: qty} dicts of the stocked pressure
+  angles and quantities, and the rings and gears dicts map modules to the
+  sorted lists of ring and external gear sizes.
+  """
+
+  def __init__(self, parts=(), tol=0.01):
+    self.tol = tol
+    self.parts = defaultdict(dict)
+    for part in parts:
+      self.add(*part)
+    self._sort()
+
+  @classmethod
+  def load(cls, path, tol=0.01):
+    """Load an Inventory from a catalogue file.
+
+    This raises a ValueError naming the file and line for invalid lines.
+    """
+    parts = []
+    with open(path) as f:
+      for i, line in enumerate(f, 1):
+        fields = re.split(r'[\s,]+', line.split('#', 1)[0].strip())
+        if not fields[0]:
+          continue
+        try:
+          if len(fields) < 2:
+            raise ValueError('needs at least z and m fields')
+          z, m, a, qty = (fields + [20.0, inf][len(fields) - 2:])[:4]
+          parts.append((int(z), float(m), float(a), float(qty)))
+        except ValueError as e:
+          raise ValueError(f'{path}:{i}: invalid gear {line.strip()!r}, {e}.') from None
+    return cls(parts, tol)
+
+  def add(self, z, m, a=20.0, qty=inf):
+    """Add qty stocked gears with size z, module m and pressure angle a."""
+    angles = self.parts[(m, z)]
+    angles[a] = angles.get(a, 0) + qty
+    self._sorted = False
+
+  def _sort(self):
+    self.rings, self.gears = defaultdict(list), defaultdict(list)
+    for m, z in sorted(self.parts, key=lambda k: (k[0], abs(k[1]))):
+      (self.rings if z < 0 else self.gears)[m].append(abs(z))
+    self._sorted = True
+
+  def __len__(self):
+    return len(self.parts)
+
+  def angles(self, m, ring, *zs, n=1):
+    """Get the pressure angles stocked for a ring and external gears of module m.
+
+    The first external gear is the planet, which needs n in stock.
+    """
+    angles = self.parts.get((m, -ring), {}).keys()
+    for i, z in enumerate(zs):
+      stock = self.parts.get((m, z), {})
+      angles = [a for a in angles if stock.get(a, 0) >= (n if i == 0 else 1)]
+    return angles
+
+  def iterStages(self, n=3, sun=True):
+    """Iterate through the stocked r,p,s,m planetary stages.
+
+    If sun is true the sun must be stocked and mesh with the ring, otherwise
+    s is the gap between the planets.
+    """
+    if not self._sorted:
+      self._sort()
+    for m, rings in self.rings.items():
+      for r in rings:
+        pmax = maxTp(rmax=r, n=n)
+        for p in self.gears[m]:
+          if p > pmax:
+            break
+          s = r - 2*p
+          if sun:
+            if (r + s) % n or not self.angles(m, r, p, s, n=n):
+              continue
+          elif s < 2 or not self.angles(m, r, p, n=n):
+            continue
+          yield r, p, s, m
+
+  def stage2Index(self, n=3, sun2=False):
+    """Get a dict of the second stage r2,p2,s2,m2 lists keyed by rounded center distance."""
+    index = defaultdict(list)
+    for r2, p2, s2, m2 in self.iterStages(n, sun2):
+      index[round(m2*(r2 - p2)/self.tol)].append((r2, p2, s2, m2))
+    return index
+
+  def iterItems(self, kind='SRPGears', n=3, where1=None, where2=None):
+    """Iterate through the (sizes..., m) items of stocked gears like pgears.iterRPS2M()."""
+    sun, two, sun2 = kind in ('PGears', 'SRPGears', 'SRIGears'), kind != 'PGears', kind == 'SRIGears'
+    index = two and self.stage2Index(n, sun2)
+    for r, p, s, m in self.iterStages(n, sun):
+      if where1 and not where1(r, p, s):
+        continue
+      if not two:
+        yield r, p, s, m
+        continue
+      c = m*(r - p)
+      k = round(c/self.tol)
+      for r2, p2, s2, m2 in (i for k in (k-1, k, k+1) for i in index.get(k, ())):
+        if abs(m2*(r2 - p2) - c) > self.tol or r*p2 == p*r2:
+          continue
+        if where2 and not where2(r, p, s, r2, p2, s2):
+          continue
+        yield r, p, s, r2, p2, s2, m
+
+  def gearIter(self, G='SRP'):
+    """Get an iter<G>Gears() style function for searching the stocked gears with getGears()."""
+    cls = getattr(pgears, f'{G}Gears')
+
+    def iterGears(n=3, where=None, orders=None, counts=False):
+      where1, where2, where = WhereStages(where)
+      items = self.iterItems(cls.__name__, n, where1, where2)
+      if counts:
+        yield from iterCounts(cls, items, n, where)
+        return
+      for *sizes, m in items:
+        g = cls(*sizes, np=n, m=m) if len(sizes) == 3 else cls(*sizes, None, None, n, m)
+        if not where or where(g):
+          yield g
+    iterGears.__name__ = f'iter{G}Gears'
+    return iterGears
+
+
+if __name__ == '__main__':
+  import argparse, time
+
+  cmdline = argparse.ArgumentParser(
+      description='Find planetary and split-ring gears using only gears from a catalogue of stocked parts.',
+      formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+  cmdline.add_argument('catalogue',
+      help='Catalogue file of stocked gears as "z m [a [qty [name]]]" lines, with negative z for rings.')
+  cmdline.add_argument('-G', choices=['P', 'SR', 'SRP', 'SRI'], default='SRP',
+      help='Gear type (see pgears.py).')
+  cmdline.add_argument('-R', type=float, default=100000.0,
+      help='Target ratio to find.')
+  cmdline.add_argument('-N', type=int, default=4,
+      help='List the top n gears closest to the target ratio.')
+  cmdline.add_argument('-d', type=int, default=2,
+      help='Ratio histogram buckets per order of magnitude.')
+  cmdline.add_argument('-O', type=lambda s: s.split(','),
+      help='Rank by objectives instead of closest to R (see pgears.py).')
+  cmdline.add_argument('-W', type=lambda s: [float(w) for w in s.split(',')],
+      help='Objective weights for listing the top n by weighted sum instead of the Pareto front.')
+  cmdline.add_argument('-Pmax', type=int, default=100,
+      help='Maximum number of gears kept in the Pareto front.')
+  cmdline.add_argument('--where', type=pgears.WhereType(pgears.Wnames),
+      help=f'Expression constraint using {",".join(pgears.Wnames)}.')
+  cmdline.add_argument('--count-only', action='store_true',
+      help='Only count the gears and show the ratio histogram, without listing the top gears.')
+  cmdline.add_argument('-n', type=int, default=3,
+      help='Number of planets.')
+  cmdline.add_argument('-tol', type=float, default=0.01,
+      help='Tolerance in mm for matching the planet center distances of split ring stages.')
+  args = cmdline.parse_args()
+
+  t = time.perf_counter()
+  try:
+    inv = Inventory.load(args.catalogue, args.tol)
+  except ValueError as e:
+    cmdline.error(str(e))
+  print(f'loaded {len(inv)} stocked gears in {time.perf_counter() - t:.3f}s.')
+  pgears.getGears(args.R, inv.gearIter(args.G), topn=args.N, histd=args.d,
+      objectives=args.O, weights=args.W, pmax=args.Pmax, where=args.where,
+      count_only=args.count_only, n=args.n)
+  print(f'searched in {time.perf_counter() - t:.3f}s.')
@@ -0,0 +1,80 @@
+#!/usr/bin/pypy3
+"""Tests for inventory.py."""
+import os
+import tempfile
+import unittest
+from inventory import *
+
+Catalogue = """\
+# ring gears
+-60 0.5
+-61 0.5 20 1 spare ring
+-64, 0.5
+-65 0.5
+-48 0.6
+# external gears
+23 0.5 20 4
+24 0.5
+12 0.5
+15 0.5
+19 0.5
+18 0.6
+14 0.6 20 2
+12 0.6 25
+"""
+
+
+class TestInventory(unittest.TestCase):
+
+  def setUp(self):
+    fd, self.path = tempfile.mkstemp()
+    with os.fdopen(fd, 'w') as f:
+      f.write(Catalogue)
+    self.inv = Inventory.load(self.path)
+
+  def tearDown(self):
+    os.remove(self.path)
+
+  def test_load(self):
+    self.assertEqual(len(self.inv), 13)
+    self.assertEqual(self.inv.parts[(0.5, -61)], {20.0: 1})
+    self.assertEqual(self.inv.parts[(0.6, 12)], {25.0: inf})
+    self.assertEqual(self.inv.rings[0.5], [60, 61, 64, 65])
+    self.assertEqual(self.inv.gears[0.6], [12, 14, 18])
+    for bad in ('23', '23 0.5 spare'):
+      with open(self.path, 'a') as f:
+        f.write(bad + '\n')
+      with self.assertRaises(ValueError) as e:
+        Inventory.load(self.path)
+      self.assertIn(f'{self.path}:{Catalogue.count(chr(10)) + 1}: invalid gear {bad!r}', str(e.exception))
+      with open(self.path, 'w') as f:
+        f.write(Catalogue)
+
+  def test_iterStages(self):
+    stages = list(self.inv.iterStages(3, sun=True))
+    # These are all the stocked P stages.
+    expect = [g for r in (60, 61, 64, 65) for g in pgears.iterPGears(cr=r, cp=[12, 15, 19, 23, 24], cm=0.5)
+        if (0.5, g.Ts) in self.inv.parts]
+    self.assertEqual(stages, [(g.Tr, g.Tp, g.Ts, 0.5) for g in expect])
+    # Planets must be in stock, and mesh with the same pressure angle.
+    self.assertNotIn((48, 18, 12, 0.6), stages)
+    self.assertIn((48, 18, 12, 0.6), Inventory([(-48, 0.6), (18, 0.6), (12, 0.6)]).iterStages(3))
+    self.assertNotIn((48, 14, 20, 0.6), self.inv.iterStages(3, sun=False))
+    self.assertIn((48, 14, 20, 0.6), self.inv.iterStages(2, sun=False))
+
+  def test_gearIter(self):
+    gears = list(self.inv.gearIter('SRP')(n=3))
+    self.assertTrue(gears)
+    for g in gears:
+      self.assertIn((g.m, g.Ts), self.inv.parts)
+      # The second stage center distance matches a stocked module.
+      self.assertTrue(any(abs(g.m2 - m) < 0.001 and (m, g.Tp2) in self.inv.parts for m in (0.5, 0.6)))
+    self.assertIn(((60, 24, 12, 48, 18), 0.5), [((g.Tr, g.Tp, g.Ts, g.Tr2, g.Tp2), g.m) for g in gears])
+    where = pgears.WhereType(pgears.Wnames)('m2 > 0.55')
+    self.assertEqual([str(g) for g in self.inv.gearIter('SRP')(where=where)], [str(g) for g in gears if g.m2 > 0.55])
+    counts = list(self.inv.gearIter('SRP')(counts=True))
+    self.assertEqual(sum(k for _, k, _, _ in counts), len(gears))
+
+
+if __name__ == '__main__':
+  unittest.main()
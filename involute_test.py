@@ -0,0 +1,82 @@
+#!/usr/bin/pypy3
+"""Tests for involute.py."""
+import unittest
+from math import cos, sin
+from efficientgears import Gear
+from involute import *
+
+
+def maxChordErr(p, pts, n=50):
+  """Get the max distance of the flank involute between points pts from their chords."""
+  r = numpy.hypot(*pts.T)
+  t = numpy.sqrt(numpy.maximum(0, (r/p.Rb)**2 - 1))
+  # Dense involute points between each pair of sample points.
+  tt = numpy.linspace(t[:-1], t[1:], n).T
+  q = involute(p.Rb, tt.ravel(), p.tb, p.s)
+  return chordErr(numpy.repeat(pts[:-1], n, axis=0), numpy.repeat(pts[1:], n, axis=0), q).max()
+
+
+@unittest.skipIf(numpy is None, 'requires numpy')
+class TestProfile(unittest.TestCase):
+
+  def test_flank(self):
+    for z in (8, 20, 60, -30, -300):
+      p = Profile(z, 0.5, 20.0, 1.0, 1.25)
+      r, t = numpy.hypot(*p.flank.T), numpy.arctan2(p.flank[:, 1], p.flank[:, 0])
+      for ri, ti in zip(r, t):
+        self.assertAlmostEqual(ti, p.angle(ri))
+      # The tip thickness matches the Gear's tooth thickness at the tip.
+      g = Gear(z, 0.5, 20.0, ha=1.0, hf=1.25)
+      self.assertAlmostEqual(2*p.Ra*p.angle(p.Ra), g.sa*g.m)
+
+  def test_tolerance(self):
+    for z, tol in ((20, 0.001), (8, 0.01), (-60, 0.0001)):
+      p = Profile(z, 1.0, tol=tol)
+      self.assertLessEqual(maxChordErr(p, p.flank[p.flank[:, 0]**2 + p.flank[:, 1]**2 >= p.Rb**2]), tol)
+      self.assertLessEqual(chordErr(p.tip[:-1], p.tip[1:], (p.tip[:-1] + p.tip[1:])/2).max(), tol)
+    # Fewer points than SpurGear.fs's fixed 1/50 step at the same accuracy.
+    p = Profile(20, 1.0)
+    t = numpy.r_[numpy.arange(0, p.rollr(p.Ra), 1/50), p.rollr(p.Ra)]
+    pts = involute(p.Rb, t, p.tb)
+    p = Profile(20, 1.0, tol=maxChordErr(p, pts))
+    self.assertLess(len(p.flank), 0.8*len(pts))
+
+  def test_fillet(self):
+    for z in (8, 20, 60, -30, -300):
+      for fillet in (0.5, 1.0):
+        p = Profile(z, 1.0, 20.0, 1.0, 1.25, 0.1, fillet)
+        tc, tf, rf = p.filletAt(p.rho)
+        cr = p.Rf + p.s*p.rho
+        c = numpy.array([cr*cos(tc), cr*sin(tc)])
+        d = numpy.hypot(*(p.rfillet - c).T)
+        numpy.testing.assert_allclose(d, p.rho)
+        # The fillet meets the root and flank and doesn't cut into the flank.
+        numpy.testing.assert_allclose(p.rfillet[0], p.root[-1], atol=1e-9)
+        numpy.testing.assert_allclose(p.rfillet[-1], p.flank[0], atol=1e-9)
+        self.assertGreaterEqual(numpy.hypot(*(p.flank - c).T).min(), p.rho - 1e-9)
+        if fillet == 1.0:
+          self.assertAlmostEqual(tc, p.gap)
+
+  def test_points(self):
+    for z in (8, -30):
+      p = Profile(z, 1.0, fillet=0.5)
+      pts = p.points()
+      t = numpy.unwrap(numpy.arctan2(pts[:, 1], pts[:, 0]))
+      # Radial flanks inside the base circle have no change in angle.
+      self.assertTrue(numpy.all(numpy.diff(t) > -1e-12))
+      self.assertLess(t[-1] - t[0], 2*numpy.pi)
+      self.assertEqual(len(pts), abs(z)*(len(p.tooth()) - 1))
+      r = numpy.hypot(*pts.T)
+      self.assertAlmostEqual(r.min(), min(p.Ra, p.Rf))
+      self.assertAlmostEqual(r.max(), max(p.Ra, p.Rf))
+
+  def test_profile(self):
+    g = Gear(-40, 0.8, 25.0, ha=0.9, hf=1.15)
+    p = profileGear(g, 0.05, 1.0)
+    self.assertIs(p, profile(-40, 0.8, 25.0, 0.9, 1.15, 0.05, 1.0))
+    self.assertEqual(repr(p), 'Profile(z=-40, m=0.8, a=25, ha=0.9, hf=1.15, backlash=0.05, fillet=1, tol=0.001)')
+    self.assertFalse(p.flank.flags.writeable)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,158 @@
+#!/bin/python3
+"""
+Mesh phase and tooth engagement time-series simulation.
+
+This simulates the kinematics of a pgears gear set over carrier rotations
+with the first stage ring fixed and the carrier as the input. For every mesh
+of every planet it computes the mesh phase in fractions of a tooth and the
+number of engaged tooth pairs at each carrier angle, vectorized over all the
+angle samples at once.
+
+The engaged tooth pair count of a mesh is the number of tooth pairs on the
+contact path, which has an average of the transverse contact ratio Et. The
+sum of the counts over the planets is proportional to the mesh stiffness of a
+stage, and its spectrum in orders of the carrier rotation shows the mesh
+frequencies that excite vibration at the output.
+
+The phase of planet i is the number of teeth past a tooth center at the pitch
+point, which at the start of the ring meshes is the Pp*i and Pp2*i phase
+offsets of pgears.
+"""
+from math import pi
+from functools import cached_property
+from efficientgears import Gear, numpy
+
+
+def engaged(phase, Ea1, Ea2):
+  """Get the number of engaged tooth pairs at mesh phases with addendum contact ratios Ea1 and Ea2.
+
+  Tooth pairs are on the contact path from -Ea2 to Ea1 base pitches around
+  the pitch point, and a pair is at the pitch point when the phase is 0.5.
+  """
+  x = phase - 0.5
+  return (numpy.floor(Ea1 - x) - numpy.ceil(-Ea2 - x) + 1).astype(int)
+
+
+class MeshSim(object):
+  """A simulation of the meshes of a gear set over carrier angles.
+
+  Attributes:
+    g: the pgears gear set.
+    theta: the (n,) carrier angles in radians.
+    meshes: a dict of {name: (z1, z2, m)} meshes, named like 'rp' for ring
+      and planet, 'sp' for sun and planet, and 'r2p2', 's2p2' for the
+      secondary stage, with negative z for rings.
+    phase: a dict of the (np, n) mesh phases in teeth of each mesh.
+    engaged: a dict of the (np, n) engaged tooth pair counts of each mesh.
+  """
+
+  def __init__(self, g, a=20.0, ha=1.0, hf=1.25, n=1 << 15, revs=1.0):
+    if numpy is None:
+      raise ImportError('MeshSim requires numpy.')
+    self.g, self.a, self.ha, self.hf, self.revs = g, a, ha, hf, revs
+    self.theta = 2*pi*revs*numpy.arange(n)/n
+    # Carrier revolutions and planet position offsets in revolutions.
+    c = self.theta[None, :]/(2*pi)
+    i = numpy.arange(getattr(g, 'np', 1))[:, None]/getattr(g, 'np', 1)
+    self.meshes, self.phase = {}, {}
+    if not hasattr(g, 'Tr'):
+      # A simple gear pair with the sun fixed and the planet orbiting it.
+      self.add('sp', g.Tp, g.Ts, g.m, -g.Ts*c)
+    else:
+      self.add('rp', g.Tp, -g.Tr, g.m, g.Tr*(c + i))
+      if g.sun:
+        # The sun turns so the planet's teeth pass it at the same rate as the ring.
+        self.add('sp', g.Tp, g.Ts, g.m, g.Ts*i - g.Tr*c)
+      if hasattr(g, 'Tr2'):
+        # The secondary planet teeth pass the secondary ring at Tp2/Tp times the first stage.
+        c2 = c*g.Tp2*g.Tr/(g.Tp*g.Tr2)
+        self.add('r2p2', g.Tp2, -g.Tr2, g.m2, g.Tr2*(c2 + i))
+        if g.sun2:
+          self.add('s2p2', g.Tp2, g.Ts2, g.m2, g.Ts2*i - g.Tr2*c2)
+    self.engaged = {k: engaged(p, *self.Ea(k)) for k, p in self.phase.items()}
+
+  def __repr__(self):
+    return f'{self.__class__.__name__}(n={len(self.theta)}, revs={self.revs}, meshes={list(self.meshes)})'
+
+  def add(self, name, z1, z2, m, phase):
+    """Add a mesh with its phases."""
+    self.meshes[name] = z1, z2, m
+    self.phase[name] = phase % 1.0
+
+  def Ea(self, name):
+    """Get the (Ea1, Ea2) addendum contact ratios of a mesh."""
+    z1, z2, m = self.meshes[name]
+    return (Gear(z, m, self.a, ha=self.ha, hf=self.hf).Ea for z in (z1, z2))
+
+  def Et(self, name):
+    """Get the transverse contact ratio of a mesh."""
+    return sum(self.Ea(name))
+
+  def stiffness(self, names=None):
+    """Get the (n,) total engaged tooth pairs over all planets of the named meshes."""
+    return sum(self.engaged[k].sum(axis=0) for k in (names or self.meshes))
+
+  @cached_property
+  def orders(self):
+    """The (n//2+1,) spectrum frequencies in orders of the carrier rotation."""
+    return numpy.fft.rfftfreq(len(self.theta), 1/len(self.theta))/self.revs
+
+  def spectrum(self, signal=None):
+    """Get the (n//2+1,) amplitude spectrum of a signal, defaulting to the stiffness.
+
+    The mean is removed and a Hann window reduces leakage when the signal is
+    not periodic over the simulated revolutions.
+    """
+    s = self.stiffness() if signal is None else signal
+    w = numpy.hanning(len(s))
+    return 2*numpy.abs(numpy.fft.rfft((s - s.mean())*w))/w.sum()
+
+  def peaks(self, signal=None, n=4):
+    """Get a list of the n largest (order, amplitude) spectrum peaks."""
+    a = self.spectrum(signal)
+    # Local maxima of the spectrum.
+    i = numpy.flatnonzero((a[1:-1] > a[:-2]) & (a[1:-1] >= a[2:])) + 1
+    i = i[numpy.argsort(a[i])[::-1][:n]]
+    return [(float(self.orders[j]), float(a[j])) for j in i]
+
+
+def spectra(gears, a=20.0, ha=1.0, hf=1.25, n=1 << 12, revs=1.0):
+  """Get the (orders, amplitudes) stiffness spectra of gear sets as arrays with a row per gear set."""
+  sims = [MeshSim(g, a, ha, hf, n, revs) for g in gears]
+  return sims[0].orders, numpy.stack([s.spectrum() for s in sims])
+
+
+if __name__ == '__main__':
+  import argparse
+  import pgears
+
+  cmdline = argparse.ArgumentParser(
+      description='Simulate the mesh phases and engaged teeth of a gear set over carrier rotations.',
+      formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+  cmdline.add_argument('-G', choices=['S', 'P', 'SR', 'SRP', 'SRI'], default='SRP',
+      help='Gear type (see pgears.py).')
+  for k in ('r', 'p', 's', 'r2', 'p2', 's2'):
+    cmdline.add_argument(f'-{k}', type=int, help=f'The {k} gear size.')
+  cmdline.add_argument('-n', type=int, default=3, help='Number of planets.')
+  cmdline.add_argument('-m', type=float, default=0.5, help='Module of the first stage gears.')
+  cmdline.add_argument('-a', type=float, default=20.0, help='Pressure angle.')
+  cmdline.add_argument('-ha', type=float, default=1.0, help='Addendum factor.')
+  cmdline.add_argument('-N', type=int, default=1 << 15, help='Number of carrier angle samples.')
+  cmdline.add_argument('-revs', type=float, default=1.0, help='Number of carrier revolutions.')
+  cmdline.add_argument('-peaks', type=int, default=4, help='Number of spectrum peaks to show.')
+  args = cmdline.parse_args()
+
+  if args.G == 'S':
+    g = pgears.SGears(args.s, args.p, args.m)
+  else:
+    g = getattr(pgears, f'{args.G}Gears')(Tr=args.r, Tp=args.p, Ts=args.s,
+        Tr2=args.r2, Tp2=args.p2, Ts2=args.s2, np=args.n, m=args.m)
+  print(g)
+  sim = MeshSim(g, args.a, args.ha, n=args.N, revs=args.revs)
+  for k, (z1, z2, m) in sim.meshes.items():
+    e = sim.engaged[k]
+    peaks = ' '.join(f'{o:.1f}:{v:.3f}' for o, v in sim.peaks(e.sum(axis=0), args.peaks))
+    print(f'{k} {z1}/{z2} m={m:.3f} Et={sim.Et(k):.3f}: phase0={sim.phase[k][:, 0].round(3).tolist()} '
+        f'engaged={e.sum(axis=0).min()}..{e.sum(axis=0).max()} peaks={peaks}')
+  peaks = ' '.join(f'{o:.1f}:{v:.3f}' for o, v in sim.peaks(n=args.peaks))
+  print(f'total engaged={sim.stiffness().min()}..{sim.stiffness().max()} peaks={peaks}')
@@ -0,0 +1,47 @@
+#!/usr/bin/pypy3
+"""Tests for meshsim.py."""
+import unittest
+from meshsim import *
+import pgears
+
+
+@unittest.skipIf(numpy is None, 'requires numpy')
+class TestMeshSim(unittest.TestCase):
+
+  def test_engaged(self):
+    phase = numpy.linspace(0, 1, 1000, endpoint=False)
+    e = engaged(phase, 0.9, 0.7)
+    self.assertEqual(set(e.tolist()), {1, 2})
+    self.assertAlmostEqual(e.mean(), 1.6, places=2)
+    # A pair is at the pitch point at phase 0.5.
+    self.assertEqual(engaged(numpy.array([0.5]), 0.1, 0.1)[0], 1)
+    self.assertEqual(engaged(numpy.array([0.0]), 0.1, 0.1)[0], 0)
+
+  def test_MeshSim(self):
+    g = pgears.SRIGears(Tr=34, Tp=13, Ts=8, Tr2=35, Tp2=14, np=3, m=0.5)
+    sim = MeshSim(g, n=1 << 14)
+    self.assertEqual(list(sim.meshes), ['rp', 'sp', 'r2p2', 's2p2'])
+    self.assertEqual(sim.meshes['r2p2'], (14, -35, g.m2))
+    for k in sim.meshes:
+      self.assertEqual(sim.phase[k].shape, (3, 1 << 14))
+      self.assertAlmostEqual(sim.engaged[k].mean(), sim.Et(k), places=2)
+    numpy.testing.assert_allclose(sim.phase['rp'][:, 0], [0, g.Pp, 2*g.Pp % 1])
+    numpy.testing.assert_allclose(sim.phase['r2p2'][:, 0], [0, g.Pp2, 2*g.Pp2 % 1])
+    # The first stage ring teeth pass the planets Tr times per carrier rotation.
+    self.assertAlmostEqual(sim.phase['rp'][0, 1] - sim.phase['rp'][0, 0], 34/(1 << 14))
+    # Planets with sequential phases give a stiffness ripple at np times the mesh frequency.
+    order, amp = sim.peaks(sim.engaged['rp'].sum(axis=0), 1)[0]
+    self.assertAlmostEqual(order, 3*34)
+    self.assertEqual(sim.stiffness(['rp']).tolist(), sim.engaged['rp'].sum(axis=0).tolist())
+
+  def test_spectra(self):
+    gears = [pgears.PGears(Tr=60, Tp=24, Ts=12, np=3, m=1), pgears.PGears(Tr=61, Tp=23, Ts=15, np=4, m=1)]
+    orders, amps = spectra(gears, n=1 << 10)
+    self.assertEqual(amps.shape, (2, len(orders)))
+    # Planets in phase give a stiffness ripple at the mesh frequency.
+    self.assertEqual(orders[amps[0].argmax()], 60)
+    self.assertEqual(orders[amps[1].argmax()], 4*61)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -203,9 +203,24 @@ ppb2 constraints. Additionally we have the following constraint;
 
 """
 
+import inspect, os, pickle, sys, time
 from math import *
+from itertools import groupby
+from batchstage import Nbatch, iterBatches, GearColumns
 from constraints import *
 from stats1 import *
+from propagate import Linear, Mod, Predicate, propagate
+from efficientgears import Gear, GearArray, MeshArrays, optGears, optGearsArray
+from clearance import Clearance, Cnames
+from efficiency import Efficiency
+from inertia import Inertia
+from strength import Strength, Snames
+from toothcheck import ToothCheck
+from printcost import PrintCost, Pnames
+try:
+  import numpy
+except ImportError:
+  numpy = None
 
 # See https://khkgears.net/new/gear-module.html
 # most common "I" gear module values.
@@ -224,6 +239,15 @@ Mmin, Mmax = 0.1, 10.0
 Mtol = 0.0005
 Mdef = 1.0
 
+# Gear attributes that can be used in where expressions. The Tr, Tp, Ts and
+# Tr2, Tp2, Ts2 sizes are known in the first and second stages of the search,
+# so where terms that only use them are evaluated there.
+Wnames = 'Tr Tp Ts Tr2 Tp2 Ts2 m m2 R N Dext Dint Pp Pp2'.split()
+Wnames1 = 'Tr Tp Ts'.split()
+Wnames2 = 'Tr Tp Ts Tr2 Tp2 Ts2'.split()
+# Gear attributes set by the MeshQuality stage.
+Mnames = 'Etmin Exmin Emin Cxmin'.split()
+
 
 def iscoprime(i1,i2):
   return gcd(i1, i2) == 1
@@ -342,9 +366,14 @@ class SGears(object):
   def __lt__(self, other):
     return self.R < other.R
 
+  @staticmethod
+  def ratio(Ts, Tp):
+    """Get the ratio R for gear sizes."""
+    return Tp/Ts
+
   @property
   def R(self):
-    return self.Tp/self.Ts
+    return SGears.ratio(self.Ts, self.Tp)
 
 
 class CGears(SGears):
@@ -359,6 +388,8 @@ class CGears(SGears):
   np : int  # number of planetary gears.
   m : float # gear teeth module (diameter / teeth)
   R : float = 1.0
+  sun : bool = False  # Ts is a sun gear.
+  sun2 : bool = False  # Ts2 is a secondary sun gear.
 
   @classmethod
   def assertValid(cls, Tr=None, Tp=None, Ts=None, np=3, **kwargs):
@@ -422,6 +453,7 @@ class PGears(CGears):
 
   This is the same as CGears but also requires Ts is a valid gear with valid meshing.
   """
+  sun = True
 
   @classmethod
   def assertValid(cls, Tr=None, Tp=None, Ts=None, np=3, **kwargs):
@@ -439,9 +471,14 @@ class PGears(CGears):
     s=gearstr('s', self.Ts, self.m)
     return prefix + f',\n  {s})'
 
+  @staticmethod
+  def ratio(Tr, Tp, Ts):
+    """Get the ratio R for gear sizes."""
+    return (Ts+Tr)/Ts
+
   @property
   def R(self):
-    return (self.Ts+self.Tr)/self.Ts
+    return PGears.ratio(self.Tr, self.Tp, self.Ts)
 
 
 class SRGears(CGears):
@@ -476,7 +513,7 @@ class SRGears(CGears):
 
   def __str__(self):
     prefix = super().__str__()[:-1]
-    prefix = prefix.replace('\n', f' m2={self.m2:.3f}, N={self.N},\n', count=1)
+    prefix = prefix.replace('\n', f' m2={self.m2:.3f}, N={self.N},\n', 1)
     r2=gearstr('r2', self.Tr2, self.m2)
     p2=gearstr('p2', self.Tp2, self.m2) + f', Pp2={self.Pp2:.3f}'
     return ',\n  '.join([prefix,r2,p2]) + ')'
@@ -532,13 +569,18 @@ class SRGears(CGears):
   def N(self):
     return self.dr*self.Tp - self.dp*self.Tr
 
-  @property
-  def R(self):
+  @staticmethod
+  def ratio(Tr, Tp, Ts, Tr2, Tp2, Ts2):
+    """Get the ratio R for gear sizes."""
     try:
-      return self.Tr2*self.Tp / self.N
+      return Tr2*Tp / (Tr2*Tp - Tp2*Tr)
     except ZeroDivisionError:
       return inf
 
+  @property
+  def R(self):
+    return SRGears.ratio(self.Tr, self.Tp, self.Ts, self.Tr2, self.Tp2, self.Ts2)
+
   def dpmax(self, dr):
     """Get dp for max R for a given dr."""
     return round(dr * self.Tp/self.Tr)
@@ -557,13 +599,19 @@ class SRPGears(SRGears, PGears):
     """Gear ratio of the second stage (wr2/wc)."""
     return super().R
 
+  @staticmethod
+  def ratio(Tr, Tp, Ts, Tr2, Tp2, Ts2):
+    """Get the ratio R for gear sizes."""
+    return PGears.ratio(Tr, Tp, Ts) * SRGears.ratio(Tr, Tp, Ts, Tr2, Tp2, Ts2)
+
   @property
   def R(self):
-    return self.R1 * self.R2
+    return self.ratio(self.Tr, self.Tp, self.Ts, self.Tr2, self.Tp2, self.Ts2)
 
 
 class SRIGears(SRPGears):
   """A split ring compound planetary gearbox with sun and idler secondary sun."""
+  sun2 = True
 
   @classmethod
   def assertValid(cls, Tr=None, Tp=None, Ts=None, Tr2=None, Tp2=None, Ts2=None, dr=None, dp=None, np=3, **kwargs):
@@ -646,7 +694,7 @@ def TLimits(cm=Mdef, Dint=None, Dext=None, tmin=Tmin, tmax=Tmax, smin=2):
 
 def iterRPS(cr=None, cp=None, cs=None, n=3, spr=inf,
     rsm=True, rpc=False, psc=False, rnc=False, rnf=False, rnb=False,
-    tmin=Tmin, tmax=Tmax, smin=2):
+    tmin=Tmin, tmax=Tmax, smin=2, where=None, props=None, order=None):
   """Iterate through r,p,s values matching constraints.
 
   Args:
@@ -661,32 +709,61 @@ def iterRPS(cr=None, cp=None, cs=None, n=3, spr=inf,
     rnc: ring and number of planets must be coprime.
     rnf: ring must have number of planets as a factor.
     rnb: ring and planets must be balanced (opposite sides have almost same phase).
+    where: optional where(r,p,s) function that must be true.
+    props: optional propagate constraints on Tr,Tp,Ts for narrowing ranges.
+    order: optional FilterOrder to use instead of the rpc, psc, where filters (see RPSFilters()).
+
+  The rsm constraint is applied by only iterating through the p values in the
+  matching residue class, and the rnc, rnf, rnb filters are applied once per r.
   """
   nr = np = ny = 0
+  if order is None:
+    order = RPSFilters(n, rpc, psc, where)
+  test, every, k = order.test, order.every, order.n
   # Change cs to a set for faster inclusion testing and adjust ranges.
   rs = TsRange(n=n, tmin=tmin, tmax=tmax, smin=smin)
   cs = IConstraintSet(cs, *rs)
   rs = min(cs), max(cs)
+  order.env['cs'] = cs
   rr = TrRange(rs=rs, n=n, tmin=tmin, tmax=tmax, smin=smin)
+  if props:
+    # Narrow the r and s ranges before the search.
+    rp = TpRange(rr=rr, rs=rs, n=n, tmin=tmin, tmax=tmax, smin=smin)
+    if not (doms := propagate(dict(Tr=rr, Tp=rp, Ts=rs), props)):
+      return
+    rr, rs = doms['Tr'], doms['Ts']
+  # For rsm (r+s)%n = 2*(r-p)%n = 0, so only p = r (mod pmod) values mesh.
+  pmod = n // gcd(n, 2) if rsm else 1
   for r in iterIConstraint(cr,*rr):
     nr += 1
+    # Check the filters that only use r once for each r.
+    if ((rnc and not iscoprime(r,n)) or
+        (rnf and r % n) or
+        (rnb and min(r*(n//2)%n,-r*(n//2)%n) > 1 and gcd(r,n) <= 2)):
+      continue
     rp = (ceil(r/(2+spr)), tmax)
     rp = TpRange(rr=r, rp=rp, rs=rs, n=n, tmin=tmin, tmax=tmax, smin=smin)
-    for p in iterIConstraint(cp, *rp):
+    if props:
+      # Narrow the p range for this r.
+      if not (doms := propagate(dict(Tr=(r,r), Tp=rp, Ts=rs), props)):
+        continue
+      rp = doms['Tp']
+    for p in iterIConstraint(cp, *rp, pmod, r):
       np += 1
       s = r - 2*p
-      if (s not in cs or
-          (rsm and (r+s) % n) or
-          (rpc and not iscoprime(r,p)) or
-          (psc and not iscoprime(p,s)) or
-          (rnc and not iscoprime(r,n)) or
-          (rnf and r % n) or
-          (rnb and min(r*(n//2)%n,-r*(n//2)%n) > 1 and gcd(r,n) <= 2)):
-        #print(f'{r=} {p=} {s=} {n=} fails planetary constraints.')
-        continue
+      # Sample every'th candidate to adaptively reorder the filters.
+      k += 1
+      if k % every:
+        if test(r,p,s):
+          continue
+      else:
+        if order.sample(r,p,s):
+          continue
+        test = order.test
       #print(f'{r=} {p=} {s=} {n=} passes planetary constraints.')
       ny += 1
       yield r,p,s
+    order.n = k
   # print(f'''iterRPS({cr=}, {cp=}, {cs=}, {n=},
   #   {cm=}, {Dint=}, {Dext=},
   #   {rsm=}, {rpc=}, {psc=}, {rnc=}, {rnf=},
@@ -696,8 +773,8 @@ def iterRPS(cr=None, cp=None, cs=None, n=3, spr=inf,
 
 def iterRPS2(r, p, s, cr2=None, cp2=None, cs2=None, n=3,
     rs2m=False, rp2c=False, ps2c=False, rn2c=False, rn2f=False, rn2b=False, pp2e=False,
-    tmin=Tmin, tmax=Tmax, smin=2):
-  """Iterate through r2,p2,s2,rm2 values matching constraints.
+    tmin=Tmin, tmax=Tmax, smin=2, props=None, order=None):
+  """Iterate through r2,p2,s2 values matching constraints.
 
   Args:
     r: ring gear size.
@@ -714,15 +791,17 @@ def iterRPS2(r, p, s, cr2=None, cp2=None, cs2=None, n=3,
     rn2f: ring2 must have number of planets as a factor.
     rn2b: ring2 and planets must be balanced (opposite sides have almost same phase).
     pp2e: planet and planet2 phases offsets the same for all planets.
+    props: optional propagate constraints on r2,p2,s2 as Tr,Tp,Ts (see RPS2Props()).
+    order: optional FilterOrder to use instead of the filters above (see RPSFilters()).
+
+  This also skips combinations with N=0, AKA R=inf.
   """
   nrps2 = ny = 0
+  if order is None:
+    order = RPSFilters(n, rp2c, rp2c, pp2e=pp2e, n0=True)
+  order.env.update(r1=r, p1=p)
   for r2,p2,s2 in iterRPS(cr=cr2, cp=cp2, cs=cs2, n=n,
-      rsm=rs2m, rpc=rp2c, psc=rp2c, rnc=rn2c, rnf=rn2f, rnb=rn2b,
-      tmin=tmin, tmax=tmax, smin=smin):
-    nrps2 += 1
-    if pp2e and ((r*p2-r2*p)/gcd(p,p2))%n:
-      #print(f'{r=} {p=} {s=} {r2=} {p2=} {s2=} {n=} fails ring2 constraints.')
-      continue
+      rsm=rs2m, rnc=rn2c, rnf=rn2f, rnb=rn2b, tmin=tmin, tmax=tmax, smin=smin, props=props, order=order):
     #print(f'{r=} {p=} {s=} {r2=} {p2=} {s2=} {n=} passes ring2 constraints.')
     ny += 1
     yield r2,p2,s2
@@ -733,6 +812,79 @@ def iterRPS2(r, p, s, cr2=None, cp2=None, cs2=None, n=3,
   # tested {nrps2} r2,p2,s2 sizes, and yielded {ny} r2,p2,s2 sizes.''')
 
 
+def RPSFilters(n=3, rpc=False, psc=False, where=None, pp2e=False, n0=False, teeth=None):
+  """Get a FilterOrder of the iterRPS() filters for r,p,s values.
+
+  These are the filters that use p, with an initial order of the order they
+  are listed in. For the secondary gears
+  of iterRPS2() the pp2e and n0 (N=0) filters use env values r1,p1 for the
+  primary ring and planet sizes. The teeth filter is an optional teeth(r,p,s)
+  tooth geometry check (see ToothCheck.screen()).
+  """
+  filters = dict(cs='s not in cs')
+  if rpc: filters['rpc'] = 'not iscoprime(r,p)'
+  if psc: filters['psc'] = 'not iscoprime(p,s)'
+  if where: filters['where'] = 'not where(r,p,s)'
+  if pp2e: filters['pp2e'] = '((r1*p-r*p1)//gcd(p1,p))%n'
+  if n0: filters['n0'] = 'r*p1 == p*r1'
+  if teeth: filters['teeth'] = 'not teeth(r,p,s)'
+  return FilterOrder(filters, ('r','p','s'), dict(n=n, iscoprime=iscoprime, gcd=gcd, where=where, teeth=teeth))
+
+
+def RPSProps(n=3, spr=inf, rsm=True, rpc=False, psc=False, rnc=False, rnf=False, rnb=False):
+  """Get propagate constraints on Tr,Tp,Ts for iterRPS() arguments.
+
+  These are the linear Tr=Ts+2*Tp, planet size, and spr constraints, and the
+  rsm, rnf modular and rpc, psc, rnc, rnb tests that iterRPS() checks.
+  """
+  props = [Linear(dict(Tr=1, Ts=-1, Tp=-2), 0, 0)]
+  # Planets fit inside the ring without touching (see maxTp()).
+  if n == 2:
+    props.append(Linear(dict(Tp=2, Tr=-1), vmax=-2))
+  else:
+    sn = sin(pi/n)
+    props.append(Linear(dict(Tp=1+sn, Tr=-sn), vmax=-2))
+  if spr < inf: props.append(Linear(dict(Tp=2+spr, Tr=-1), vmin=0))
+  if rsm: props.append(Mod(dict(Tr=1, Ts=1), n))
+  if rnf: props.append(Mod(dict(Tr=1), n))
+  if rpc: props.append(Predicate(('Tr','Tp'), iscoprime))
+  if psc: props.append(Predicate(('Tp','Ts'), iscoprime))
+  if rnc: props.append(Predicate(('Tr',), lambda r: iscoprime(r,n)))
+  if rnb: props.append(Predicate(('Tr',), lambda r: min(r*(n//2)%n,-r*(n//2)%n) <= 1 or gcd(r,n) > 2))
+  return props
+
+
+def RPS2Props(r, p, s, n=3, cm=Mdef, cm2=None, Dint=None, Dext=None,
+    rs2m=False, rp2c=False, rn2c=False, rn2f=False, rn2b=False, pp2e=False,
+    mmin=Mmin, mmax=Mmax, mtol=Mtol):
+  """Get propagate constraints on r2,p2,s2 as Tr,Tp,Ts for given r,p,s.
+
+  These are the RPSProps() constraints for the secondary gears, the pp2e test,
+  and the pcd2 m*(r-p) = m2*(r2-p2) constraint combined with the module and
+  diameter constraints that iter2M() checks.
+
+  For the module constraints, iter2M() requires m in [m0,m1] and m2 in
+  [m20,m21] including the Dint and Dext limits. Since m2 = m*(r-p)/(r2-p2)
+  this gives the linear constraints;
+
+    m0*(r-p) <= m21*(r2-p2)    m1*(r-p) >= m20*(r2-p2)
+    m0*(r-p)*(r2+2.5) <= Dext*(r2-p2)
+    m1*(r-p)*(s2-2.5) >= Dint*(r2-p2)
+  """
+  props = RPSProps(n, inf, rs2m, rp2c, False, rn2c, rn2f, rn2b)
+  if pp2e: props.append(Predicate(('Tr','Tp'), lambda r2,p2: not ((r*p2-r2*p)/gcd(p,p2))%n))
+  m0,m1 = MRange(r, s, Dint=Dint, Dext=Dext, mmin=mmin, mmax=mmax)
+  cm0,cm1 = ConstraintRange(cm, mmin, mmax, mtol)
+  m0,m1 = max(m0, cm0), min(m1, cm1)
+  m20,m21 = ConstraintRange(cm2, mmin, mmax, mtol)
+  k0, k1 = m0*(r-p), m1*(r-p)
+  props.append(Linear(dict(Tr=m21, Tp=-m21), vmin=k0))
+  props.append(Linear(dict(Tr=m20, Tp=-m20), vmax=k1))
+  if Dext: props.append(Linear(dict(Tr=k0-Dext, Tp=Dext), vmax=-2.5*k0))
+  if Dint: props.append(Linear(dict(Tr=Dint, Tp=-Dint, Ts=-k1), vmax=-2.5*k1))
+  return props
+
+
 def iterM(r, p, s, cm, Dint=None, Dext=None, mmin=Mmin, mmax=Mmax, mtol=Mtol):
   mmin,mmax = MRange(r, s, Dint=None, Dext=None, mmin=mmin, mmax=mmax)
   for rm in iterConstraint(cm, mmin, mmax, mtol):
@@ -760,12 +912,16 @@ def iter2M(r, p, s, r2, p2, s2, cm, cm2, Dint=None, Dext=None, mmin=Mmin,mmax=Mm
 
 def iterRPSM(cr=None, cp=None, cs=None, n=3, cm=Mdef, Dint=None, Dext=None, spr=inf,
     rsm=False, rpc=False, psc=False, rnc=False, rnf=False, rnb=False,
-    tmin=Tmin, tmax=Tmax, smin=None, mmin=Mmin, mmax=Mmax, mtol=Mtol):
+    tmin=Tmin, tmax=Tmax, smin=None, mmin=Mmin, mmax=Mmax, mtol=Mtol, where=None, prop=True,
+    orders=None, teeth=None):
   # Default smin=tmin, but if rsm is false assume no sun gear and default smin=2.
   if smin is None: smin = tmin if rsm else 2
   nrps = ny = 0
   tmin, tmax, smin = TLimits(cm, Dint, Dext, tmin, tmax, smin)
-  for r,p,s in iterRPS(cr, cp, cs, n, spr, rsm, rpc, psc, rnc, rnf, rnb, tmin, tmax, smin):
+  props = prop and RPSProps(n, spr, rsm, rpc, psc, rnc, rnf, rnb)
+  order = RPSFilters(n, rpc, psc, where, teeth=teeth and teeth.screen(rsm))
+  if orders is not None: orders['rps'] = order
+  for r,p,s in iterRPS(cr, cp, cs, n, spr, rsm, rpc, psc, rnc, rnf, rnb, tmin, tmax, smin, where, props, order):
     nrps += 1
     for m in iterM(r, p, s, cm, Dint, Dext, mmin, mmax, mtol):
         ny += 1
@@ -782,20 +938,26 @@ def iterRPS2M(cr=None, cp=None, cs=None, cr2=None, cp2=None, cs2=None, n=3,
     cm=Mdef, cm2=None, Dint=None, Dext=None, spr=inf,
     rsm=False, rpc=False, psc=False, rnc=False, rnf=False, rnb=False,
     rs2m=False, rp2c=False, ps2c=False, rn2c=False, rn2f=False, rn2b=False, pp2e=False,
-    tmin=Tmin, tmax=Tmax, smin=None, s2min=None, mmin=Mmin, mmax=Mmax, mtol=Mtol):
+    tmin=Tmin, tmax=Tmax, smin=None, s2min=None, mmin=Mmin, mmax=Mmax, mtol=Mtol,
+    where=None, where2=None, prop=True, orders=None, teeth=None):
   # Default smin=tmin, but if rsm is false assume no sun gear and default smin=2.
   if smin is None: smin = tmin if rsm else 2
   if s2min is None: s2min = tmin if rs2m else 2
   nrps = nrps2 = nm = ny = 0
   t2min, t2max, s2min = TLimits(cm2, Dint, Dext, tmin, tmax, s2min)
   tmin, tmax, smin = TLimits(cm, Dint, Dext, tmin, tmax, smin)
-  for r,p,s in iterRPS(cr, cp, cs, n, spr, rsm, rpc, psc, rnc, rnf, rnb, tmin, tmax, smin):
+  props = prop and RPSProps(n, spr, rsm, rpc, psc, rnc, rnf, rnb)
+  order = RPSFilters(n, rpc, psc, where, teeth=teeth and teeth.screen(rsm))
+  order2 = RPSFilters(n, rp2c, rp2c, pp2e=pp2e, n0=True, teeth=teeth and teeth.screen(rs2m))
+  if orders is not None: orders.update(rps=order, rps2=order2)
+  for r,p,s in iterRPS(cr, cp, cs, n, spr, rsm, rpc, psc, rnc, rnf, rnb, tmin, tmax, smin, where, props, order):
     nrps += 1
+    props2 = prop and RPS2Props(r, p, s, n, cm, cm2, Dint, Dext,
+        rs2m, rp2c, rn2c, rn2f, rn2b, pp2e, mmin, mmax, mtol)
     for r2,p2,s2 in iterRPS2(r, p, s, cr2, cp2, cs2, n,
-        rs2m, rp2c, ps2c, rn2c, rn2f, rn2b, pp2e, t2min, t2max, s2min):
+        rs2m, rp2c, ps2c, rn2c, rn2f, rn2b, pp2e, t2min, t2max, s2min, props2, order2):
       nrps2 += 1
-      # Skip combinations with N=0, AKA R=inf.
-      if r2*p == p2*r:
+      if where2 and not where2(r, p, s, r2, p2, s2):
         continue
       for m in iter2M(r, p, s, r2, p2, s2, cm, cm2, Dint, Dext, mmin, mmax, mtol):
         ny += 1
@@ -809,37 +971,193 @@ def iterRPS2M(cr=None, cp=None, cs=None, cr2=None, cp2=None, cs2=None, n=3,
   # tested {nrps} r,p,s sizes, {nrps2} r2,p2,s2 sizes, and yielded {ny} results.""")
 
 
-def iterSGears(cs=None, cp=None, cm=0.5, R=None, psc=False, tmin=Tmin, tmax=Tmax):
+def WhereStages(where):
+  """Split a Where into where1(r,p,s), where2(r,p,s,r2,p2,s2) and where(g) functions.
+
+  Each term is pushed down to the earliest search stage where all the values
+  it uses are known. Functions are None if they have no terms.
+  """
+  if not where:
+    return None, None, None
+  where1, where = where.split(Wnames1)
+  where2, where = where.split(Wnames2) if where else (None, None)
+  return (where1 and where1.function(Wnames1), where2 and where2.function(Wnames2),
+      where and where.function())
+
+
+def iterWhereVector(gears, where, n=Nbatch):
+  """Iterate through gears filtered by a Where vectorized over batches."""
+  names = sorted(where.names)
+  where = where.vector(names)
+  for batch in iterBatches(gears, n):
+    ok = numpy.broadcast_to(where(*GearColumns(batch, names)), len(batch))
+    yield from (g for g,k in zip(batch, ok) if k)
+
+
+def iterCounts(cls, items, n=3, where=None):
+  """Iterate through (R, count, cls, args) ratio counts of gears.
+
+  The items are (sizes..., m) tuples from iterRPSM() or iterRPS2M() for
+  cls(*args) gears. Every item is still enumerated, but they are counted
+  using cls.ratio() without creating gear instances unless they are needed
+  for the where(g) function. Consecutive
+  items with the same sizes and different m values have the same R and are
+  counted together, with args for the first matching m.
+  """
+  for sizes, group in groupby(items, lambda t: t[:-1]):
+    # Split ring args include None for dr and dp.
+    args = sizes + (None, None) if len(sizes) == 6 else sizes
+    if where:
+      ms = [m for *_,m in group if where(cls(*args, n, m))]
+    else:
+      ms = [m for *_,m in group]
+    if ms:
+      yield cls.ratio(*sizes), len(ms), cls, args + (n, ms[0])
+
+
+def GearMeshes(g):
+  """Get the (z1, z2, m) meshes of a gear set, with negative z for ring gears."""
+  if not isinstance(g, CGears):
+    return [(g.Ts, g.Tp, g.m)]
+  meshes = [(g.Tp, -g.Tr, g.m)]
+  if isinstance(g, PGears):
+    meshes.append((g.Ts, g.Tp, g.m))
+  if isinstance(g, SRGears):
+    meshes.append((g.Tp2, -g.Tr2, g.m2))
+  if isinstance(g, SRIGears):
+    meshes.append((g.Ts2, g.Tp2, g.m2))
+  return meshes
+
+
+class MeshQuality(object):
+  """A search stage that computes contact ratios for each gear's meshes.
+
+  Each mesh uses efficientgears tooth geometry with pressure angle a, helix
+  angle B, addendum and dedendum factors ha and hf, and face width b in mm
+  (default 1 module). The transverse, axial and total contact ratios and
+  the Cxmin minimum face contact line length are computed for every mesh
+  and memoized per (z1, z2, m) mesh, computing new meshes for each batch of
+  gears in one vectorized call if numpy is available.
+
+  The minimums over each gear's meshes are set as the Etmin, Exmin, Emin and
+  Cxmin gear attributes, and only gears with Emin >= emin are kept.
+  """
+
+  def __init__(self, a=20.0, B=0.0, ha=1.0, hf=1.25, b=None, emin=0.0):
+    if not ha + 0.1 < hf:
+      raise ValueError(f'gears with {ha=} and {hf=} do not mesh, ha + 0.1 < hf is required.')
+    self.a, self.B, self.ha, self.hf, self.b, self.emin = a, B, ha, hf, b, emin
+    # The (Et, Ex, E, Cxmin) stats for each (z1, z2, m) mesh.
+    self.memo = {}
+
+  def _gear(self, z, m):
+    hx = 1.0 if self.b is None else self.b/m
+    return Gear(z, m, self.a, self.B, self.ha, self.hf, hx)
+
+  def _arrays(self, keys):
+    """Get the GearArray pairs for a list of (z1, z2, m) meshes."""
+    z1, z2, m = (numpy.array(v) for v in zip(*keys))
+    hx = 1.0 if self.b is None else self.b/m
+    return (GearArray(z1, m, self.a, self.B, self.ha, self.hf, hx),
+        GearArray(z2, m, self.a, self.B, self.ha, self.hf, hx))
+
+  def update(self, meshes):
+    """Compute the stats for any new meshes."""
+    new = list(set(k for k in meshes if k not in self.memo))
+    if not new:
+      return
+    if numpy is None:
+      for z1, z2, m in new:
+        g1, g2 = self._gear(z1, m), self._gear(z2, m)
+        self.memo[z1, z2, m] = g1.Et(g2), g1.Ex, g1.E(g2), g1.Cxmin(g2)
+      return
+    stats = MeshArrays(*self._arrays(new))
+    self.memo.update(zip(new, zip(*(stats[k].tolist() for k in ('Et', 'Ex', 'E', 'Cxmin')))))
+
+  def iterGears(self, gears, n=Nbatch):
+    """Iterate through gears with their mesh stats set that have Emin >= emin."""
+    for batch in iterBatches(gears, n):
+      meshes = [GearMeshes(g) for g in batch]
+      self.update(k for ks in meshes for k in ks)
+      for g, ks in zip(batch, meshes):
+        Et, Ex, E, Cx = zip(*(self.memo[k] for k in ks))
+        g.Etmin, g.Exmin, g.Emin, g.Cxmin = min(Et), min(Ex), min(E), min(Cx)
+        if g.Emin >= self.emin:
+          yield g
+
+  def optimize(self, gears, Et=0.6, Ex=1.0):
+    """Get the optGears() optimized profiles for all the meshes of gears.
+
+    This returns a list of [(z1, z2, m, g1, g2), ...] optimized mesh Gears for
+    each gear, optimizing all the meshes in one vectorized call if numpy is
+    available.
+    """
+    meshes = [GearMeshes(g) for g in gears]
+    keys = list(set(k for ks in meshes for k in ks))
+    if numpy is None:
+      opt = {k: optGears(self._gear(k[0], k[2]), self._gear(k[1], k[2]), Et, Ex, b=self.b)
+          for k in keys}
+    elif keys:
+      g1, g2 = optGearsArray(*self._arrays(keys), Et, Ex)
+      opt = {k: (g1[i], g2[i]) for i,k in enumerate(keys)}
+    return [[(*k, *opt[k]) for k in ks] for ks in meshes]
+
+
+def iterSGears(cs=None, cp=None, cm=0.5, R=None, psc=False, tmin=Tmin, tmax=Tmax, where=None,
+    orders=None, counts=False, teeth=None):
   """ Iterate through gear pairs that satisfy constraints.
 
   The Ts and Tp constraints are the sizes of the first and second gear as an
   int, a (min,max) range tuple, or an iterable of ints or range-tuples. The
-  psc argument can be set true to require the sizes be coprime.
+  psc argument can be set true to require the sizes be coprime. The where
+  argument can be a Where expression constraint. The orders argument is
+  ignored since this has no adaptive filters. If counts is true this yields
+  (R, count, cls, args) ratio counts instead of gears (see iterCounts()). The
+  teeth argument can be a ToothCheck for the tooth geometry of the pair.
   """
+  where = where and where.function()
   for s in iterIConstraint(cs,tmin,tmax):
     for p in iterIConstraint(cp,tmin,tmax):
-      if not psc or iscoprime(p,s):
+      if (not psc or iscoprime(p,s)) and (not teeth or teeth.pair(s,p)):
+        if counts and not where:
+          gR = SGears.ratio(s,p)
+          if not R or inConstraint(gR, R):
+            yield gR, 1, SGears, (s,p,cm)
+          continue
         g=SGears(s,p,cm)
-        if not R or inConstraint(g.R, R):
-          yield g
+        if (not R or inConstraint(g.R, R)) and (not where or where(g)):
+          yield (g.R, 1, SGears, (s,p,cm)) if counts else g
 
 
 def iterPGears(cr=None, cp=None, cs=None, n=3, cm=Mdef, Dint=None, Dext=None, spr=inf,
     rpc=False, psc=False, rnc=False, rnf=False, rnb=False,
-    tmin=Tmin, tmax=Tmax, smin=None, mmin=Mmin, mmax=Mmax, mtol=Mtol):
+    tmin=Tmin, tmax=Tmax, smin=None, mmin=Mmin, mmax=Mmax, mtol=Mtol, where=None, prop=True,
+    orders=None, counts=False, teeth=None):
   """ Iterate through all valid planetary gear combinations within constraints.
 
   This yields all possible valid PGears instances within the cr, cp, cs, n,
   cm, Dext, Dint, and rpc, psc, rnc, rnf, rnb, constraints provided. The c, cp,
   cs, and cm values can be any valid constraint as used by iterValues(). Dext
   can be a max ring gear outer diameter, and Dint can be a min sun gear inner
-  diameter.
+  diameter. The where argument can be a Where expression constraint. Setting
+  prop narrows the search ranges using constraint propagation. If orders is a
+  dict, the adaptive FilterOrder of the search is saved in it. If counts is
+  true this yields (R, count, cls, args) ratio counts instead of gears (see
+  iterCounts()). The teeth argument can be a ToothCheck that filters out gear
+  sizes with pointed, undercut or interfering teeth early in the search.
 
   """
   rsm=True
-  for r,p,s,m in iterRPSM(cr, cp, cs, n, cm, Dint, Dext, spr,
-      rsm, rpc, psc, rnc, rnf, rnb, tmin, tmax, smin, mmin, mmax, mtol):
+  where1, where2, where = WhereStages(where)
+  items = iterRPSM(cr, cp, cs, n, cm, Dint, Dext, spr,
+      rsm, rpc, psc, rnc, rnf, rnb, tmin, tmax, smin, mmin, mmax, mtol, where1, prop, orders, teeth)
+  if counts:
+    yield from iterCounts(PGears, items, n, where)
+    return
+  for r,p,s,m in items:
     g=PGears(Tr=r,Tp=p,Ts=s,np=n,m=m)
+    if where and not where(g):
+      continue
     assert Dint is None or g.Dint >= Dint, f'failed {g.Dint=} >= {Dint} for {g=!s}.'
     assert Dext is None or g.Dext <= Dext, f'failed {g.Dext=} <= {Dext} for {g=!s}.'
     assert inConstraint(cm, g.m, vtol=mtol)
@@ -850,11 +1168,19 @@ def iterSRGears(cr=None, cp=None, cs=None, cr2=None, cp2=None, cs2=None, n=3,
     cm=Mdef, cm2=None, Dint=None, Dext=None, spr=inf,
     rsm=False, rpc=False, psc=False, rnc=False, rnf=False, rnb=False,
     rs2m=False, rp2c=False, ps2c=False, rn2c=False, rn2f=False, rn2b=False, pp2e=False,
-    tmin=Tmin, tmax=Tmax, smin=None, s2min=None, mmin=Mmin, mmax=Mmax, mtol=Mtol):
-  for r,p,s,r2,p2,s2,m in iterRPS2M(cr, cp, cs, cr2, cp2, cs2, n, cm, cm2, Dint, Dext, spr,
+    tmin=Tmin, tmax=Tmax, smin=None, s2min=None, mmin=Mmin, mmax=Mmax, mtol=Mtol, where=None, prop=True,
+    orders=None, counts=False, teeth=None):
+  where1, where2, where = WhereStages(where)
+  items = iterRPS2M(cr, cp, cs, cr2, cp2, cs2, n, cm, cm2, Dint, Dext, spr,
       rsm, rpc, psc, rnc, rnf, rnb, rs2m, rp2c, ps2c, rn2c, rn2f, rn2b, pp2e,
-      tmin, tmax, smin, s2min, mmin, mmax, mtol):
+      tmin, tmax, smin, s2min, mmin, mmax, mtol, where1, where2, prop, orders, teeth)
+  if counts:
+    yield from iterCounts(SRGears, items, n, where)
+    return
+  for r,p,s,r2,p2,s2,m in items:
     g=SRGears(Tr=r,Tp=p,Ts=s,Tr2=r2,Tp2=p2,Ts2=s2,np=n,m=m)
+    if where and not where(g):
+      continue
     assert Dint is None or g.Dint >= Dint, f'failed {g.Dint=} >= {Dint} for {g=!s}.'
     assert Dext is None or g.Dext <= Dext, f'failed {g.Dext=} <= {Dext} for {g=!s}.'
     assert inConstraint(cm, g.m, vtol=mtol)
@@ -867,12 +1193,20 @@ def iterSRPGears(cr=None, cp=None, cs=None, cr2=None, cp2=None, cs2=None, n=3,
     cm=Mdef, cm2=None, Dint=None, Dext=None, spr=inf,
     rpc=False, psc=False, rnc=False, rnf=False, rnb=False,
     rs2m=False, rp2c=False, ps2c=False, rn2c=False, rn2f=False, rn2b=False, pp2e=False,
-    tmin=Tmin, tmax=Tmax, smin=None, s2min=None, mmin=Mmin, mmax=Mmax, mtol=Mtol):
+    tmin=Tmin, tmax=Tmax, smin=None, s2min=None, mmin=Mmin, mmax=Mmax, mtol=Mtol, where=None, prop=True,
+    orders=None, counts=False, teeth=None):
   rsm=True
-  for r,p,s,r2,p2,s2,m in iterRPS2M(cr, cp, cs, cr2, cp2, cs2, n, cm, cm2, Dint, Dext, spr,
+  where1, where2, where = WhereStages(where)
+  items = iterRPS2M(cr, cp, cs, cr2, cp2, cs2, n, cm, cm2, Dint, Dext, spr,
       rsm, rpc, psc, rnc, rnf, rnb, rs2m, rp2c, ps2c, rn2c, rn2f, rn2b, pp2e,
-      tmin, tmax, smin, s2min, mmin, mmax, mtol):
+      tmin, tmax, smin, s2min, mmin, mmax, mtol, where1, where2, prop, orders, teeth)
+  if counts:
+    yield from iterCounts(SRPGears, items, n, where)
+    return
+  for r,p,s,r2,p2,s2,m in items:
     g=SRPGears(Tr=r,Tp=p,Ts=s,Tr2=r2,Tp2=p2,Ts2=s2,np=n,m=m)
+    if where and not where(g):
+      continue
     assert Dint is None or g.Dint >= Dint, f'failed {g.Dint=} >= {Dint} for {g=!s}.'
     assert Dext is None or g.Dext <= Dext, f'failed {g.Dext=} <= {Dext} for {g=!s}.'
     assert inConstraint(cm, g.m, vtol=mtol)
@@ -885,12 +1219,20 @@ def iterSRIGears(cr=None, cp=None, cs=None, cr2=None, cp2=None, cs2=None, n=3,
     cm=Mdef, cm2=None, Dint=None, Dext=None, spr=inf,
     rpc=False, psc=False, rnc=False, rnf=False, rnb=False,
     rp2c=False, ps2c=False, rn2c=False, rn2f=False, rn2b=False, pp2e=False,
-    tmin=Tmin, tmax=Tmax, smin=None, s2min=None, mmin=Mmin, mmax=Mmax, mtol=Mtol):
+    tmin=Tmin, tmax=Tmax, smin=None, s2min=None, mmin=Mmin, mmax=Mmax, mtol=Mtol, where=None, prop=True,
+    orders=None, counts=False, teeth=None):
   rsm=rs2m=True
-  for r,p,s,r2,p2,s2,m in iterRPS2M(cr, cp, cs, cr2, cp2, cs2, n, cm, cm2, Dint, Dext, spr,
+  where1, where2, where = WhereStages(where)
+  items = iterRPS2M(cr, cp, cs, cr2, cp2, cs2, n, cm, cm2, Dint, Dext, spr,
       rsm, rpc, psc, rnc, rnf, rnb, rs2m, rp2c, ps2c, rn2c, rn2f, rn2b, pp2e,
-      tmin, tmax, smin, s2min, mmin, mmax, mtol):
+      tmin, tmax, smin, s2min, mmin, mmax, mtol, where1, where2, prop, orders, teeth)
+  if counts:
+    yield from iterCounts(SRIGears, items, n, where)
+    return
+  for r,p,s,r2,p2,s2,m in items:
     g=SRIGears(Tr=r,Tp=p,Ts=s,Tr2=r2,Tp2=p2,Ts2=s2,np=n,m=m)
+    if where and not where(g):
+      continue
     assert Dint is None or g.Dint >= Dint, f'failed {g.Dint=} >= {Dint} for {g=!s}.'
     assert Dext is None or g.Dext <= Dext, f'failed {g.Dext=} <= {Dext} for {g=!s}.'
     assert inConstraint(cm, g.m, vtol=mtol)
@@ -1020,36 +1362,443 @@ def iterSRIGears(cr=None, cp=None, cs=None, cr2=None, cp2=None, cs2=None, n=3,
 #             yield g
 
 
-def getGears(R, igears, topn=4, histd=2, **kwargs):
-  "Select the topn gears closest to R from gear iterator."""
+def GearKey(R, objectives=('er',), weights=None):
+  """Get a key function for ranking gears by objectives.
+
+  The objectives are gear attribute names like 'Dext', 'Dint', 'm' or 'm2',
+  or 'er' for the ratio error abs(g.R - R). Objectives are minimized; prefix
+  a name with '-' to maximize it instead. The key is a tuple of the objective
+  values, or their weighted sum if weights are provided.
+  """
+  objs = []
+  for o in objectives:
+    sign, name = (-1, o[1:]) if o.startswith('-') else (1, o)
+    objs.append((sign, name))
+  if weights is not None and len(weights) != len(objs):
+    raise ValueError(f'{weights=} must have a weight for each of {objectives=}.')
+
+  def getkey(g):
+    k = tuple(sign * (abs(g.R - R) if name == 'er' else getattr(g, name)) for sign,name in objs)
+    if weights is not None:
+      return sum(w*v for w,v in zip(weights,k))
+    return k
+  return getkey
+
+
+def GearNames(cls):
+  """Get the gear attribute names of a gear class that GearKey() objectives can use."""
+  names = {k for c in cls.__mro__ for k in getattr(c, '__annotations__', {})}
+  names |= set(inspect.signature(cls.__init__).parameters) - {'self', 'kwargs'}
+  names |= {k for k in dir(cls) if not k.startswith('_') and not callable(getattr(cls, k))}
+  return names
+
+
+def OuterWork(igears, cr=None, cs=None, n=3, cm=Mdef, Dint=None, Dext=None, tmin=Tmin, tmax=Tmax,
+    smin=None, **kwargs):
+  """Get the (work, total) estimated search work of the outer loop sizes.
+
+  The outer sizes are the ring sizes, or the first gear sizes for SGears.
+  The work dict maps each outer size to the work done before it, in the
+  order they are searched. The work for each ring size is the number of
+  planet sizes in its TpRange(), and each gear size for SGears is 1.
+  """
+  tmin, tmax, smin = TLimits(cm, Dint, Dext, tmin, tmax, smin or 2)
+  if igears is iterSGears:
+    sizes = [(s, 1) for s in iterIConstraint(cs, tmin, tmax)]
+  else:
+    rr = TrRange(n=n, tmin=tmin, tmax=tmax, smin=smin)
+    sizes = [(r, max(0, pmax - pmin + 1)) for r in iterIConstraint(cr, *rr)
+        for pmin, pmax in [TpRange(rr=r, n=n, tmin=tmin, tmax=tmax, smin=smin)]]
+  work, total = {}, 0
+  for v, w in sizes:
+    work[v], total = total, total + w
+  return work, total
+
+
+class Progress(object):
+  """Progress reporting for getGears() searches.
+
+  This estimates the fraction of the search done from the position of the
+  current outer loop size in the OuterWork() of the search, and reports the
+  checked candidates, throughput, ETA, and the current best gears every
+  interval seconds. To not slow down the search, getGears() only calls
+  update() when the number of candidates checked reaches the returned next
+  sample count, which is adjusted to sample about 10 times per interval. If
+  snapshot is a filename, the report and the current top gears are also
+  written to it.
+  """
+
+  def __init__(self, igears, interval=10.0, snapshot=None, file=None, **kwargs):
+    self.work, self.total = OuterWork(igears, **kwargs)
+    self.interval, self.snapshot, self.file = interval, snapshot, file or sys.stderr
+    self.step = 1024
+
+  def start(self, n=0):
+    """Start timing the search from n candidates, returning the next n to update at."""
+    self.t0 = self.tlast = self.tsample = time.monotonic()
+    self.n0 = n
+    return n + self.step
+
+  def done(self, outer):
+    """Get the estimated fraction of the search done at an outer size."""
+    return self.work.get(outer, 0)/self.total if self.total else 1.0
+
+  def report(self, n, outer, top, f=None):
+    """Get the progress report string."""
+    t = time.monotonic() - self.t0
+    f = self.done(outer) if f is None else f
+    rate = (n - self.n0)/t if t else 0.0
+    eta = t*(1 - f)/f if f else inf
+    best = ' '.join(f'R={g.R:.1f}' for k,g in top)
+    return f'progress: {f:.1%} at {outer} checked {n} ({rate:.0f}/s) elapsed={t:.0f}s eta={eta:.0f}s top: {best}'
+
+  def update(self, n, outer, top):
+    """Update the progress after n candidates, returning the next n to update at."""
+    now = time.monotonic()
+    if now - self.tlast >= self.interval:
+      self.tlast = now
+      self.write(self.report(n, outer, top), top)
+    # Adjust the step to sample about 10 times per interval.
+    dt, self.tsample = now - self.tsample, now
+    if dt:
+      self.step = max(1, min(int(self.step*self.interval/10/dt), 1 << 20))
+    return n + self.step
+
+  def finish(self, n, top):
+    """Report the completed search."""
+    self.write(self.report(n, 'end', top, 1.0), top)
+
+  def write(self, line, top):
+    """Write a progress report line and a snapshot of the top gears."""
+    print(line, file=self.file, flush=True)
+    if self.snapshot:
+      with open(self.snapshot + '.tmp', 'w') as f:
+        f.write(line + '\n' + ''.join(f'{g}\n' for k,g in top))
+      os.replace(self.snapshot + '.tmp', self.snapshot)
+
+
+def SearchKey(R, igears, *args, **kwargs):
+  """Get a string identifying a getGears() search for matching checkpoints.
+
+  Search stages are identified by their type and simple attribute values.
+  """
+  def key(v):
+    if hasattr(v, 'iterGears'):
+      attrs = ', '.join(f'{k}={a!r}' for k,a in sorted(vars(v).items()) if isinstance(a, (int, float, str, type(None))))
+      return f'{type(v).__name__}({attrs})'
+    if isinstance(v, (list, tuple)):
+      return f'[{", ".join(key(i) for i in v)}]'
+    return repr(v)
+  args = [key(v) for v in args] + [f'{k}={key(v)}' for k,v in sorted(kwargs.items())]
+  return f'{igears.__name__}({R!r}, {", ".join(args)})'
+
+
+def saveCheckpoint(path, state):
+  """Atomically save a checkpoint state dict to a file."""
+  with open(path + '.tmp', 'wb') as f:
+    pickle.dump(state, f, pickle.HIGHEST_PROTOCOL)
+  os.replace(path + '.tmp', path)
+
+
+def loadCheckpoint(path):
+  """Load a checkpoint state dict from a file."""
+  with open(path, 'rb') as f:
+    return pickle.load(f)
+
+
+def getGears(R, igears, topn=4, histd=2, objectives=None, weights=None, pmax=inf,
+    where=None, backend='python', count_only=False, mesh=None, stages=(),
+    checkpoint=None, interval=60.0, resume=False, progress=None, **kwargs):
+  """Select the topn gears closest to R from gear iterator.
+
+  If objectives are provided the gears are ranked by them instead (see
+  GearKey()), selecting the topn gears with the smallest weighted sum if
+  weights are provided, or the Pareto front of non-dominated gears limited to
+  pmax gears if not.
+
+  The where argument is a Where expression constraint. Terms using only gear
+  sizes are evaluated by the gear iterator during the search. Other terms are
+  evaluated on the gears by the iterator for the 'python' backend, or
+  vectorized over batches of gears for the 'numpy' backend.
+
+  The order of the search filters chosen at runtime is reported with the stats.
+
+  If count_only is true only the count, fwdmax, revmax and ratio histogram
+  are computed, using ratio counts from the gear iterator for every candidate
+  without creating gear instances or ranking them, and this returns the
+  histogram.
+
+  The mesh argument is an optional MeshQuality stage that sets the contact
+  ratio attributes of the gears and filters them before they are counted and
+  ranked, so objectives can use the Mnames attributes like '-Emin'.
+
+  The stages argument is a list of other search stages like Efficiency that
+  set gear attributes and filter gears with an iterGears() method. They are
+  applied in order after the mesh stage.
+
+  If checkpoint is a filename, the search state is saved to it every interval
+  seconds when the search moves to the next outer ring size (or first gear
+  size for SGears), and removed when the search completes. The state is the
+  completed outer sizes, the stats, the histogram, and the top gears. If
+  resume is true and the checkpoint exists, the search continues from it,
+  skipping the completed outer sizes, giving the same results as an
+  uninterrupted search.
+
+  If progress is a Progress, it periodically reports the search progress and
+  current top gears (see Progress).
+  """
+  if count_only and (mesh or stages):
+    raise ValueError('count_only does not support the mesh or other stages.')
   args = ', '.join(f'{k}={v}' for k,v in kwargs.items())
   #print(f'Getting {igears.__name__}({args}) for R={R}:')
-  n, fwdmax, revmax, top, hist = 0, None, None, [], Histogram(scale=1.0,base=10**(1/histd))
-  for g in igears(**kwargs):
-    n += 1
-    if 0.0 < g.R:
-      if not fwdmax or fwdmax.R < g.R:
-        fwdmax = g
-    else:
-      if not revmax or g.R < revmax.R:
-        revmax = g
-    er = abs(g.R - R)
-    hist.add(g.R)
-    if len(top) < topn or er < top[-1][0]:
-      top.append((er, g))
-      top.sort()
-      while len(top) > topn:
-        del top[-1]
-  top = [g for dr,g in top]
+  getkey = GearKey(R, objectives or ('er',), weights)
+  if objectives and weights is None:
+    top = Pareto(pmax)
+  else:
+    top = TopN(topn)
+  n, fwdmax, revmax, hist = 0, None, None, Histogram(scale=1.0,base=10**(1/histd))
+  orders = {}
+  # The outer loop sizes that have been completed and the current one.
+  outer, done, cur = 'cs' if igears is iterSGears else 'cr', [], None
+  if checkpoint:
+    key = SearchKey(R, igears, topn, histd, objectives, weights, pmax, where, backend, count_only,
+        mesh, stages, **kwargs)
+    tsave = time.monotonic()
+    if resume and os.path.exists(checkpoint):
+      state = loadCheckpoint(checkpoint)
+      if state['key'] != key:
+        raise ValueError(f'checkpoint {checkpoint} is for a different search {state["key"]}.')
+      n, fwdmax, revmax, done, top.data = (state[k] for k in ('n', 'fwdmax', 'revmax', 'done', 'top'))
+      hist.setstate(state['hist'])
+      skip = set(done)
+      kwargs[outer] = [v for v in iterIConstraint(kwargs.get(outer), Tmin, Tmax) if v not in skip]
+
+  def save():
+    saveCheckpoint(checkpoint, dict(key=key, n=n, fwdmax=fwdmax, revmax=revmax, done=done,
+        top=top.data, hist=hist.getstate()))
+
+  pnext = progress.start(n) if progress else inf
+
+  if count_only:
+    # Track the (R, cls, args) of fwdmax and revmax and create them at the end.
+    for gR, k, cls, args in igears(where=where, orders=orders, counts=True, **kwargs):
+      if checkpoint and args[0] != cur:
+        if cur is not None:
+          done.append(cur)
+          if time.monotonic() - tsave > interval:
+            save()
+            tsave = time.monotonic()
+        cur = args[0]
+      n += k
+      if n >= pnext:
+        pnext = progress.update(n, args[0], top)
+      if 0.0 < gR:
+        if not fwdmax or fwdmax[0] < gR:
+          fwdmax = gR, cls, args
+      else:
+        if not revmax or gR < revmax[0]:
+          revmax = gR, cls, args
+      hist.add(gR, k)
+    fwdmax = fwdmax and fwdmax[1](*fwdmax[2])
+    revmax = revmax and revmax[1](*revmax[2])
+  else:
+    wherev = None
+    if where and backend == 'numpy':
+      where, wherev = where.split(Wnames2)
+    gears = igears(where=where, orders=orders, **kwargs)
+    if wherev:
+      gears = iterWhereVector(gears, wherev)
+    if mesh:
+      gears = mesh.iterGears(gears)
+    for stage in stages:
+      gears = stage.iterGears(gears)
+    for g in gears:
+      if checkpoint and (g.Ts if outer == 'cs' else g.Tr) != cur:
+        if cur is not None:
+          done.append(cur)
+          if time.monotonic() - tsave > interval:
+            save()
+            tsave = time.monotonic()
+        cur = g.Ts if outer == 'cs' else g.Tr
+      n += 1
+      if n >= pnext:
+        pnext = progress.update(n, g.Ts if outer == 'cs' else g.Tr, top)
+      if 0.0 < g.R:
+        if not fwdmax or fwdmax.R < g.R:
+          fwdmax = g
+      else:
+        if not revmax or g.R < revmax.R:
+          revmax = g
+      hist.add(g.R)
+      top.add(getkey(g), g)
+  if checkpoint and os.path.exists(checkpoint):
+    os.remove(checkpoint)
+  if progress:
+    progress.finish(n, top)
+  printGears(R, n, revmax, fwdmax, orders, hist, top, topn, objectives, weights, count_only)
+  if count_only:
+    return hist
+  return [g for k,g in top]
+
+
+def printGears(R, n, revmax, fwdmax, orders, hist, top, topn=4, objectives=None, weights=None,
+    count_only=False):
+  """Print the stats, ratio histogram and top gears of a getGears() search."""
   print(f'checked {n} gear combinations.')
   print(f'{revmax=!s}')
   print(f'{fwdmax=!s}')
+  for k,order in orders.items():
+    print(f'{k} filter order: {order}')
   print(f'Histogram of checked gear ratios:')
   print(str(hist))
-  print(f'Top {topn} gears closest to {R=}:')
-  for g in top:
-    print(f'{g}')
-  return top
+  if not count_only:
+    printTop(R, top, topn, objectives, weights)
+
+
+def printTop(R, top, topn=4, objectives=None, weights=None, what='gears'):
+  """Print the top gears of a search with their objective values."""
+  if not objectives:
+    print(f'Top {topn} {what} closest to {R=}:')
+  elif weights is None:
+    print(f'Pareto front of {len(top)} {what} for {R=} {objectives=}:')
+  else:
+    print(f'Top {topn} {what} for {R=} {objectives=} {weights=}:')
+  for k,g in top:
+    if not objectives:
+      print(f'{g}')
+    elif weights is None:
+      print(' '.join(f'{o.lstrip("-")}={v*(-1 if o.startswith("-") else 1):.4g}' for o,v in zip(objectives,k)) + f' {g}')
+    else:
+      print(f'score={k:.4g} {g}')
+
+
+def Chunks(items, k):
+  """Split a list of items into k contiguous chunks of nearly equal size."""
+  n = len(items)
+  return [items[i*n//k:(i+1)*n//k] for i in range(k) if (i+1)*n//k > i*n//k]
+
+
+def sampleGears(R, igears, topn=4, histd=2, objectives=None, weights=None, pmax=inf,
+    where=None, mesh=None, stages=(), budget=60.0, samples=None, strata=16, strata2=4, k2=2,
+    conf=0.95, seed=0, **kwargs):
+  """Approximately select the topn gears closest to R by sampling the search.
+
+  This is like getGears() for searches that are too big to enumerate. The
+  r,p planet sizes of the first stage are the primary units, which are split
+  into strata of r ranges and sampled in rounds of one unit per stratum,
+  visiting the strata in a random order each round. For split ring gears
+  each sampled r,p unit is a cluster of secondary r2 units, which are split
+  into strata2 strata of r2 ranges with k2 sampled from each. The secondary
+  units are only stratified by r2, and each includes all of its p2 sizes.
+  The gears of each sampled unit are found with igears() restricted to it, so
+  all the other search arguments and constraints work the same.
+
+  The gear count and ratio histogram are estimated with confidence intervals
+  for conf using the stratified two-stage sampling estimators (see
+  stratifiedTotal()). The top gears are the best of the checked gears, and
+  the coverage is the estimated fraction of all the gears that were checked.
+  Until every stratum has 2 samples (or all its units) there is no variance
+  estimate, so the count is the number of checked gears with an infinite
+  interval, the hist is of the checked gears, and the coverage is None.
+
+  Sampling stops after budget seconds or after checking samples units, and a
+  cluster that is stopped part way is only used for the top gears. This
+  returns the top gears and a dict of the estimates, with count and hist the
+  (estimate, interval) of the gear count and each (bmin, bmax) bucket.
+  """
+  import random
+  from statistics import NormalDist
+  if igears is iterSGears:
+    raise ValueError('sampleGears() only supports planetary gears.')
+  if k2 < 2:
+    raise ValueError('sampleGears() needs k2 >= 2 to estimate the variance of clusters.')
+  rng, zc = random.Random(seed), NormalDist().inv_cdf((1 + conf)/2)
+  t0, units = time.monotonic(), 0
+  tmin, tmax, n = kwargs.get('tmin', Tmin), kwargs.get('tmax', Tmax), kwargs.get('n', 3)
+  cr, cp, cr2 = kwargs.pop('cr', None), kwargs.pop('cp', None), kwargs.pop('cr2', None)
+  frame = [(r, p) for r in iterIConstraint(cr, tmin, tmax) for p in iterIConstraint(cp, tmin, maxTp(rmax=r, n=n))]
+  frames = Chunks(frame, strata)
+  for f in frames:
+    rng.shuffle(f)
+  frame2 = Chunks(list(iterIConstraint(cr2, tmin, tmax)), strata2) if igears is not iterPGears else None
+  getkey = GearKey(R, objectives or ('er',), weights)
+  top = Pareto(pmax) if objectives and weights is None else TopN(topn)
+  checked, fwdmax, revmax = 0, None, None
+  hist = Histogram(scale=1.0, base=10**(1/histd))
+
+  def search(**limits):
+    """Check the gears of a unit and return its counts."""
+    nonlocal checked, fwdmax, revmax
+    h = Histogram(scale=hist.scale, base=hist.base)
+    gears = igears(where=where, orders={}, **limits, **kwargs)
+    if mesh:
+      gears = mesh.iterGears(gears)
+    for stage in stages:
+      gears = stage.iterGears(gears)
+    for g in gears:
+      if 0.0 < g.R:
+        if not fwdmax or fwdmax.R < g.R:
+          fwdmax = g
+      elif not revmax or g.R < revmax.R:
+        revmax = g
+      h.add(g.R)
+      top.add(getkey(g), g)
+    checked += h.num
+    hist.merge(h)
+    return dict(h.data, n=h.num)
+
+  def stop():
+    return time.monotonic() - t0 > budget or (samples is not None and units >= samples)
+
+  def sample(r, p):
+    """Sample an r,p unit and return its (y, v) estimates, or None if stopped."""
+    nonlocal units
+    if frame2 is None:
+      units += 1
+      return search(cr=r, cp=p), None
+    ys2 = []
+    for f2 in frame2:
+      y2 = []
+      for r2 in rng.sample(f2, min(k2, len(f2))):
+        if stop():
+          return None
+        units += 1
+        y2.append((search(cr=r, cp=p, cr2=r2), None))
+      ys2.append((len(f2), y2))
+    est = stratifiedTotal(ys2)
+    return {k: e[0] for k, e in est.items()}, {k: e[1] for k, e in est.items()}
+
+  # The (y, v) samples of each stratum, sampled in rounds until stopped.
+  ys = [[] for f in frames]
+  order = list(range(len(frames)))
+  while not stop() and any(len(y) < len(f) for y, f in zip(ys, frames)):
+    rng.shuffle(order)
+    for f, y in ((frames[i], ys[i]) for i in order):
+      if len(y) < len(f) and not stop() and (s := sample(*f[len(y)])):
+        y.append(s)
+  full = [len(y) >= min(2, len(f)) for y, f in zip(ys, frames)]
+  if all(full):
+    est = stratifiedTotal(zip(map(len, frames), ys))
+    ci = lambda k: (est[k][0], zc*sqrt(est[k][1])) if k in est else (0.0, 0.0)
+    count = ci('n')
+    coverage = checked/count[0] if count[0] else 1.0
+    buckets = {(hist._getbound(i), hist._getbound(i+1)): ci(i) for i in sorted(k for k in est if k != 'n')}
+  else:
+    count, coverage = (float(checked), inf), None
+    buckets = {(b0, b1): (float(c), inf) for b0, b1, c in hist if c}
+  stats = dict(count=count, coverage=coverage, hist=buckets, strata=sum(full)/len(frames) if frames else 1.0)
+  print(f'sampled {units} units and checked {checked} gear combinations in {time.monotonic() - t0:.1f}s.')
+  if coverage is None:
+    print(f'estimated >= {checked} gear combinations, unbounded until every stratum has 2 samples, sampled strata={stats["strata"]:.0%}.')
+  else:
+    print(f'estimated {count[0]:.4g} +- {count[1]:.2g} gear combinations ({conf:.0%} CI), coverage={coverage:.3%}, sampled strata={stats["strata"]:.0%}.')
+  print(f'{revmax=!s}')
+  print(f'{fwdmax=!s}')
+  print(f'Estimated histogram of gear ratios ({conf:.0%} CI):')
+  for (bmin, bmax), (c, d) in stats['hist'].items():
+    print(f'[{bmin:8.1f},{bmax:8.1f}): {c:10.4g} +- {d:.2g}')
+  printTop(R, top, topn, objectives, weights, 'checked gears')
+  return [g for k,g in top], stats
 
 
 def getNs(**kwargs):
@@ -1065,16 +1814,9 @@ def getNs(**kwargs):
     print(f'{N=}: {dr}')
 
 
-if __name__ == '__main__':
-  #getNs(Tr=59,Tp=21)
-  #ms=list(m for m in m_stdI if 0.5<=m<=5.0)
-  #m2s=list(m for m in m_stdI if 0.4<=m<=5.0)
-  #m2f=(0.4,inf)
-  #getGears(10000, iterPGears, histd=0, rpc=True, psc=True,tmax=100)
-  #getGears(1000, iterSRGears, Tr=(24,128), D=100, m=ms, m2=m2s)
-  #getGears(400, iterSRPGears, D=30, Ts=10, m2=m2f, rpc=True)
-
-  import argparse,re
+def CmdLine():
+  """Get the command line argument parser."""
+  import argparse
 
   cmdline = argparse.ArgumentParser(
       description="Find gears for planetary and split-ring gears that satisfy constraints.",
@@ -1091,6 +1833,96 @@ relationship constraints are booleans. Other constraints are floats or ints.
       help='List the top n gears closest to the target ratio.')
   cmdline.add_argument('-d', type=int, default=2,
       help='Ratio histogram buckets per order of magnitude.')
+  cmdline.add_argument('-O', type=lambda s: s.split(','),
+      help='Rank by objectives instead of closest to R (eg "er,Dext,-Dint,-m2", "er" is ratio error, "-" maximizes).')
+  cmdline.add_argument('-W', type=lambda s: [float(w) for w in s.split(',')],
+      help='Objective weights for listing the top n by weighted sum instead of the Pareto front (eg "1.0,0.1,0.1,10.0").')
+  cmdline.add_argument('-Pmax', type=int, default=100,
+      help='Maximum number of gears kept in the Pareto front.')
+  cmdline.add_argument('--where', type=WhereType(Wnames),
+      help=f'Expression constraint using {",".join(Wnames)} (eg "Dext < 60 and m2 >= 0.4 and R > 500").')
+  cmdline.add_argument('-backend', choices=['python', 'numpy'], default='python',
+      help='Evaluate where expressions per gear in python or vectorized with numpy.')
+  cmdline.add_argument('--count-only', action='store_true',
+      help='Only count the gears and show the ratio histogram, skipping creating and ranking gears.')
+  cmdline.add_argument('-checkpoint',
+      help='Save the search state to this file periodically so it can be resumed.')
+  cmdline.add_argument('-interval', type=float, default=60.0,
+      help='Seconds between checkpoints.')
+  cmdline.add_argument('--resume', action='store_true',
+      help='Resume the search from the -checkpoint file if it exists.')
+  cmdline.add_argument('-progress', type=float,
+      help='Report the search progress, ETA and top gears to stderr every this many seconds.')
+  cmdline.add_argument('-snapshot',
+      help='Also write the progress and top gears to this file with -progress.')
+  cmdline.add_argument('-approx', type=float,
+      help='Approximately search by sampling for this many seconds, estimating the gear count and histogram (see sampleGears()).')
+  cmdline.add_argument('-samples', type=int,
+      help='Maximum number of units to sample for an approximate search.')
+  cmdline.add_argument('-strata', type=int, default=16,
+      help='Number of r size strata to sample for an approximate search.')
+  cmdline.add_argument('-seed', type=int, default=0,
+      help='Random number generator seed for an approximate search.')
+  cmdline.add_argument('--mesh', action='store_true',
+      help=f'Compute the {",".join(Mnames)} mesh contact ratio stats for the gears (implied by -Emin or using them in -O).')
+  cmdline.add_argument('-Emin', type=float,
+      help='Minimum total contact ratio for all gear meshes.')
+  cmdline.add_argument('-a', type=float, default=20.0,
+      help='Gear tooth pressure angle in degrees for mesh stats.')
+  cmdline.add_argument('-B', type=float, default=0.0,
+      help='Gear tooth helix angle in degrees for mesh stats.')
+  cmdline.add_argument('-ha', type=float, default=1.0,
+      help='Gear tooth addendum factor for mesh stats.')
+  cmdline.add_argument('-hf', type=float, default=1.25,
+      help='Gear tooth dedendum factor for mesh stats.')
+  cmdline.add_argument('-b', type=float,
+      help='Gear face width in mm (default is the module for mesh stats, or 5mm for inertia).')
+  cmdline.add_argument('--eff', action='store_true',
+      help='Compute the eta gearbox mesh efficiency for the gears (implied by -etamin or using it in -O).')
+  cmdline.add_argument('-etamin', type=float,
+      help='Minimum gearbox mesh efficiency.')
+  cmdline.add_argument('-mu', type=float, default=0.1,
+      help='Gear tooth coefficient of friction for the mesh efficiency.')
+  cmdline.add_argument('--inertia', action='store_true',
+      help='Compute the mass in g and J reflected input inertia in g.cm^2 for the gears (implied by -Jmax or using them in -O).')
+  cmdline.add_argument('-Jmax', type=float,
+      help='Maximum reflected input inertia in g.cm^2.')
+  cmdline.add_argument('-rho', type=float, default=1.24,
+      help='Gear material density in g/cm^3 for inertia.')
+  cmdline.add_argument('--printcost', action='store_true',
+      help=f'Compute the {",".join(Pnames)} print volume in cm^3 and time in minutes for the gears (implied by -volmax, -ptmax or using them in -O).')
+  cmdline.add_argument('-volmax', type=float,
+      help='Maximum print volume in cm^3.')
+  cmdline.add_argument('-ptmax', type=float,
+      help='Maximum print time in minutes.')
+  cmdline.add_argument('-lh', type=float, default=0.2,
+      help='Print layer height in mm for the print time.')
+  cmdline.add_argument('-flow', type=float, default=8.0,
+      help='Printer volumetric flow rate in mm^3/s for the print time.')
+  cmdline.add_argument('-T', type=float,
+      help=f'Output torque in Nm for computing the {",".join(Snames)} tooth bending and contact safety factors (see strength.py).')
+  cmdline.add_argument('-sigF', type=float, default=25.0,
+      help='Allowable tooth bending stress in MPa.')
+  cmdline.add_argument('-sigH', type=float, default=50.0,
+      help='Allowable tooth contact stress in MPa.')
+  cmdline.add_argument('-Smin', type=float, default=1.0,
+      help='Minimum tooth bending and contact safety factors.')
+  cmdline.add_argument('--teeth', action='store_true',
+      help='Skip gear sizes with pointed, undercut or interfering teeth for -a, -ha, -hf during the search (see toothcheck.py).')
+  cmdline.add_argument('-samin', type=float, default=0.25,
+      help='Minimum tooth tip thickness factor for --teeth.')
+  cmdline.add_argument('--rack', action='store_true',
+      help='Also skip external gears that would be undercut by a rack for --teeth.')
+  cmdline.add_argument('-optEt', type=float,
+      help='Show optimized tooth profiles for the listed gears meshes with this transverse contact ratio.')
+  cmdline.add_argument('-optEx', type=float, default=1.0,
+      help='Axial contact ratio for the optimized tooth profiles.')
+  cmdline.add_argument('--clearance', action='store_true',
+      help=f'Show the {",".join(Cnames)} tooth clearances in mm for the listed gears (see clearance.py).')
+  cmdline.add_argument('-j', type=float, default=0.0,
+      help='Gear backlash gap at the pitch circle in mm for clearances.')
+  cmdline.add_argument('-fillet', type=float, default=0.5,
+      help='Gear root fillet as a fraction of the max for clearances.')
   cmdline.add_argument('-G', choices=['S', 'P', 'SR', 'SRP', 'SRI'], default="SRP",
       help='Gear type: S:simple sun/planet, P=planetary, SR=split-ring, SRP=planetary split-ring. SRI=idler split-ring.')
   cmdline.add_argument('-r', type=ConstraintType(Tmin, Tmax),
@@ -1139,6 +1971,8 @@ relationship constraints are booleans. Other constraints are floats or ints.
       help='Do the secondary ring gear and planets need to be balanced?')
   cmdline.add_argument('--pp2e', action=argparse.BooleanOptionalAction, default=False,
       help='Do all the joined primary and secondary planets need the same phase offset (be interchangable)?')
+  cmdline.add_argument('--prop', action=argparse.BooleanOptionalAction, default=True,
+      help='Narrow the search ranges using constraint propagation?')
   cmdline.add_argument('-tmin', type=int, default=8,
       help='Minimum gear size.')
   cmdline.add_argument('-tmax', type=int, default=128,
@@ -1147,17 +1981,119 @@ relationship constraints are booleans. Other constraints are floats or ints.
       help='Minimium sun gear size (default is tmin).')
   cmdline.add_argument('-s2min', type=int, default=None,
       help='Minimium secondary sun gear size (default is tmin).')
+  return cmdline
 
-  args=cmdline.parse_args()
+
+def SearchArgs(cmdline, args):
+  """Get the igears gear iterator and its kwargs for the parsed command line args."""
   igears = globals()[f'iter{args.G}Gears']
   gearargs = dict(
       S='p s m Dext Dint psc tmin tmax smin'.split(),
-      P='r p s n m Dext Dint spr rpc psc rnc rnf rnb tmin tmax smin'.split(),
-      SR='r p s r2 p2 s2 n m m2 Dext Dint rpc rnc rnf rnb rp2c rn2c rn2f rn2b pp2e tmin tmax'.split(),
-      SRP='r p s r2 p2 s2 n m m2 Dext Dint spr rpc psc rnc rnf rnb rp2c rn2c rn2f rn2b pp2e tmin tmax smin s2min'.split(),
-      SRI='r p s r2 p2 s2 n m m2 Dext Dint spr rpc psc rnc rnf rnb rp2c ps2c rn2c rn2f rn2b pp2e tmin tmax smin s2min'.split())
+      P='r p s n m Dext Dint spr rpc psc rnc rnf rnb prop tmin tmax smin'.split(),
+      SR='r p s r2 p2 s2 n m m2 Dext Dint rpc rnc rnf rnb rp2c rn2c rn2f rn2b pp2e prop tmin tmax'.split(),
+      SRP='r p s r2 p2 s2 n m m2 Dext Dint spr rpc psc rnc rnf rnb rp2c rn2c rn2f rn2b pp2e prop tmin tmax smin s2min'.split(),
+      SRI='r p s r2 p2 s2 n m m2 Dext Dint spr rpc psc rnc rnf rnb rp2c ps2c rn2c rn2f rn2b pp2e prop tmin tmax smin s2min'.split())
+  wherenames = dict(
+      S='Ts Tp m R'.split(),
+      P='Tr Tp Ts m R Dext Dint Pp'.split(),
+      SR=Wnames, SRP=Wnames, SRI=Wnames)
   argnames = dict(r='cr',p='cp',s='cs',r2='cr2',p2='cp2',s2='cs2',m='cm',m2='cm2')
 
   kwargs={argnames.get(k,k):v for (k,v) in vars(args).items() if v is not None and k in gearargs[args.G]}
+  if args.where and args.where.names - set(wherenames[args.G]):
+    cmdline.error(f'--where for -G={args.G} can only use {",".join(wherenames[args.G])}.')
+  return igears, kwargs
+
+
+def main(argv=None, cmdline=None):
+  """Run the command line with argv arguments, using the CmdLine() parser if not given."""
+  cmdline = cmdline or CmdLine()
+  args=cmdline.parse_args(argv)
+  # The objective names without their "-" maximize prefixes.
+  objectives = set(o.lstrip('-') for o in args.O or ())
+  if args.resume and not args.checkpoint:
+    cmdline.error('--resume requires -checkpoint.')
+  if args.backend == 'numpy' and numpy is None:
+    cmdline.error('-backend=numpy requires numpy to be installed.')
+  igears, kwargs = SearchArgs(cmdline, args)
+  if args.teeth:
+    if numpy is None:
+      cmdline.error('--teeth requires numpy to be installed.')
+    kwargs['teeth'] = ToothCheck(args.a, args.ha, args.hf, args.samin, args.rack)
+  onames = GearNames(globals()[f'{args.G}Gears']) | {'er', 'eta', 'J', 'mass'} | set(Mnames + Snames + Pnames)
+  if bad := sorted(objectives - onames):
+    cmdline.error(f'-O {",".join(bad)} for -G={args.G} must be gear attributes, "er", or search stage stats.')
+  mesh = None
+  need_mesh = bool(args.mesh or args.Emin is not None or objectives & set(Mnames))
+  if (need_mesh or args.optEt is not None) and not args.ha + 0.1 < args.hf:
+    cmdline.error('mesh stats require -ha + 0.1 < -hf for the gears to mesh.')
+  if need_mesh:
+    if args.count_only:
+      cmdline.error('--count-only cannot be used with mesh stats.')
+    mesh = MeshQuality(args.a, args.B, args.ha, args.hf, args.b, args.Emin or 0.0)
+  stages = []
+  if args.T is not None:
+    if args.count_only:
+      cmdline.error('--count-only cannot be used with tooth strength.')
+    if numpy is None:
+      cmdline.error('-T requires numpy to be installed.')
+    # Strength is the first stage after the mesh stage to prune weak gears before the others.
+    stages.append(Strength(args.T, args.b or 5.0, sigF=args.sigF, sigH=args.sigH, a=args.a, Smin=args.Smin))
+  elif objectives & set(Snames):
+    cmdline.error(f'-O using {",".join(Snames)} requires -T.')
+  if args.eff or args.etamin is not None or 'eta' in objectives:
+    if args.count_only:
+      cmdline.error('--count-only cannot be used with efficiency.')
+    if numpy is None:
+      cmdline.error('--eff requires numpy to be installed.')
+    stages.append(Efficiency(args.a, args.B, args.ha, args.hf, args.mu, -inf if args.etamin is None else args.etamin))
+  if args.inertia or args.Jmax is not None or objectives & {'J', 'mass'}:
+    if args.count_only:
+      cmdline.error('--count-only cannot be used with inertia.')
+    if numpy is None:
+      cmdline.error('--inertia requires numpy to be installed.')
+    stages.append(Inertia(args.b or 5.0, args.rho, Jmax=inf if args.Jmax is None else args.Jmax))
+  if args.printcost or args.volmax is not None or args.ptmax is not None or objectives & set(Pnames):
+    if args.count_only:
+      cmdline.error('--count-only cannot be used with print cost.')
+    if numpy is None:
+      cmdline.error('--printcost requires numpy to be installed.')
+    stages.append(PrintCost(args.Dint, args.b or 5.0, args.a, args.ha, args.hf, h=args.lh, flow=args.flow,
+        volmax=inf if args.volmax is None else args.volmax, ptmax=inf if args.ptmax is None else args.ptmax))
   #print(kwargs)
-  getGears(args.R, igears, topn=args.N, histd=args.d, **kwargs)
+  if args.approx is not None or args.samples is not None:
+    if args.count_only or args.G == 'S' or args.backend != 'python' or args.checkpoint:
+      cmdline.error('-approx and -samples cannot be used with --count-only, -G=S, -backend=numpy or -checkpoint.')
+    gears, _ = sampleGears(args.R, igears, topn=args.N, histd=args.d,
+        objectives=args.O, weights=args.W, pmax=args.Pmax, where=args.where, mesh=mesh, stages=stages,
+        budget=inf if args.approx is None else args.approx, samples=args.samples, strata=args.strata,
+        seed=args.seed, **kwargs)
+  else:
+    gears = getGears(args.R, igears, topn=args.N, histd=args.d,
+        objectives=args.O, weights=args.W, pmax=args.Pmax,
+        where=args.where, backend=args.backend, count_only=args.count_only, mesh=mesh, stages=stages,
+        checkpoint=args.checkpoint, interval=args.interval, resume=args.resume,
+        progress=args.progress and Progress(igears, args.progress, args.snapshot, **kwargs), **kwargs)
+  if args.optEt is not None and not args.count_only:
+    mesh = mesh or MeshQuality(args.a, args.B, args.ha, args.hf, args.b)
+    print(f'Optimized tooth profiles for Et={args.optEt} Ex={args.optEx}:')
+    for g, meshes in zip(gears, mesh.optimize(gears, args.optEt, args.optEx)):
+      print(f'R={g.R:.1f}:')
+      for z1, z2, m, g1, g2 in meshes:
+        print(f'  {z1}/{z2} m={m:.3f}: {g1!r} + {g2!r}')
+  if args.clearance and not args.count_only:
+    clear = Clearance(args.a, args.ha, args.hf, args.j, args.fillet, args.Dint)
+    print(f'Tooth clearances with backlash j={args.j}:')
+    for g in clear.iterGears(gears):
+      print(f'R={g.R:.1f}: ' + ' '.join(f'{k}={getattr(g, k):.3f}' for k in Cnames))
+
+
+if __name__ == '__main__':
+  #getNs(Tr=59,Tp=21)
+  #ms=list(m for m in m_stdI if 0.5<=m<=5.0)
+  #m2s=list(m for m in m_stdI if 0.4<=m<=5.0)
+  #m2f=(0.4,inf)
+  #getGears(10000, iterPGears, histd=0, rpc=True, psc=True,tmax=100)
+  #getGears(1000, iterSRGears, Tr=(24,128), D=100, m=ms, m2=m2s)
+  #getGears(400, iterSRPGears, D=30, Ts=10, m2=m2f, rpc=True)
+  main()
@@ -1,5 +1,9 @@
 #!/usr/bin/python3
 
+import contextlib
+import io
+import os
+import tempfile
 import unittest
 import pgears
 
@@ -60,6 +64,169 @@ class TestPGearsUtils(unittest.TestCase):
       self.assertEqual(pgears.TRanges(tmax=d), (rr,rp,rs))
       self.assertEqual(pgears.TRanges(rr, rp, rs,tmax=d), (rr,rp,rs))
 
+  def test_R(self):
+    g = pgears.SRPGears(Tr=34, Tp=13, Ts=8, Tr2=37, Tp2=14, np=3, m=0.5)
+    self.assertEqual((g.R1, g.R2), (5.25, 96.2))
+    self.assertAlmostEqual(g.R, 5.25*96.2)
+    g = pgears.SRIGears(Tr=34, Tp=13, Ts=8, Tr2=35, Tp2=14, np=3, m=0.5)
+    self.assertEqual(g.R1, 5.25)
+    self.assertAlmostEqual(g.R2, 455/-21)
+    self.assertAlmostEqual(g.R, 5.25*455/-21)
+
+
+class TestPGearsRanking(unittest.TestCase):
+
+  def test_GearKey(self):
+    g = pgears.SRPGears(Tr=34, Tp=13, Ts=8, Tr2=37, Tp2=14, np=3, m=0.5)
+    self.assertEqual(pgears.GearKey(500)(g), (abs(g.R - 500),))
+    self.assertEqual(pgears.GearKey(500, ('Dext', '-m2'))(g), (g.Dext, -g.m2))
+    self.assertEqual(pgears.GearKey(500, ('er', 'Dext'), (1.0, 10.0))(g), abs(g.R - 500) + 10.0*g.Dext)
+    self.assertRaises(ValueError, pgears.GearKey, 500, ('er', 'Dext'), (1.0,))
+
+  def test_GearNames(self):
+    self.assertEqual(pgears.GearNames(pgears.SGears), {'Ts', 'Tp', 'm', 'R'})
+    names = pgears.GearNames(pgears.SRIGears)
+    self.assertTrue(set(pgears.Wnames) <= names)
+    self.assertNotIn('ratio', names)
+    with contextlib.redirect_stderr(io.StringIO()) as err:
+      self.assertRaises(SystemExit, pgears.main, ['-G', 'S', '-O', 'er,Dext'])
+    self.assertIn('-O Dext for -G=S', err.getvalue())
+
+  def test_WhereStages(self):
+    w = pgears.Where('Tr < 40 and Tp2 > Tp and R > 500 and Ts % 2', pgears.Wnames)
+    where1, where2, where = pgears.WhereStages(w)
+    self.assertEqual((where1(34, 13, 8), where1(34, 13, 9), where1(40, 13, 9)), (0, 1, False))
+    self.assertEqual((where2(34, 13, 8, 37, 14, 9), where2(34, 13, 8, 37, 12, 13)), (True, False))
+    g = pgears.SRPGears(Tr=34, Tp=13, Ts=8, Tr2=37, Tp2=14, np=3, m=0.5)
+    self.assertTrue(where(g))
+    self.assertEqual(pgears.WhereStages(None), (None, None, None))
+    self.assertEqual(pgears.WhereStages(pgears.Where('R > 1'))[:2], (None, None))
+
+  def test_iterCounts(self):
+    kwargs = dict(cm=(0.4,0.5), cm2=[0.3,(0.4,0.6)], tmax=40, rpc=True)
+    gears = list(pgears.iterSRPGears(**kwargs))
+    counts = list(pgears.iterSRPGears(counts=True, **kwargs))
+    self.assertEqual(sum(k for R,k,cls,args in counts), len(gears))
+    self.assertEqual(sorted(R for R,k,cls,args in counts for i in range(k)), sorted(g.R for g in gears))
+    R, k, cls, args = counts[0]
+    self.assertEqual(str(cls(*args)), str(gears[0]))
+
+  def test_checkpoint(self):
+    kwargs = dict(cm=0.5, tmax=40, objectives=('er', 'Dext'))
+    def interrupted(**kwargs):
+      for i, g in enumerate(pgears.iterSRPGears(**kwargs)):
+        if i == 500:
+          raise KeyboardInterrupt
+        yield g
+    interrupted.__name__ = 'iterSRPGears'
+    with tempfile.TemporaryDirectory() as d, contextlib.redirect_stdout(io.StringIO()) as out:
+      path = os.path.join(d, 'ckpt')
+      gears = pgears.getGears(200, pgears.iterSRPGears, **kwargs)
+      expect = out.getvalue()
+      for count_only in (False, True):
+        out.seek(0); out.truncate()
+        self.assertRaises(KeyboardInterrupt, pgears.getGears, 200, interrupted, count_only=count_only,
+            checkpoint=path, interval=0.0, **kwargs)
+        state = pgears.loadCheckpoint(path)
+        self.assertTrue(state['done'])
+        self.assertLess(state['n'], 500)
+        self.assertRaises(ValueError, pgears.getGears, 100, pgears.iterSRPGears, count_only=count_only,
+            checkpoint=path, resume=True, **kwargs)
+        out.seek(0); out.truncate()
+        result = pgears.getGears(200, pgears.iterSRPGears, count_only=count_only, checkpoint=path, resume=True, **kwargs)
+        self.assertFalse(os.path.exists(path))
+        if not count_only:
+          self.assertEqual(list(map(str, result)), list(map(str, gears)))
+          resumed = out.getvalue()
+          self.assertEqual(resumed.splitlines()[:3], expect.splitlines()[:3])
+          self.assertEqual(resumed.split('Histogram')[1], expect.split('Histogram')[1])
+        else:
+          hist = pgears.getGears(200, pgears.iterSRPGears, count_only=True, **kwargs)
+          self.assertEqual(result.getstate(), hist.getstate())
+
+  def test_progress(self):
+    kwargs = dict(cm=0.5, tmax=40)
+    work, total = pgears.OuterWork(pgears.iterSRPGears, **kwargs)
+    self.assertEqual(list(work)[0], min(work))
+    self.assertGreater(total, len(work))
+    work, total = pgears.OuterWork(pgears.iterSGears, cs=[10, 12, 14], **kwargs)
+    self.assertEqual((work, total), ({10: 0, 12: 1, 14: 2}, 3))
+    with tempfile.TemporaryDirectory() as d, contextlib.redirect_stdout(io.StringIO()):
+      path, log = os.path.join(d, 'snapshot'), io.StringIO()
+      progress = pgears.Progress(pgears.iterSRPGears, 0.0, path, log, **kwargs)
+      gears = pgears.getGears(200, pgears.iterSRPGears, progress=progress, **kwargs)
+      lines = log.getvalue().splitlines()
+      self.assertGreater(len(lines), 1)
+      self.assertTrue(all(l.startswith('progress: ') for l in lines))
+      self.assertTrue(lines[-1].startswith('progress: 100.0% at end'))
+      with open(path) as f:
+        self.assertEqual(f.read(), lines[-1] + '\n' + ''.join(f'{g}\n' for g in gears))
+
+  def test_sampleGears(self):
+    kwargs = dict(cm=0.5, tmax=30, rpc=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+      gears = pgears.getGears(200, pgears.iterSRPGears, topn=2, **kwargs)
+      hist = pgears.getGears(200, pgears.iterSRPGears, count_only=True, **kwargs)
+      # Sampling every unit gives the exact results.
+      top, stats = pgears.sampleGears(200, pgears.iterSRPGears, topn=2, strata=4, strata2=2, k2=30, **kwargs)
+      self.assertEqual(list(map(str, top)), list(map(str, gears)))
+      self.assertEqual(stats['count'], (hist.num, 0.0))
+      self.assertEqual(stats['coverage'], 1.0)
+      self.assertEqual([c for c, d in stats['hist'].values()], [c for b0, b1, c in hist if c])
+      # Partial samples estimate the count.
+      top, stats = pgears.sampleGears(200, pgears.iterSRPGears, samples=100, strata=4, **kwargs)
+    (c, d) = stats['count']
+    self.assertLess(abs(c - hist.num), 3*d)
+    self.assertLess(stats['coverage'], 1.0)
+    # Too few samples for every stratum gives no estimate, and stops within a cluster.
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+      top, stats = pgears.sampleGears(200, pgears.iterSRPGears, samples=5, **kwargs)
+    self.assertIn('sampled 5 units', out.getvalue())
+    self.assertEqual(stats['count'][1], float('inf'))
+    self.assertIsNone(stats['coverage'])
+    self.assertRaises(ValueError, pgears.sampleGears, 10, pgears.iterSGears)
+    self.assertRaises(ValueError, pgears.sampleGears, 10, pgears.iterSRPGears, k2=1)
+
+
+class TestPGearsMesh(unittest.TestCase):
+
+  def test_GearMeshes(self):
+    g = pgears.SRIGears(Tr=34, Tp=13, Ts=8, Tr2=35, Tp2=14, np=3, m=0.5)
+    self.assertEqual(pgears.GearMeshes(g), [(13, -34, 0.5), (8, 13, 0.5), (14, -35, g.m2), (7, 14, g.m2)])
+    g = pgears.SRGears(Tr=34, Tp=13, Ts=8, Tr2=37, Tp2=14, np=3, m=0.5)
+    self.assertEqual(pgears.GearMeshes(g), [(13, -34, 0.5), (14, -37, g.m2)])
+
+  def test_MeshQuality(self):
+    mesh = pgears.MeshQuality(a=25.0, B=15.0, b=4.0, emin=1.0)
+    gears = [pgears.SRPGears(Tr=34, Tp=13, Ts=8, Tr2=37, Tp2=14, np=3, m=0.5),
+        pgears.SRPGears(Tr=34, Tp=13, Ts=8, Tr2=31, Tp2=12, np=3, m=0.5)]
+    self.assertEqual(list(mesh.iterGears(gears)), gears)
+    # The p1/r1 and s1/p1 meshes are shared and only computed once.
+    self.assertEqual(len(mesh.memo), 4)
+    for g in gears:
+      Es = []
+      for z1, z2, m in pgears.GearMeshes(g):
+        g1, g2 = (pgears.Gear(z, m, 25.0, 15.0, hx=4.0/m) for z in (z1, z2))
+        Es.append(g1.E(g2))
+      self.assertAlmostEqual(g.Emin, min(Es))
+    mesh = pgears.MeshQuality(emin=max(g.Emin for g in gears))
+    self.assertEqual(len(list(mesh.iterGears(gears))), 0)
+
+  def test_MeshQuality_ha(self):
+    self.assertRaises(ValueError, pgears.MeshQuality, ha=1.2)
+    with contextlib.redirect_stderr(io.StringIO()) as err:
+      self.assertRaises(SystemExit, pgears.main, ['-G', 'P', '-tmax', '40', '--mesh', '-ha', '1.2'])
+    self.assertIn('-ha + 0.1 < -hf', err.getvalue())
+
+  def test_MeshQuality_optimize(self):
+    mesh = pgears.MeshQuality(a=25.0, b=4.0)
+    g = pgears.SRPGears(Tr=34, Tp=13, Ts=8, Tr2=37, Tp2=14, np=3, m=0.5)
+    [meshes] = mesh.optimize([g], 1.2, 1.0)
+    self.assertEqual([k[:3] for k in meshes], pgears.GearMeshes(g))
+    for z1, z2, m, g1, g2 in meshes:
+      self.assertAlmostEqual(g1.Et(g2), 1.2)
+      self.assertAlmostEqual(g1.Ex, 1.0)
+
 
 if __name__ == '__main__':
   unittest.main()
@@ -0,0 +1,238 @@
+#!/bin/python3
+"""
+A long running pgears.py search server with warm caches, and a thin client.
+
+Running pgears.py for every query pays for interpreter startup, building the
+argument parser, and enumerating all the candidate gear sizes from scratch.
+This server keeps a pgears process running and answers queries with the same
+arguments as the pgears.py command line over HTTP, using two caches;
+
+* Results: the output of each query keyed by its parsed arguments, so
+  repeating a query just returns the saved output.
+* Tables: the stage one iterRPSM() and stage two iterRPS2M() candidate size
+  tables keyed by their size, module and relationship constraints. The where
+  and where2 expression filters are applied to the cached tables, so queries
+  that only differ by target ratio, ranking, --where or search stages share
+  the same tables. Searches with --teeth are not cached.
+
+Both caches share one LRU cache with a memory budget, evicting the least
+recently used entries when it is full. Filter order stats are only reported
+for queries that build the tables. Queries are answered one at a time, since
+pgears output goes to stdout.
+
+Start the server with;
+
+  pgearsd.py --serve [--port 8765] [--budget 256]
+
+and run queries with;
+
+  pgearsd.py [--port 8765] -G SRP -R 400 -tmax 80 ...
+
+which prints the output and exits with the status of the query. Queries
+using -checkpoint or -snapshot are always run, since they write files.
+"""
+import contextlib, http.server, inspect, io, json, sys, time, traceback
+import urllib.request
+from collections import OrderedDict
+import pgears
+
+Port = 8765
+
+
+class LRU(object):
+  """A dict that evicts the least recently used entries to stay within a budget of bytes."""
+
+  def __init__(self, budget=256 << 20):
+    self.budget, self.size, self.hits, self.misses = budget, 0, 0, 0
+    self.data = OrderedDict()
+
+  def __len__(self):
+    return len(self.data)
+
+  def __contains__(self, key):
+    return key in self.data
+
+  def get(self, key, default=None):
+    """Get the value for key, making it the most recently used."""
+    if key not in self.data:
+      self.misses += 1
+      return default
+    self.hits += 1
+    self.data.move_to_end(key)
+    return self.data[key][0]
+
+  def put(self, key, value, size):
+    """Add a value with an estimated size in bytes, evicting old entries to fit."""
+    if key in self.data:
+      self.size -= self.data.pop(key)[1]
+    if size > self.budget:
+      return
+    self.data[key] = value, size
+    self.size += size
+    while self.size > self.budget:
+      self.size -= self.data.popitem(last=False)[1][1]
+
+  def stats(self):
+    """Get a dict of the cache stats."""
+    return dict(entries=len(self), size=self.size, budget=self.budget, hits=self.hits, misses=self.misses)
+
+
+class Tables(object):
+  """Cached versions of the pgears stage one and two candidate table iterators.
+
+  install() replaces pgears.iterRPSM() and iterRPS2M() with versions that
+  save their complete tables in cache, and uninstall() restores them.
+  """
+
+  def __init__(self, cache):
+    self.cache = cache
+    self.funcs = dict(iterRPSM=pgears.iterRPSM, iterRPS2M=pgears.iterRPS2M)
+
+  def install(self):
+    for name, func in self.funcs.items():
+      setattr(pgears, name, self.cached(func))
+
+  def uninstall(self):
+    for name, func in self.funcs.items():
+      setattr(pgears, name, func)
+
+  def cached(self, func):
+    """Get a caching wrapper of a pgears table iterator function."""
+    sig = inspect.signature(func)
+
+    def iterTable(*args, **kwargs):
+      kwargs = sig.bind(*args, **kwargs).arguments
+      if kwargs.get('teeth') is not None:
+        yield from func(**kwargs)
+        return
+      where, where2 = kwargs.pop('where', None), kwargs.pop('where2', None)
+      orders = kwargs.pop('orders', None)
+      key = (func.__name__, repr(sorted(kwargs.items())))
+      table = self.cache.get(key)
+      items = iter(table) if table is not None else self.build(key, func(orders=orders, **kwargs))
+      for item in items:
+        if where and not where(*item[:3]):
+          continue
+        if where2 and not where2(*item[:6]):
+          continue
+        yield item
+    iterTable.__name__ = func.__name__
+    return iterTable
+
+  def build(self, key, items):
+    """Iterate through items, saving them in the cache if they are all used and fit."""
+    table, size = [], 0
+    for item in items:
+      if table is not None:
+        table.append(item)
+        size += sys.getsizeof(item) + 32
+        if size > self.cache.budget:
+          table = None
+      yield item
+    if table is not None:
+      self.cache.put(key, table, size + sys.getsizeof(table))
+
+
+class Server(object):
+  """A pgears query server with warm caches."""
+
+  def __init__(self, budget=256 << 20):
+    self.cache = LRU(budget)
+    self.tables = Tables(self.cache)
+    self.cmdline = pgears.CmdLine()
+    self.cmdline.prog = 'pgears.py'
+
+  def query(self, argv):
+    """Run a pgears.py query, returning a (status, output, cached) tuple."""
+    out = io.StringIO()
+    status, cached, key = 0, False, None
+    self.tables.install()
+    try:
+      with contextlib.redirect_stdout(out), contextlib.redirect_stderr(out):
+        args = self.cmdline.parse_args(argv)
+        # Queries that write files are not cached.
+        key = None if args.checkpoint or args.snapshot else ('query', repr(sorted(vars(args).items())))
+        result = key and self.cache.get(key)
+        if result is not None:
+          return 0, result, True
+        pgears.main(argv, self.cmdline)
+    except SystemExit as e:
+      status = e.code if isinstance(e.code, int) else 1
+    except Exception:
+      traceback.print_exc(file=out)
+      status = 1
+    finally:
+      self.tables.uninstall()
+    output = out.getvalue()
+    if status == 0 and key:
+      self.cache.put(key, output, sys.getsizeof(output))
+    return status, output, cached
+
+  def handler(self):
+    """Get an http.server request handler class for this server."""
+    server = self
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+
+      def reply(self, result):
+        body = json.dumps(result).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+      def do_GET(self):
+        self.reply(server.cache.stats())
+
+      def do_POST(self):
+        argv = json.loads(self.rfile.read(int(self.headers['Content-Length'])))['argv']
+        t = time.perf_counter()
+        status, output, cached = server.query(argv)
+        self.reply(dict(status=status, output=output, cached=cached, time=time.perf_counter() - t))
+
+      def log_message(self, format, *args):
+        pass
+
+    return Handler
+
+  def serve(self, host='localhost', port=Port):
+    """Get an http.server.HTTPServer for this server, ready for serve_forever()."""
+    return http.server.HTTPServer((host, port), self.handler())
+
+
+def query(argv, host='localhost', port=Port):
+  """Run a pgears.py query on a server, returning the reply dict."""
+  req = urllib.request.Request(f'http://{host}:{port}/', json.dumps(dict(argv=argv)).encode(),
+      {'Content-Type': 'application/json'})
+  with urllib.request.urlopen(req) as f:
+    return json.load(f)
+
+
+if __name__ == '__main__':
+  import argparse
+
+  cmdline = argparse.ArgumentParser(
+      description='Run or query a pgears.py search server. All other arguments are passed to pgears.py.',
+      allow_abbrev=False)
+  cmdline.add_argument('--serve', action='store_true',
+      help='Run the server instead of a query.')
+  cmdline.add_argument('--host', default='localhost',
+      help='Server host name.')
+  cmdline.add_argument('--port', type=int, default=Port,
+      help='Server port.')
+  cmdline.add_argument('--budget', type=float, default=256.0,
+      help='Server cache memory budget in MB.')
+  args, argv = cmdline.parse_known_args()
+
+  if args.serve:
+    httpd = Server(int(args.budget*(1 << 20))).serve(args.host, args.port)
+    print(f'serving pgears queries on {args.host}:{httpd.server_port}.')
+    try:
+      httpd.serve_forever()
+    except KeyboardInterrupt:
+      pass
+  else:
+    result = query(argv, args.host, args.port)
+    print(result['output'], end='')
+    sys.exit(result['status'])
@@ -0,0 +1,105 @@
+#!/usr/bin/pypy3
+"""Tests for pgearsd.py."""
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from pgearsd import *
+
+
+class TestLRU(unittest.TestCase):
+
+  def test_put(self):
+    cache = LRU(100)
+    cache.put('a', 1, 40)
+    cache.put('b', 2, 40)
+    self.assertEqual(cache.get('a'), 1)
+    # Adding c evicts b, the least recently used.
+    cache.put('c', 3, 40)
+    self.assertNotIn('b', cache)
+    self.assertEqual((cache.get('a'), cache.get('b'), cache.get('c')), (1, None, 3))
+    self.assertEqual(cache.stats(), dict(entries=2, size=80, budget=100, hits=3, misses=1))
+    # Replacing updates the size, and entries larger than the budget are not kept.
+    cache.put('a', 4, 20)
+    cache.put('d', 5, 101)
+    self.assertEqual((len(cache), cache.size, cache.get('d')), (2, 60, None))
+
+
+def Output(text):
+  """Get the output lines without the filter order timing stats."""
+  return [l for l in text.splitlines() if 'filter order' not in l]
+
+
+class TestServer(unittest.TestCase):
+
+  def test_tables(self):
+    where = pgears.WhereType(pgears.Wnames)('Tr2 < 40 and Ts > 8')
+    expect = [str(g) for g in pgears.iterSRPGears(tmax=40, where=where)]
+    server = Server()
+    server.tables.install()
+    try:
+      for i in range(2):
+        self.assertEqual([str(g) for g in pgears.iterSRPGears(tmax=40, where=where)], expect)
+        self.assertEqual(server.cache.stats()['hits'], i)
+      # Other where expressions share the table.
+      self.assertEqual(len(list(pgears.iterSRPGears(tmax=40))), len(list(pgears.iterSRPGears(tmax=40))))
+      self.assertEqual(len(server.cache), 1)
+      # Partly used tables are not saved.
+      next(pgears.iterPGears(tmax=40))
+      self.assertEqual(len(server.cache), 1)
+    finally:
+      server.tables.uninstall()
+    self.assertIs(pgears.iterRPS2M, server.tables.funcs['iterRPS2M'])
+
+  def test_query(self):
+    argv = '-G SRP -tmax 40 -R 200 -N 2'.split()
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+      pgears.main(argv)
+    server = Server()
+    httpd = server.serve(port=0)
+    thread = threading.Thread(target=httpd.serve_forever)
+    thread.start()
+    try:
+      port = httpd.server_port
+      result = query(argv, port=port)
+      self.assertEqual((result['status'], result['cached']), (0, False))
+      self.assertEqual(Output(result['output']), Output(out.getvalue()))
+      output = result['output']
+      result = query(argv, port=port)
+      self.assertEqual((result['status'], result['output'], result['cached']), (0, output, True))
+      # Overlapping queries use the cached tables.
+      result = query(argv + ['--where', 'Dext < 30'], port=port)
+      self.assertEqual((result['status'], result['cached']), (0, False))
+      self.assertNotIn('filter order', result['output'])
+      result = query(['-G', 'Q'], port=port)
+      self.assertEqual(result['status'], 2)
+      self.assertIn('invalid choice', result['output'])
+      # Queries that write files are always run.
+      with tempfile.TemporaryDirectory() as d:
+        snapshot = os.path.join(d, 'snapshot')
+        for i in range(2):
+          result = query(argv + ['-progress', '0.001', '-snapshot', snapshot], port=port)
+          self.assertEqual((result['status'], result['cached']), (0, False))
+          self.assertTrue(os.path.exists(snapshot))
+          os.remove(snapshot)
+      # The client passes pgears' own -p and -b options through.
+      argv = '-G P -tmax 40 -p 14 -b 4 --printcost -N 2'.split()
+      with contextlib.redirect_stdout(io.StringIO()) as out:
+        pgears.main(argv)
+      client = subprocess.run([sys.executable, 'pgearsd.py', '--port', str(port)] + argv,
+          capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+      self.assertEqual(client.returncode, 0)
+      self.assertEqual(Output(client.stdout), Output(out.getvalue()))
+      self.assertIn('p(T=14', client.stdout)
+    finally:
+      httpd.shutdown()
+      httpd.server_close()
+      thread.join()
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,317 @@
+#!/bin/python3
+"""
+Distributed pgears.py searches with a coordinator and TCP workers.
+
+The coordinator splits the outer ring sizes of a search (or the first gear
+sizes for SGears) into units of about equal work using OuterWork(), and
+hands them out to workers that connect to it over TCP. Workers can run on the
+same host or other hosts. Each worker searches its unit with the size
+constraint narrowed to the unit's outer sizes, and sends back the number of
+gears checked, the ratio histogram, the fwdmax and revmax gears, and its top
+gears, which the coordinator merges into the results of the whole search.
+
+The protocol is JSON objects, one per line;
+
+* worker -> coordinator: {"op": "ready"} when it is ready for work.
+* coordinator -> worker: {"op": "work", "unit": i, "job": {...}} with the
+  search arguments and unit sizes, or {"op": "done"} when there is no more.
+* worker -> coordinator: {"op": "result", "unit": i, ...} and is then given
+  more work, or {"op": "error", "unit": i, "error": "..."} if the search
+  failed, which aborts the whole search.
+
+Gears are sent as [name, args, kwargs] constructor arguments. If a worker's
+connection is lost or it takes longer than timeout seconds for a unit, its
+unit is put back on the queue for another worker. Results are merged in unit
+order, so the top gears are the same as a single getGears() search.
+
+Only the search and ranking arguments are distributed, so objectives must
+be gear attributes and the mesh and other search stages are not supported,
+nor are checkpoints, progress reports, or approximate searches.
+
+Start the coordinator with the pgears.py search arguments;
+
+  pgearsdist.py [-port 8766] [-units 64] -G SRI -R 400 -tmax 160 ...
+
+and workers on each host with;
+
+  pgearsdist.py --worker -host coordinator [-port 8766]
+"""
+import inspect, json, socket, socketserver, sys, threading, time, traceback
+from math import inf
+import pgears
+from pgears import GearKey, GearNames, Histogram, OuterWork, Pareto, TopN, WhereType, Wnames, printGears
+
+Port = 8766
+
+
+def encode(v):
+  """Encode a value for JSON, keeping range tuples distinct from lists."""
+  if isinstance(v, tuple):
+    return dict(range=[encode(i) for i in v])
+  if isinstance(v, list):
+    return [encode(i) for i in v]
+  if isinstance(v, dict):
+    return {k: encode(i) for k, i in v.items()}
+  return v
+
+
+def decode(v):
+  """Decode a value from encode()."""
+  if isinstance(v, dict):
+    if list(v) == ['range']:
+      return tuple(decode(i) for i in v['range'])
+    return {k: decode(i) for k, i in v.items()}
+  if isinstance(v, list):
+    return [decode(i) for i in v]
+  return v
+
+
+def encodeGear(g):
+  """Encode a gear as [name, args, kwargs] constructor arguments."""
+  cls = type(g)
+  names = inspect.signature(cls.__init__).parameters
+  return [cls.__name__, [], {k: getattr(g, k) for k in ('Tr', 'Tp', 'Ts', 'Tr2', 'Tp2', 'np', 'm') if k in names}]
+
+
+def decodeGear(v):
+  """Decode a gear from encodeGear()."""
+  if v is None:
+    return None
+  name, args, kwargs = v
+  return getattr(pgears, name)(*args, **kwargs)
+
+
+def Units(igears, k=64, **kwargs):
+  """Split the outer sizes of a search into k units of about equal work."""
+  work, total = OuterWork(igears, **kwargs)
+  units = [[] for i in range(k)]
+  for v, w in work.items():
+    units[min(int(w*k/total), k - 1) if total else 0].append(v)
+  return [u for u in units if u]
+
+
+def searchUnit(R, igears, topn=4, histd=2, objectives=None, weights=None, pmax=inf, where=None,
+    count_only=False, **kwargs):
+  """Search a work unit, returning the result dict for the coordinator."""
+  getkey = GearKey(R, objectives or ('er',), weights)
+  top = Pareto(pmax) if objectives and weights is None else TopN(topn)
+  n, fwdmax, revmax, hist = 0, None, None, Histogram(scale=1.0, base=10**(1/histd))
+  if count_only:
+    for gR, k, cls, args in igears(where=where, counts=True, **kwargs):
+      n += k
+      if 0.0 < gR:
+        if not fwdmax or fwdmax[0] < gR:
+          fwdmax = gR, [cls.__name__, list(args), {}]
+      elif not revmax or gR < revmax[0]:
+        revmax = gR, [cls.__name__, list(args), {}]
+      hist.add(gR, k)
+    fwdmax, revmax = fwdmax and fwdmax[1], revmax and revmax[1]
+  else:
+    for g in igears(where=where, **kwargs):
+      n += 1
+      if 0.0 < g.R:
+        if not fwdmax or fwdmax.R < g.R:
+          fwdmax = g
+      elif not revmax or g.R < revmax.R:
+        revmax = g
+      hist.add(g.R)
+      top.add(getkey(g), g)
+    fwdmax, revmax = fwdmax and encodeGear(fwdmax), revmax and encodeGear(revmax)
+  *state, data = hist.getstate()
+  return dict(n=n, fwdmax=fwdmax, revmax=revmax, hist=[state, list(data.items())],
+      top=[encodeGear(g) for k, g in top])
+
+
+class Coordinator(object):
+  """A distributed search coordinator.
+
+  This serves work units of a search to workers, and run() waits for them
+  all to be done and prints and returns the merged results like getGears().
+  """
+
+  def __init__(self, R, igears, topn=4, histd=2, objectives=None, weights=None, pmax=inf,
+      where=None, count_only=False, units=64, host='localhost', port=Port, timeout=None, **kwargs):
+    names = GearNames(getattr(pgears, igears.__name__[4:])) | {'er'}
+    if bad := [o for o in objectives or () if o.lstrip('-') not in names]:
+      raise ValueError(f'objectives {",".join(bad)} are not {igears.__name__[4:]} attributes or "er".')
+    GearKey(R, objectives or ('er',), weights)
+    self.R, self.topn, self.histd, self.objectives, self.weights, self.pmax = R, topn, histd, objectives, weights, pmax
+    self.count_only, self.timeout = count_only, timeout
+    outer = 'cs' if igears is pgears.iterSGears else 'cr'
+    job = dict(R=R, igears=igears.__name__, topn=topn, histd=histd, objectives=objectives,
+        weights=weights, pmax=pmax, where=where and str(where), count_only=count_only, kwargs=kwargs)
+    self.jobs = []
+    for unit in Units(igears, units, **kwargs):
+      self.jobs.append(encode(dict(job, kwargs=dict(kwargs, **{outer: unit}))))
+    self.queue = list(range(len(self.jobs)))
+    self.results, self.error = {}, None
+    self.lock = threading.Condition()
+    self.server = socketserver.ThreadingTCPServer((host, port), self.handler())
+    self.server.daemon_threads = True
+    self.port = self.server.server_address[1]
+
+  def next(self):
+    """Get the next unit to work on, or None when they are all done."""
+    with self.lock:
+      while not self.queue and len(self.results) < len(self.jobs) and not self.error:
+        self.lock.wait()
+      return self.queue.pop(0) if self.queue and not self.error else None
+
+  def done(self, unit, result=None):
+    """Finish a unit with its result, or put it back on the queue if there is none."""
+    with self.lock:
+      if result is not None:
+        self.results.setdefault(unit, result)
+      elif unit not in self.results:
+        self.queue.append(unit)
+      self.lock.notify_all()
+
+  def fail(self, unit, error):
+    """Abort the search because a unit failed with an error."""
+    with self.lock:
+      self.error = self.error or f'unit {unit} failed: {error}'
+      self.lock.notify_all()
+
+  def handler(self):
+    """Get a socketserver request handler class for workers."""
+    coord = self
+
+    class Handler(socketserver.StreamRequestHandler):
+
+      def handle(self):
+        self.request.settimeout(coord.timeout)
+        while (msg := self.rfile.readline()) and json.loads(msg)['op'] == 'ready':
+          unit = coord.next()
+          if unit is None:
+            self.send(dict(op='done'))
+            return
+          try:
+            self.send(dict(op='work', unit=unit, job=coord.jobs[unit]))
+            result = json.loads(self.rfile.readline())
+          except (OSError, ValueError):
+            result = None
+          if result and result['op'] == 'error':
+            coord.fail(unit, result['error'])
+            return
+          coord.done(unit, result)
+          if result is None:
+            return
+
+      def send(self, msg):
+        self.wfile.write(json.dumps(msg).encode() + b'\n')
+        self.wfile.flush()
+
+    return Handler
+
+  def run(self):
+    """Serve the units to workers until they are all done, and print and return the results.
+
+    This raises a RuntimeError if a worker fails to search a unit.
+    """
+    thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+    thread.start()
+    try:
+      with self.lock:
+        while len(self.results) < len(self.jobs) and not self.error:
+          self.lock.wait()
+    finally:
+      self.server.shutdown()
+      self.server.server_close()
+    if self.error:
+      raise RuntimeError(self.error)
+    return self.merge()
+
+  def merge(self):
+    """Print and return the merged results like getGears()."""
+    getkey = GearKey(self.R, self.objectives or ('er',), self.weights)
+    top = Pareto(self.pmax) if self.objectives and self.weights is None else TopN(self.topn)
+    n, fwdmax, revmax, hist = 0, None, None, Histogram(scale=1.0, base=10**(1/self.histd))
+    for unit in sorted(self.results):
+      result = self.results[unit]
+      n += result['n']
+      g = decodeGear(result['fwdmax'])
+      if g and (not fwdmax or fwdmax.R < g.R):
+        fwdmax = g
+      g = decodeGear(result['revmax'])
+      if g and (not revmax or g.R < revmax.R):
+        revmax = g
+      h = Histogram(scale=1.0, base=10**(1/self.histd))
+      state, data = result['hist']
+      h.setstate(state + [dict(data)])
+      hist.merge(h)
+      for g in map(decodeGear, result['top']):
+        top.add(getkey(g), g)
+    printGears(self.R, n, revmax, fwdmax, {}, hist, top, self.topn, self.objectives, self.weights,
+        self.count_only)
+    if self.count_only:
+      return hist
+    return [g for k, g in top]
+
+
+def work(host='localhost', port=Port, retry=10.0):
+  """Run a worker, searching units from a coordinator until there are no more.
+
+  This retries connecting to the coordinator for up to retry seconds.
+  """
+  t = time.monotonic()
+  while True:
+    try:
+      sock = socket.create_connection((host, port))
+      break
+    except OSError:
+      if time.monotonic() - t > retry:
+        raise
+      time.sleep(0.1)
+  with sock, sock.makefile('rwb') as f:
+    while True:
+      f.write(b'{"op": "ready"}\n')
+      f.flush()
+      msg = json.loads(f.readline() or '{"op": "done"}')
+      if msg['op'] == 'done':
+        return
+      try:
+        job = decode(msg['job'])
+        igears = getattr(pgears, job['igears'])
+        where = job['where'] and WhereType(Wnames)(job['where'])
+        result = dict(searchUnit(job['R'], igears, job['topn'], job['histd'], job['objectives'],
+            job['weights'], job['pmax'], where, job['count_only'], **job['kwargs']), op='result')
+      except Exception:
+        result = dict(op='error', error=traceback.format_exc())
+      f.write(json.dumps(dict(result, unit=msg['unit'])).encode() + b'\n')
+      f.flush()
+
+
+if __name__ == '__main__':
+  cmdline = pgears.CmdLine()
+  cmdline.description = 'Run a distributed pgears.py search coordinator or worker.'
+  cmdline.add_argument('--worker', action='store_true',
+      help='Run a worker for the coordinator at -host and -port.')
+  cmdline.add_argument('-host', default='localhost',
+      help='Coordinator host name or address to listen on.')
+  cmdline.add_argument('-port', type=int, default=Port,
+      help='Coordinator port.')
+  cmdline.add_argument('-units', type=int, default=64,
+      help='Number of work units to split the search into.')
+  cmdline.add_argument('-timeout', type=float,
+      help='Seconds to wait for a worker to finish a unit before reassigning it.')
+  args = cmdline.parse_args()
+
+  if args.worker:
+    work(args.host, args.port)
+  else:
+    for flag in ('--teeth --mesh -Emin -optEt --eff -etamin -T --inertia -Jmax --printcost -volmax -ptmax '
+        '--clearance -backend -checkpoint --resume -progress -snapshot -approx -samples').split():
+      if getattr(args, flag.lstrip('-')) != cmdline.get_default(flag.lstrip('-')):
+        cmdline.error(f'{flag} is not supported for distributed searches.')
+    igears, kwargs = pgears.SearchArgs(cmdline, args)
+    try:
+      coord = Coordinator(args.R, igears, topn=args.N, histd=args.d, objectives=args.O,
+          weights=args.W, pmax=args.Pmax, where=args.where, count_only=args.count_only,
+          units=args.units, host=args.host, port=args.port, timeout=args.timeout, **kwargs)
+    except ValueError as e:
+      cmdline.error(str(e))
+    print(f'coordinating {len(coord.jobs)} units on {args.host}:{coord.port}.', flush=True)
+    try:
+      coord.run()
+    except RuntimeError as e:
+      sys.exit(f'pgearsdist.py: error: {e}')
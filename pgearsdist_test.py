@@ -0,0 +1,78 @@
+#!/usr/bin/pypy3
+"""Tests for pgearsdist.py."""
+import contextlib
+import io
+import json
+import socket
+import threading
+import unittest
+from pgearsdist import *
+
+
+class TestPGearsDist(unittest.TestCase):
+
+  def test_encode(self):
+    v = dict(cr=[(24, 32), 40], cm=(0.4, inf), n=3)
+    self.assertEqual(decode(json.loads(json.dumps(encode(v)))), v)
+    for g in (pgears.SGears(10, 31, 0.5), pgears.PGears(60, 24, 12, 3, 0.5),
+        pgears.SRPGears(61, 23, 15, 65, 23, np=4, m=0.5), pgears.SRIGears(61, 23, 15, 65, 23, np=4, m=0.5)):
+      self.assertEqual(str(decodeGear(json.loads(json.dumps(encodeGear(g))))), str(g))
+
+  def test_Units(self):
+    work, total = OuterWork(pgears.iterSRIGears, tmax=60)
+    units = Units(pgears.iterSRIGears, 8, tmax=60)
+    self.assertEqual(sum(units, []), list(work))
+    self.assertLessEqual(len(units), 8)
+
+  def search(self, workers, **kwargs):
+    """Run a distributed search with workers, and a worker that dies holding a unit."""
+    coord = Coordinator(200, pgears.iterSRIGears, port=0, units=8, **kwargs)
+    thread = threading.Thread(target=coord.run)
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+      thread.start()
+      with socket.create_connection(('localhost', coord.port)) as sock, sock.makefile('rwb') as f:
+        f.write(b'{"op": "ready"}\n')
+        f.flush()
+        self.assertEqual(json.loads(f.readline())['op'], 'work')
+      threads = [threading.Thread(target=work, args=('localhost', coord.port)) for i in range(workers)]
+      for t in threads:
+        t.start()
+      for t in threads + [thread]:
+        t.join()
+    self.assertEqual(len(coord.results), len(coord.jobs))
+    return coord, out.getvalue()
+
+  def test_Coordinator(self):
+    kwargs = dict(tmax=50, where=pgears.WhereType(pgears.Wnames)('m2 > 0.4'), topn=3)
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+      gears = pgears.getGears(200, pgears.iterSRIGears, **kwargs)
+    expect = [l for l in out.getvalue().splitlines() if 'filter order' not in l]
+    coord, output = self.search(3, **kwargs)
+    self.assertEqual(output.splitlines(), expect)
+    self.assertEqual(list(map(str, coord.merge())), list(map(str, gears)))
+
+  def test_count_only(self):
+    with contextlib.redirect_stdout(io.StringIO()):
+      hist = pgears.getGears(200, pgears.iterSRIGears, tmax=50, count_only=True)
+    coord, output = self.search(2, tmax=50, count_only=True)
+    state = coord.merge().getstate()
+    # The merged sums are only equal to rounding errors.
+    self.assertEqual((state[0], state[-1]), (hist.num, hist.getstate()[-1]))
+    self.assertAlmostEqual(state[1], hist.sum)
+    self.assertIn(f'checked {hist.num} gear combinations.', output)
+
+  def test_error(self):
+    with self.assertRaisesRegex(ValueError, 'eta'):
+      Coordinator(200, pgears.iterSRIGears, port=0, objectives=['eta'])
+    # A unit that fails aborts the search instead of being requeued.
+    coord = Coordinator(200, pgears.iterSRIGears, port=0, units=4, tmax=40,
+        where=pgears.WhereType(pgears.Wnames)('m2 / 0 > 1'))
+    thread = threading.Thread(target=work, args=('localhost', coord.port))
+    thread.start()
+    with self.assertRaisesRegex(RuntimeError, 'ZeroDivisionError'):
+      coord.run()
+    thread.join()
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,97 @@
+#!/bin/python3
+"""
+Plastic volume and print time estimates for 3D printed gearboxes.
+
+Each gear's cross-section area is found in closed form from its size z,
+module m, and tooth addendum ha and dedendum hf. The body inside the root
+circle is a disk, and each tooth is a trapezoid from the root to the tip with
+the involute tooth thicknesses sf and sa there (see efficientgears.Gear.sy()).
+Ring gears are the same with the body an annulus from the root circle out to
+the rim, which is rim modules outside the root. Ring teeth are thicker at the
+root, which efficientgears gives for negative z.
+
+The sun, carrier and idler sun2 have a Dint hole through the middle, and the
+carrier is a plate of thickness tc filling the ring tips, except for
+SRIGears which have no carrier. The volume is the sum of all the part areas
+times their thickness, with face width b for the gears.
+
+The print time is the volume divided by the printer's volumetric flow rate,
+plus a per layer time for travel, retraction and layer changes. All the
+parts are printed together on one plate, so the number of layers is the
+height of the tallest part, which are the compound planets for two stage
+gearboxes, divided by the layer height h.
+
+Volumes are in cm^3, flow rates are in mm^3/s, and print times in minutes.
+Everything is vectorized over arrays of gear sizes, so a whole batch of
+candidate gears is computed at once.
+"""
+from math import pi, inf
+from batchstage import BatchStage
+from efficientgears import GearArray, numpy
+
+Pnames = 'vol ptime'.split()
+
+
+def gearArea(z, m, a=20.0, ha=1.0, hf=1.25, d=0.0, rim=2.0):
+  """Get the cross-section areas in mm^2 of gears with a d hole, with negative z for rings."""
+  g = GearArray(z, m, a=a, ha=ha, hf=hf)
+  z, m = g.z, g.m
+  teeth = numpy.abs(z)*(g.sa + g.sf)/2*(ha + hf)*m**2
+  body = numpy.where(z > 0, (z - 2*hf)**2 - (d/m)**2, (-z + 2*hf + 2*rim)**2 - (-z + 2*hf)**2)
+  return pi/4*body*m**2 + teeth
+
+
+def printCost(Tr, Tp, Ts, Tr2=None, Tp2=None, Ts2=None, np=3, m=0.5, sun=True, sun2=False, Dint=None,
+    b=5.0, a=20.0, ha=1.0, hf=1.25, rim=2.0, tc=2.0, h=0.2, flow=8.0, tlayer=3.0):
+  """Get the (vol, ptime) arrays of arrays of gear sizes.
+
+  The gear sizes and modules can be numbers or broadcastable arrays, with Tr
+  None for SGears which are a pair of Ts and Tp gears with the Dint hole
+  through Ts, and Tr2 None for single stage gears. The sun and sun2 flags are
+  if Ts is a sun gear and Ts2 is an idler sun gear with no carrier.
+  """
+  Tp, Ts, m, np = (numpy.asarray(v, dtype=float) for v in (Tp, Ts, m, np))
+  d = Dint or 0.0
+  area = lambda z, m, d=0.0: gearArea(z, m, a, ha, hf, d, rim)
+  if Tr is None:
+    vol, height = (area(Ts, m, d) + area(Tp, m))*b, b
+  else:
+    Tr = numpy.asarray(Tr, dtype=float)
+    vol = (np*area(Tp, m) + area(-Tr, m))*b
+    if sun:
+      vol = vol + area(Ts, m, d)*b
+    if not sun2:
+      vol = vol + pi/4*(((Tr - 2)*m)**2 - d**2)*tc
+    height = b
+    if Tr2 is not None:
+      Tr2, Tp2 = numpy.asarray(Tr2, dtype=float), numpy.asarray(Tp2, dtype=float)
+      m2 = (Tr - Tp)*m/(Tr2 - Tp2)
+      vol = vol + (np*area(Tp2, m2) + area(-Tr2, m2))*b
+      if sun2:
+        vol = vol + area(numpy.asarray(Ts2, dtype=float), m2, d)*b
+      height = 2*b
+  return vol/1000, (vol/flow + height/h*tlayer)/60
+
+
+class PrintCost(BatchStage):
+  """A search stage that estimates the print cost of gears.
+
+  This sets the vol and ptime gear attributes to the plastic volume and
+  print time, computing them for each batch of gears in one vectorized call,
+  and only keeps gears with vol <= volmax and ptime <= ptmax.
+  """
+  columns = 'Tr Tp Ts Tr2 Tp2 Ts2 np m'.split()
+  names = Pnames
+
+  def __init__(self, Dint=None, b=5.0, a=20.0, ha=1.0, hf=1.25, rim=2.0, tc=2.0,
+      h=0.2, flow=8.0, tlayer=3.0, volmax=inf, ptmax=inf):
+    super().__init__()
+    self.Dint, self.b, self.a, self.ha, self.hf, self.rim, self.tc = Dint, b, a, ha, hf, rim, tc
+    self.h, self.flow, self.tlayer, self.volmax, self.ptmax = h, flow, tlayer, volmax, ptmax
+
+  def compute(self, sun, sun2, Tr=None, Tp=None, Ts=None, Tr2=None, Tp2=None, Ts2=None, np=3, m=0.5):
+    return printCost(Tr, Tp, Ts, Tr2, Tp2, Ts2, np, m, sun, sun2, self.Dint, self.b, self.a,
+        self.ha, self.hf, self.rim, self.tc, self.h, self.flow, self.tlayer)
+
+  def keep(self, g):
+    return g.vol <= self.volmax and g.ptime <= self.ptmax
@@ -0,0 +1,51 @@
+#!/usr/bin/pypy3
+"""Tests for printcost.py."""
+import unittest
+from math import pi
+from printcost import *
+import pgears
+
+
+@unittest.skipIf(numpy is None, 'requires numpy')
+class TestPrintCost(unittest.TestCase):
+
+  def test_gearArea(self):
+    # Gears are about the area of their pitch circle, and rings the rim annulus.
+    A = gearArea([60, 12, -60], 1.0)
+    self.assertAlmostEqual(A[0]/(pi/4*60**2), 1.0, places=1)
+    self.assertAlmostEqual(A[2]/(pi/4*(66.5**2 - 60**2)), 1.0, places=1)
+    # Holes, smaller modules and thicker rims.
+    self.assertAlmostEqual(gearArea(12, 1.0, d=4.0), A[1] - 4*pi)
+    self.assertAlmostEqual(gearArea(60, 0.5), A[0]/4)
+    self.assertGreater(gearArea(-60, 1.0, rim=3.0), A[2])
+
+  def test_printCost(self):
+    vol, ptime = printCost(60, 24, 12, np=3, m=1.0, b=5.0, tc=2.0, tlayer=0.0)
+    A = gearArea([60, 24, 12, -60], 1.0)
+    V = (A[2] + 3*A[1] + A[3])*5.0 + pi/4*58**2*2.0
+    self.assertAlmostEqual(float(vol), V/1000)
+    self.assertAlmostEqual(float(ptime), V/8.0/60)
+    # Layer times are added for the 2*b compound planet height.
+    vol2, ptime2 = printCost([61, 61], [23, 23], [15, 15], [64, 65], [24, 23], m=0.5)
+    vol3, ptime3 = printCost(61, 23, 15, 65, 23, m=0.5, tlayer=0.0)
+    self.assertAlmostEqual(vol2[1], vol3)
+    self.assertAlmostEqual(ptime2[1], ptime3 + 10/0.2*3.0/60)
+    # Holes make them cheaper.
+    self.assertLess(printCost(61, 23, 15, 65, 23, 19, m=0.5, sun2=True, Dint=3.0)[0],
+        printCost(61, 23, 15, 65, 23, 19, m=0.5, sun2=True)[0])
+
+  def test_PrintCost(self):
+    gears = [pgears.SRIGears(Tr=61, Tp=23, Ts=15, Tr2=65, Tp2=23, np=4, m=0.5),
+        pgears.SRIGears(Tr=34, Tp=13, Ts=8, Tr2=35, Tp2=14, np=3, m=0.5)]
+    self.assertEqual(list(PrintCost().iterGears(gears, n=1)), gears)
+    self.assertGreater(gears[0].vol, gears[1].vol)
+    self.assertGreater(gears[0].ptime, gears[1].ptime)
+    self.assertEqual(list(PrintCost(volmax=gears[1].vol).iterGears(gears)), gears[1:])
+    self.assertEqual(list(PrintCost(ptmax=gears[1].ptime).iterGears(gears)), gears[1:])
+    g = pgears.SGears(10, 31, 0.5)
+    self.assertEqual(list(PrintCost().iterGears([g])), [g])
+    self.assertAlmostEqual(g.vol, (gearArea(10, 0.5) + gearArea(31, 0.5))*5.0/1000)
+
+
+if __name__ == '__main__':
+  unittest.main()
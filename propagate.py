@@ -0,0 +1,185 @@
+#!/usr/bin/pypy3
+"""
+A small finite-domain constraint propagation engine for integer variables.
+
+Domains are inclusive integer (min,max) ranges keyed by variable name, like
+the ranges used in constraints.py. Constraints tighten the bounds of the
+domains of the variables they use, and propagate() applies them repeatedly
+until the domains reach a fixpoint where no constraint can tighten them
+further.
+
+This only does bounds propagation, so the resulting domains can still
+include values that are not solutions, but they never exclude values that
+are. That makes it safe to use for narrowing the ranges of a
+generate-and-test search that still tests every constraint.
+"""
+from math import inf, isinf, floor, ceil, gcd
+from collections import deque
+
+# Tolerance used when rounding float bounds, so rounding errors never exclude solutions.
+Eps = 1e-9
+
+
+class Empty(Exception):
+  """Raised when a constraint makes a domain empty."""
+
+
+def setBounds(doms, name, vmin, vmax):
+  """Tighten the domain of name to within (vmin,vmax), returning True if it changed."""
+  v0, v1 = doms[name]
+  vmin, vmax = max(v0, vmin), min(v1, vmax)
+  if vmin > vmax:
+    raise Empty(name)
+  if (vmin, vmax) != (v0, v1):
+    doms[name] = vmin, vmax
+    return True
+  return False
+
+
+class Constraint(object):
+  """A base class for constraints on the named variables."""
+  names : tuple  # names of the variables used.
+
+  def prune(self, doms):
+    """Tighten the domains, returning the names of changed domains.
+
+    This modifies doms in place, and raises Empty if there are no solutions.
+    """
+    raise NotImplementedError
+
+  def __repr__(self):
+    return f'{self.__class__.__name__}({",".join(self.names)})'
+
+
+class Linear(Constraint):
+  """A linear constraint vmin <= sum(a*x) <= vmax.
+
+  The coefficients are a dict of {name: a} and can be floats.
+  """
+
+  def __init__(self, coefs, vmin=-inf, vmax=inf):
+    self.coefs, self.vmin, self.vmax = coefs, vmin, vmax
+    self.names = tuple(coefs)
+    self.items = tuple(coefs.items())
+
+  def prune(self, doms):
+    vmin, vmax = self.vmin, self.vmax
+    terms = []
+    smin = smax = 0
+    for n, a in self.items:
+      v0, v1 = doms[n]
+      t0, t1 = (a*v0, a*v1) if a > 0 else (a*v1, a*v0)
+      smin += t0
+      smax += t1
+      terms.append((n, a, t0, t1))
+    if smin > vmax + Eps or smax < vmin - Eps:
+      raise Empty(self)
+    # A term can only be tightened if its range is wider than the slack.
+    slack = min(vmax - smin, smax - vmin) + Eps
+    changed = []
+    for n, a, t0, t1 in terms:
+      if t1 - t0 <= slack:
+        continue
+      # The bounds for a*x given the bounds of all the other terms.
+      y0, y1 = vmin - (smax - t1), vmax - (smin - t0)
+      x0, x1 = (y0/a, y1/a) if a > 0 else (y1/a, y0/a)
+      x0 = -inf if isinf(x0) else ceil(x0 - Eps)
+      x1 = inf if isinf(x1) else floor(x1 + Eps)
+      if setBounds(doms, n, x0, x1):
+        changed.append(n)
+    return changed
+
+
+class Mod(Constraint):
+  """A modular constraint sum(a*x) % n == r.
+
+  The coefficients are a dict of {name: a} and must be ints. This only
+  tightens bounds once all but one of the variables are fixed.
+  """
+
+  def __init__(self, coefs, n, r=0):
+    self.coefs, self.n, self.r = coefs, n, r
+    self.names = tuple(coefs)
+
+  def prune(self, doms):
+    free = [x for x in self.names if doms[x][0] != doms[x][1]]
+    if len(free) > 1:
+      return []
+    t = self.r - sum(a*doms[x][0] for x, a in self.coefs.items() if x not in free)
+    if not free:
+      if t % self.n:
+        raise Empty(self)
+      return []
+    # Solve a*x = t (mod n), which has solutions x = x0 (mod n/g) if g divides t.
+    x = free[0]
+    a, n = self.coefs[x] % self.n, self.n
+    g = gcd(a, n)
+    if t % g:
+      raise Empty(self)
+    a, t, n = a//g, t//g, n//g
+    x0 = t * pow(a, -1, n) % n if n > 1 else 0
+    v0, v1 = doms[x]
+    v0 += (x0 - v0) % n
+    v1 -= (v1 - x0) % n
+    return [x] if setBounds(doms, x, v0, v1) else []
+
+
+class Predicate(Constraint):
+  """A constraint test(*values) that must be true.
+
+  This can be any test function, but only tightens bounds once all but one of
+  the variables are fixed, by shaving values off the ends of the remaining
+  variable's domain until the test passes.
+  """
+
+  def __init__(self, names, test):
+    self.names, self.test = tuple(names), test
+
+  def prune(self, doms):
+    free = [x for x in self.names if doms[x][0] != doms[x][1]]
+    if len(free) > 1:
+      return []
+    if not free:
+      if not self.test(*(doms[x][0] for x in self.names)):
+        raise Empty(self)
+      return []
+    x = free[0]
+    v0, v1 = doms[x]
+    vals = {n: doms[n][0] for n in self.names}
+    def ok(v):
+      vals[x] = v
+      return self.test(*(vals[n] for n in self.names))
+    while v0 <= v1 and not ok(v0):
+      v0 += 1
+    while v1 > v0 and not ok(v1):
+      v1 -= 1
+    return [x] if setBounds(doms, x, v0, v1) else []
+
+
+def propagate(doms, constraints):
+  """Propagate constraints on domains until they reach a fixpoint.
+
+  Returns a new dict of the tightened domains, or None if there are no
+  solutions. A constraint is only requeued when another constraint changes
+  one of its domains, since applying it again to its own result changes
+  nothing.
+  """
+  doms = dict(doms)
+  watch = {}
+  for i, c in enumerate(constraints):
+    for n in c.names:
+      watch.setdefault(n, []).append(i)
+  queue, queued = deque(range(len(constraints))), [True] * len(constraints)
+  try:
+    while queue:
+      i = queue.popleft()
+      queued[i] = False
+      for n in constraints[i].prune(doms):
+        # Requeue the other constraints using the changed domain.
+        for j in watch[n]:
+          if not queued[j] and j != i:
+            queue.append(j)
+            queued[j] = True
+  except Empty:
+    return None
+  return doms
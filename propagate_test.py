@@ -0,0 +1,34 @@
+#!/usr/bin/pypy3
+"""Tests for propagate.py."""
+import unittest
+from propagate import *
+
+
+class TestPropagate(unittest.TestCase):
+
+  def test_Linear(self):
+    doms = dict(x=(0, 10), y=(0, 10))
+    # x + y == 4, x - y >= 2, which bounds propagation cannot narrow to x >= 3.
+    cs = [Linear(dict(x=1, y=1), 4, 4), Linear(dict(x=1, y=-1), vmin=2)]
+    self.assertEqual(propagate(doms, cs), dict(x=(2, 4), y=(0, 2)))
+    self.assertEqual(doms, dict(x=(0, 10), y=(0, 10)))
+    self.assertEqual(propagate(doms, [Linear(dict(x=1, y=1), vmin=21)]), None)
+
+  def test_Mod(self):
+    doms = dict(x=(3, 3), y=(0, 20))
+    # (x + 2*y) % 6 == 1 means y % 3 == 2.
+    self.assertEqual(propagate(doms, [Mod(dict(x=1, y=2), 6, 1)]), dict(x=(3, 3), y=(2, 20)))
+    self.assertEqual(propagate(doms, [Mod(dict(x=1, y=2), 6, 0)]), None)
+    # Nothing is pruned while more than one variable is free.
+    doms = dict(x=(0, 5), y=(0, 20))
+    self.assertEqual(propagate(doms, [Mod(dict(x=1, y=2), 6, 1)]), doms)
+
+  def test_Predicate(self):
+    doms = dict(x=(12, 12), y=(1, 20))
+    c = Predicate('xy', lambda x, y: x % y == 0)
+    self.assertEqual(propagate(doms, [c]), dict(x=(12, 12), y=(1, 12)))
+    self.assertEqual(propagate(dict(x=(7, 7), y=(2, 6)), [c]), None)
+
+
+if __name__ == '__main__':
+  unittest.main()
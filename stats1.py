@@ -3,6 +3,7 @@
 
 from math import inf,sqrt
 from collections import defaultdict
+from bisect import insort
 
 class Sample(object):
   """A simple sample stats collector.
@@ -42,6 +43,14 @@ class Sample(object):
     for v in data:
       self.add(v)
 
+  def merge(self, other):
+    """Add all the values of another Sample."""
+    self.num += other.num
+    self.sum += other.sum
+    self.sum2 += other.sum2
+    self.min = min(self.min, other.min)
+    self.max = max(self.max, other.max)
+
   @property
   def avg(self):
     """Get the average of the values."""
@@ -143,6 +152,127 @@ class Histogram(Sample):
     super().add(v, n)
     self.data[self._getindex(v)] += n
 
+  def merge(self, other):
+    """Add all the values of another Histogram with the same buckets."""
+    super().merge(other)
+    for i, c in other.data.items():
+      self.data[i] += c
+
+  def getstate(self):
+    """Get a snapshot of the Histogram state, including the bucket counts."""
+    return super().getstate() + ({i: c for i, c in self.data.items() if c},)
+
+  def setstate(self, state):
+    """Set the state of the Histogram from a previous snapshot."""
+    *state, data = state
+    super().setstate(state)
+    self.data = defaultdict(int, data)
+
+
+class TopN(object):
+  """Keep the n (key, value) items with the smallest keys.
+
+  Items are kept sorted by key with ties broken by value, which gives the same
+  result as sorting all the items and keeping the first n, but uses only O(n)
+  memory.
+
+  Attributes:
+    n: the maximum number of items kept.
+    data: the sorted list of (key, value) items kept.
+  """
+
+  def __init__(self, n, data=None):
+    self.n = n
+    self.data = []
+    if data:
+      self.update(data)
+
+  def add(self, k, v):
+    """Add a value v with key k."""
+    if len(self.data) < self.n or k < self.data[-1][0]:
+      insort(self.data, (k, v))
+      if len(self.data) > self.n:
+        del self.data[-1]
+
+  def update(self, data):
+    """Add all the (key, value) items in data."""
+    for k, v in data:
+      self.add(k, v)
+
+  def __len__(self):
+    return len(self.data)
+
+  def __iter__(self):
+    """Iterate through the (key, value) items in key order."""
+    return iter(self.data)
+
+  def __repr__(self):
+    return f'{self.__class__.__name__}({self.n})'
+
+
+def dominates(k1, k2):
+  """Does key tuple k1 dominate k2 (no worse for all, better for one)?"""
+  return all(v1 <= v2 for v1,v2 in zip(k1,k2)) and k1 != k2
+
+
+class Pareto(TopN):
+  """Keep the (key, value) items with non-dominated keys.
+
+  This is a streaming skyline selector. Keys are tuples of objective values
+  that are all minimized, so negate any values that should be maximized. An
+  item is kept only if no other item has a key that dominates it, and adding
+  an item discards any kept items it dominates.
+
+  Memory is bounded by n. When the front grows beyond n items the item with
+  the worst first objective is discarded, so put the most important objective
+  first.
+  """
+
+  def __init__(self, n=inf, data=None):
+    super().__init__(n, data)
+
+  def add(self, k, v):
+    """Add a value v with key tuple k."""
+    # Find the items k dominates in the same scan, and delete them in place.
+    dominated = []
+    for i, (k0, _) in enumerate(self.data):
+      if dominates(k0, k):
+        return
+      if dominates(k, k0):
+        dominated.append(i)
+    for i in reversed(dominated):
+      del self.data[i]
+    insort(self.data, (k, v))
+    if len(self.data) > self.n:
+      del self.data[-1]
+
+
+def stratifiedTotal(strata):
+  """Estimate totals and their variances from stratified random samples.
+
+  The strata are (N, samples) tuples for strata of N units, where samples is
+  a list of (y, v) tuples for units sampled without replacement, with y a dict
+  of the unit's values and v an optional dict of their variances if they are
+  estimates themselves, like for two-stage sampling. This returns a dict of
+  (total, variance) estimates for every key.
+
+  Strata with one sample contribute no between unit variance, and strata with
+  no samples contribute nothing, so check every stratum has samples.
+  """
+  est = defaultdict(lambda: [0.0, 0.0])
+  for N, samples in strata:
+    n = len(samples)
+    keys = set(k for y, _ in samples for k in y)
+    for k in keys:
+      ys = [y.get(k, 0) for y, _ in samples]
+      avg = sum(ys)/n
+      e = est[k]
+      e[0] += N*avg
+      if n > 1:
+        e[1] += N*N*(1 - n/N)*sum((y - avg)**2 for y in ys)/(n - 1)/n
+      e[1] += N/n*sum(v.get(k, 0) for _, v in samples if v)
+  return {k: tuple(e) for k, e in est.items()}
+
 
 if __name__ == '__main__':
   s = Sample()
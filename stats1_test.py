@@ -0,0 +1,58 @@
+#!/usr/bin/python3
+
+import unittest
+from stats1 import *
+
+class TestHistogram(unittest.TestCase):
+
+  def test_merge(self):
+    h1, h2 = Histogram([1.5, -0.5, 2.5], width=1), Histogram([0.5, 2.0], width=1)
+    h1.merge(h2)
+    h = Histogram([1.5, -0.5, 2.5, 0.5, 2.0], width=1)
+    self.assertEqual(h1.getstate(), h.getstate())
+    self.assertEqual(list(h1), list(h))
+
+  def test_state(self):
+    h1, h2 = Histogram([1.5, -0.5, 2.5], width=1), Histogram(width=1)
+    h2.setstate(h1.getstate())
+    self.assertEqual(str(h2), str(h1))
+    self.assertEqual(list(h2), list(h1))
+    h1.add(5.0)
+    self.assertNotEqual(h2.getstate(), h1.getstate())
+
+
+class TestStratified(unittest.TestCase):
+
+  def test_stratifiedTotal(self):
+    # Fully sampled strata are exact.
+    est = stratifiedTotal([(2, [({'a': 1}, None), ({'a': 3, 'b': 1}, None)]), (1, [({'a': 2}, None)])])
+    self.assertEqual(est, {'a': (6.0, 0.0), 'b': (1.0, 0.0)})
+    # Half sampled strata, with the variance of estimated unit totals.
+    est = stratifiedTotal([(4, [({'a': 1}, {'a': 0.5}), ({'a': 3}, {'a': 1.5})])])
+    self.assertEqual(est, {'a': (8.0, 16*0.5*2/2 + 2*2.0)})
+
+
+class TestTopN(unittest.TestCase):
+
+  def test_TopN(self):
+    t = TopN(3, [(5,'a'), (1,'b'), (4,'c'), (2,'d'), (3,'e')])
+    self.assertEqual(list(t), [(1,'b'), (2,'d'), (3,'e')])
+    t.add(3, 'f')
+    self.assertEqual(list(t), [(1,'b'), (2,'d'), (3,'e')])
+    t.add(0, 'g')
+    self.assertEqual(list(t), [(0,'g'), (1,'b'), (2,'d')])
+
+  def test_Pareto(self):
+    p = Pareto()
+    p.update([((3,3),'a'), ((1,4),'b'), ((4,1),'c'), ((2,2),'d'), ((5,5),'e')])
+    self.assertEqual(list(p), [((1,4),'b'), ((2,2),'d'), ((4,1),'c')])
+    p.add((1,1),'f')
+    self.assertEqual(list(p), [((1,1),'f')])
+
+  def test_Pareto_n(self):
+    p = Pareto(2, [((1,4),'b'), ((2,2),'d'), ((4,1),'c')])
+    self.assertEqual(list(p), [((1,4),'b'), ((2,2),'d')])
+
+
+if __name__ == '__main__':
+  unittest.main()
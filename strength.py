@@ -0,0 +1,89 @@
+#!/bin/python3
+"""
+Tooth bending and contact stress screening of gearboxes.
+
+For an output torque T in Nm the tangential tooth force of every mesh is
+found from the lossless torque balances of efficiency.meshForces(), shared
+between the planets with a load sharing factor. The stresses in MPa of each
+mesh with face width b in mm are then;
+
+* Lewis bending stress: sF = Ft/(b*m*Y) for each gear, with the Lewis form
+  factor Y = pi*(0.154 - 0.912/z) for 20deg full depth teeth with the load at
+  the tip. Ring gear teeth are thicker at the root than rack teeth, so they
+  use the rack's Y.
+* Hertz contact stress: sH = ZE*ZH*sqrt(Ft/b*(1/d1 + 1/d2)) for pitch
+  diameters d1 and d2, which are negative for rings, with the elasticity
+  factor ZE for a Young's modulus E and Poisson's ratio nu, and the zone
+  factor ZH for the pressure angle a.
+
+The SF and SH safety factors are the allowable bending and contact stresses
+sigF and sigH divided by the highest stresses of any mesh. The defaults are
+rough values for printed PLA.
+
+Everything is vectorized over arrays of gear sizes, so weak designs in a
+whole batch of candidate gears are pruned at once during the search.
+"""
+from math import pi, sqrt, sin, cos
+from batchstage import BatchStage
+from efficientgears import d2r, numpy
+from efficiency import planetMeshes, meshForces
+
+Snames = 'SF SH'.split()
+
+
+def lewisY(z):
+  """Get the Lewis form factors for gear sizes z, with negative z for rings."""
+  z = numpy.asarray(z, dtype=float)
+  return numpy.where(z > 0, pi*(0.154 - 0.912/numpy.abs(z)), pi*0.154)
+
+
+def stresses(Tr, Tp, Ts, Tr2=None, Tp2=None, np=3, m=0.5, sun=True, T=1.0, b=5.0, E=3500.0, nu=0.35, a=20.0,
+    share=1.0):
+  """Get the (sF, sH) arrays of the max bending and contact stresses in MPa of arrays of gear sizes.
+
+  The gear sizes and modules can be numbers or broadcastable arrays, and the
+  output torque T is in Nm. Tr is None for SGears which are a pair of Ts and
+  Tp gears with Tp as the output, and Tr2 is None for single stage gears. The
+  sun flag is if Ts is a sun gear.
+  """
+  m = numpy.asarray(m, dtype=float)
+  if Tr is None:
+    z1, z2 = (numpy.asarray(v, dtype=float)[..., None] for v in (Ts, Tp))
+    mk = m[..., None]
+    Ft = 1000*T/(z2*mk/2)
+  else:
+    zp, z2, side, Rm, wm, wc = planetMeshes(Tr, Tp, Ts, Tr2, Tp2, sun)
+    z1 = zp
+    # The unit input torque forces scaled for the module and input torque.
+    wo = numpy.abs(wm[..., -1] if Tr2 is not None else wc)
+    f = numpy.abs(meshForces(zp, z2, side, Rm, sun=sun))
+    Ft = f*(1000*T*wo/m/numpy.asarray(np))[..., None]*share
+    mk = m[..., None]*2*Rm/numpy.abs(z2)
+  sF = Ft/(b*mk*numpy.minimum(lewisY(z1), lewisY(z2)))
+  ZE = sqrt(E/(2*pi*(1 - nu**2)))
+  ZH = sqrt(2/(sin(d2r(a))*cos(d2r(a))))
+  sH = ZE*ZH*numpy.sqrt(Ft/b*(1/(z1*mk) + 1/(z2*mk)))
+  return sF.max(axis=-1), sH.max(axis=-1)
+
+
+class Strength(BatchStage):
+  """A search stage that screens gears for tooth strength.
+
+  This sets the SF and SH gear attributes to the bending and contact safety
+  factors for output torque T in Nm, computing them for each batch of gears
+  in one vectorized call, and only keeps gears with both >= Smin.
+  """
+  columns = 'Tr Tp Ts Tr2 Tp2 np m'.split()
+  names = Snames
+
+  def __init__(self, T, b=5.0, E=3500.0, nu=0.35, sigF=25.0, sigH=50.0, a=20.0, share=1.0, Smin=1.0):
+    super().__init__()
+    self.T, self.b, self.E, self.nu, self.a, self.share = T, b, E, nu, a, share
+    self.sigF, self.sigH, self.Smin = sigF, sigH, Smin
+
+  def compute(self, sun, sun2, Tr=None, Tp=None, Ts=None, Tr2=None, Tp2=None, np=3, m=0.5):
+    sF, sH = stresses(Tr, Tp, Ts, Tr2, Tp2, np, m, sun, self.T, self.b, self.E, self.nu, self.a, self.share)
+    return self.sigF/sF, self.sigH/sH
+
+  def keep(self, g):
+    return min(g.SF, g.SH) >= self.Smin
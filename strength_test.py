@@ -0,0 +1,41 @@
+#!/usr/bin/pypy3
+"""Tests for strength.py."""
+import unittest
+from math import pi, sqrt, sin, cos, radians
+from strength import *
+import pgears
+
+
+@unittest.skipIf(numpy is None, 'requires numpy')
+class TestStrength(unittest.TestCase):
+
+  def test_lewisY(self):
+    numpy.testing.assert_allclose(lewisY([20, 100, -60]), [pi*(0.154 - 0.912/20), pi*(0.154 - 0.00912), pi*0.154])
+
+  def test_stresses(self):
+    # A planetary with a 1Nm output has 1000/6Nmm on the sun shared by 3 planets.
+    sF, sH = stresses(60, 24, 12, np=3, m=1.0, T=1.0, b=5.0)
+    Ft = 1000/6/6/3
+    self.assertAlmostEqual(float(sF), Ft/(5.0*lewisY(12)))
+    # The sun mesh has the highest contact stress.
+    ZE, ZH = sqrt(3500/(2*pi*(1 - 0.35**2))), sqrt(2/(sin(radians(20))*cos(radians(20))))
+    self.assertAlmostEqual(float(sH), ZE*ZH*sqrt(Ft/5.0*(1/12 + 1/24)))
+    # Stress scales with torque, and the arrays are computed together.
+    sF2, sH2 = stresses([61, 61], [23, 23], [15, 15], [64, 65], [24, 23], np=4, m=0.5, T=2.0)
+    self.assertAlmostEqual(sF2[0], 2*stresses(61, 23, 15, 64, 24, np=4, m=0.5)[0])
+    self.assertAlmostEqual(sH2[1], sqrt(2)*stresses(61, 23, 15, 65, 23, np=4, m=0.5)[1])
+
+  def test_Strength(self):
+    gears = [pgears.SRPGears(Tr=61, Tp=23, Ts=15, Tr2=64, Tp2=24, np=4, m=0.5),
+        pgears.SRPGears(Tr=61, Tp=23, Ts=15, Tr2=64, Tp2=24, np=4, m=1.0)]
+    self.assertEqual(list(Strength(0.1).iterGears(gears, n=1)), gears)
+    # Bending stress is inversely proportional to the module squared.
+    self.assertAlmostEqual(gears[1].SF, 4*gears[0].SF)
+    self.assertGreater(gears[1].SH, gears[0].SH)
+    # Bending stress is proportional to torque, and contact stress to its square root.
+    T = 0.1*min(gears[0].SF, gears[0].SH**2)*1.01
+    self.assertEqual(list(Strength(T).iterGears(gears)), gears[1:])
+
+
+if __name__ == '__main__':
+  unittest.main()
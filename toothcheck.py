@@ -0,0 +1,90 @@
+#!/bin/python3
+"""
+Tooth geometry validity screening of gear sizes.
+
+Small gears and large pressure angles give teeth that don't work, which the
+gear size constraints in pgears.py don't catch. For teeth with pressure angle
+a, addendum ha and dedendum hf this checks;
+
+* Pointed tips: the tip thickness factor sa from efficientgears.Gear.sy()
+  must be at least samin. Large pressure angles make small gears pointed.
+* Undercut: the flanks of teeth are only involute outside the base circle,
+  and where the root circle is inside the base circle the flank below it has
+  no involute. A gear is undercut if the contact path of its mate runs past
+  the base circle tangent point, which is where the mate's addendum contact
+  length La is more than Rp*sin(a). For rings the tip circle must also be
+  outside the base circle. If rack is set external gears are also checked
+  against a rack, which is the z*sin(a)^2/2 >= ha limit for generated gears.
+* Involute interference: the same check done for both gears of each mesh,
+  since ring tips can interfere with small planets.
+
+The per gear values only depend on (z, a, ha, hf), so they are computed for
+every gear size in one vectorized GearArray call and memoized, which makes
+the checks cheap enough to be an early filter of the r,p,s search.
+"""
+from functools import lru_cache
+from efficientgears import GearArray, numpy
+
+
+@lru_cache(maxsize=256)
+def _teeth(a, ha, hf, samin, rack, tmax):
+  z = numpy.arange(-tmax, tmax + 1)
+  g = GearArray(numpy.where(z, z, 1), a=a, ha=ha, hf=hf)
+  ok = g.sa >= samin
+  # Ring tips inside the base circle have no involute.
+  ok &= (z > 0) | (g.Ra <= g.Rb)
+  if rack:
+    ok &= (z < 0) | (z*g.sina**2/2 >= ha)
+  ok[tmax] = False
+  return ok.tolist(), g.La.tolist(), (g.Rp*g.sina).tolist()
+
+
+def teeth(a=20.0, ha=1.0, hf=1.25, samin=0.25, rack=False, tmax=1000):
+  """Get the (ok, La, Rpsina) lists of gear sizes -tmax to tmax indexed by z.
+
+  The lists are indexed by z and negative z for rings. The ok values are if
+  the gear's own teeth are valid, La is the addendum contact length, and
+  Rpsina the distance from the pitch point to the base circle tangent point,
+  all for a unit module.
+  """
+  return _teeth(float(a), float(ha), float(hf), float(samin), bool(rack), int(tmax))
+
+
+class ToothCheck(object):
+  """A screen for pointed, undercut, or interfering teeth of gear sizes.
+
+  Calling it with r,p,s sizes checks the teeth and meshes of a planetary, and
+  screen() gives a where(r,p,s) style function for pgears.RPSFilters().
+  """
+
+  def __init__(self, a=20.0, ha=1.0, hf=1.25, samin=0.25, rack=False, tmax=1000):
+    if numpy is None:
+      raise ImportError('ToothCheck requires numpy.')
+    self.a, self.ha, self.hf, self.samin, self.rack = a, ha, hf, samin, rack
+    self.tmax = tmax
+    self.isok, self.La, self.Rpsina = teeth(a, ha, hf, samin, rack, tmax)
+
+  def __repr__(self):
+    return f'{self.__class__.__name__}(a={self.a}, ha={self.ha}, hf={self.hf}, samin={self.samin}, rack={self.rack})'
+
+  def ok(self, z):
+    """Check if gear size z has valid teeth, with negative z for rings."""
+    return self.isok[z + self.tmax]
+
+  def mesh(self, z1, z2):
+    """Check if external gear z1 meshes with gear z2 without interference."""
+    t = self.tmax
+    return self.La[z2 + t] <= self.Rpsina[z1 + t] and (z2 < 0 or self.La[z1 + t] <= self.Rpsina[z2 + t])
+
+  def pair(self, z1, z2):
+    """Check the teeth and mesh of an external gear pair."""
+    return self.ok(z1) and self.ok(z2) and self.mesh(z1, z2)
+
+  def __call__(self, r, p, s=None):
+    """Check the ring, planet and optional sun of a planetary stage."""
+    return (self.ok(p) and self.ok(-r) and self.mesh(p, -r) and
+        (s is None or self.ok(s) and self.mesh(s, p)))
+
+  def screen(self, sun=True):
+    """Get a check(r,p,s) function, that ignores s if there is no sun."""
+    return self if sun else lambda r, p, s: self(r, p)
@@ -0,0 +1,65 @@
+#!/usr/bin/pypy3
+"""Tests for toothcheck.py."""
+import unittest
+from toothcheck import *
+from efficientgears import Gear, sind
+import pgears
+
+
+@unittest.skipIf(numpy is None, 'requires numpy')
+class TestToothCheck(unittest.TestCase):
+
+  def test_teeth(self):
+    ok, La, Rpsina = teeth(a=25.0, tmax=100)
+    for z in (8, 24, -60):
+      g = Gear(z, a=25.0)
+      self.assertAlmostEqual(La[z + 100], g.La)
+      self.assertAlmostEqual(Rpsina[z + 100], g.Rp*sind(25.0))
+    self.assertFalse(ok[100])
+    # The tables are memoized.
+    self.assertIs(teeth(a=25, tmax=100), teeth(a=25.0, tmax=100))
+
+  def test_ok(self):
+    t = ToothCheck()
+    self.assertTrue(t.ok(8))
+    self.assertTrue(t.ok(-60))
+    # Small ring tips are inside the base circle.
+    self.assertFalse(t.ok(-20))
+    # Large pressure angles give pointed tips.
+    self.assertLess(Gear(13, a=40.0).sa, 0.25)
+    self.assertFalse(ToothCheck(a=40.0).ok(13))
+    self.assertTrue(ToothCheck(a=40.0, ha=0.5).ok(13))
+    # A rack undercuts 20deg gears smaller than 2/sin(a)^2 = 17.1.
+    self.assertFalse(ToothCheck(rack=True).ok(17))
+    self.assertTrue(ToothCheck(rack=True).ok(18))
+
+  def test_mesh(self):
+    t = ToothCheck()
+    # The mate tip contact must not pass the base circle tangent point.
+    self.assertGreater(Gear(24).La, Gear(8).Rp*sind(20.0))
+    self.assertFalse(t.mesh(8, 24))
+    self.assertFalse(t.pair(24, 8))
+    self.assertTrue(t.pair(16, 16))
+    # Ring tips interfere with small planets.
+    self.assertFalse(t.mesh(18, -60))
+    self.assertTrue(t.mesh(24, -60))
+    self.assertTrue(t(60, 24, 12) is False)
+    self.assertTrue(t(60, 24))
+    self.assertTrue(t.screen(False)(60, 24, 12))
+
+  def test_search(self):
+    t = ToothCheck(a=25.0)
+    gears = list(pgears.iterPGears(tmax=60, cm=0.5, teeth=t))
+    self.assertTrue(gears)
+    self.assertTrue(all(t(g.Tr, g.Tp, g.Ts) for g in gears))
+    all_gears = list(pgears.iterPGears(tmax=60, cm=0.5))
+    self.assertEqual(list(map(str, gears)), [str(g) for g in all_gears if t(g.Tr, g.Tp, g.Ts)])
+    gears = list(pgears.iterSRIGears(tmax=50, teeth=t))
+    self.assertTrue(gears)
+    self.assertTrue(all(t(g.Tr, g.Tp, g.Ts) and t(g.Tr2, g.Tp2, g.Ts2) for g in gears))
+    gears = list(pgears.iterSGears(tmax=30, teeth=t))
+    self.assertTrue(all(t.pair(g.Ts, g.Tp) for g in gears))
+
+
+if __name__ == '__main__':
+  unittest.main()